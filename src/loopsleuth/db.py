@@ -8,27 +8,64 @@ import os
 def get_default_db_path():
     return Path(os.environ.get("LOOPSLEUTH_DB_PATH", "loopsleuth.db"))
 
-def get_db_connection(db_path: Path = None) -> sqlite3.Connection:
+
+def get_db_connection(
+    db_path: Path = None, check_same_thread: bool = True
+) -> sqlite3.Connection:
     """
     Establishes a connection to the SQLite database and ensures the necessary
     table exists.
 
     Args:
         db_path: The path to the SQLite database file.
+        check_same_thread: Passed to sqlite3.connect; set False for a
+            long-lived connection shared with worker threads (callers must
+            serialize access themselves).
 
     Returns:
         An active SQLite database connection.
     """
     if db_path is None:
         db_path = get_default_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
     # Defensive: Always set Row factory for dict-like access to columns
     conn.row_factory = sqlite3.Row
     print(f"[get_db_connection] row_factory set to: {conn.row_factory}")
+    apply_pragmas(conn)
     create_table(conn)
     migrate_clips_table(conn)
     return conn
 
+
+def apply_pragmas(conn: sqlite3.Connection):
+    """
+    Tunes a connection for LoopSleuth's many small interactive writes.
+
+    WAL with synchronous=NORMAL commits without an fsync per transaction
+    (the WAL is synced at checkpoints), and readers don't block the writer.
+    WAL mode is persistent in the DB file, so it is only switched once; if
+    another connection is holding a lock at that moment, the DB keeps its
+    current journal mode.
+
+    Args:
+        conn: The connection to configure.
+    """
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if journal_mode.lower() not in ("wal", "memory"):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError as e:
+            print(
+                f"[apply_pragmas] Could not enable WAL ({e});"
+                f" keeping journal_mode={journal_mode}"
+            )
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Sorts/temp B-trees stay off disk
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # ~64 MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # Map up to 256 MB for reads
+
+
 def create_table(conn: sqlite3.Connection):
     """Creates the 'clips' table if it doesn't exist."""
     cursor = conn.cursor()
@@ -45,14 +82,23 @@ def create_table(conn: sqlite3.Connection):
             scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             modified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- Track file modification
             duplicate_of INTEGER,   -- If duplicate, points to canonical clip.id
-            needs_review BOOLEAN DEFAULT 0 -- Flag for batch duplicate review
+            needs_review BOOLEAN DEFAULT 0, -- Flag for batch duplicate review
+            file_missing BOOLEAN DEFAULT 0  -- Video not found by thumbnailer
             -- Consider adding width, height, codec later if needed
         )
     """)
     # Add indexes for potentially queried columns
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_clips_path ON clips (path)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clips_starred ON clips (starred)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clips_phash ON clips (phash)")
+    # (starred, path) serves starred lookups and the starred export's
+    # ORDER BY path; it supersedes the old idx_clips_starred
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_clips_starred_path"
+        " ON clips (starred, path)"
+    )
+    cursor.execute("DROP INDEX IF EXISTS idx_clips_starred")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_clips_phash ON clips (phash)"
+    )
 
     # Create normalized tag tables
     cursor.execute("""
@@ -112,10 +158,26 @@ def create_table(conn: sqlite3.Connection):
     except Exception:
         pass  # Already exists
 
+    # --- Packed thumbnail cache ---
+    # thumbnails: encoded thumbnail/preview bytes per clip, so serving them
+    # needs no per-file filesystem access (files on disk are still written).
+    # Foreign keys aren't enforced, so clip delete paths remove rows explicitly
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS thumbnails (
+            clip_id INTEGER PRIMARY KEY,
+            jpeg BLOB,  -- Static thumbnail
+            webp BLOB,  -- Animated preview
+            FOREIGN KEY (clip_id) REFERENCES clips(id) ON DELETE CASCADE
+        )
+    """)
+
     conn.commit()
 
 def migrate_clips_table(conn):
-    """Add width, height, size, codec_name, duplicate_of, and needs_review columns to the clips table if missing."""
+    """
+    Add width, height, size, codec_name, duplicate_of, needs_review, and
+    file_missing columns to the clips table if missing.
+    """
     cursor = conn.cursor()
     # Check and add columns if they do not exist
     columns = [row[1] for row in cursor.execute("PRAGMA table_info(clips)")]
@@ -132,10 +194,28 @@ def migrate_clips_table(conn):
         alter_stmts.append("ALTER TABLE clips ADD COLUMN duplicate_of INTEGER")
     if 'needs_review' not in columns:
         alter_stmts.append("ALTER TABLE clips ADD COLUMN needs_review BOOLEAN DEFAULT 0")
+    if 'file_missing' not in columns:
+        alter_stmts.append(
+            "ALTER TABLE clips ADD COLUMN file_missing BOOLEAN DEFAULT 0"
+        )
     for stmt in alter_stmts:
         cursor.execute(stmt)
-    if alter_stmts:
-        conn.commit()
+    # Covering index for the TUI grid query (ORDER BY filename); id is the
+    # rowid. Older databases may lack the legacy tags column, so only index
+    # what exists.
+    if 'tags' in columns:
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clips_grid"
+            " ON clips (filename, starred, thumbnail_path, tags)"
+        )
+        # idx_clips_grid already leads with filename; a second index would
+        # only slow writes
+        cursor.execute("DROP INDEX IF EXISTS idx_clips_filename")
+    else:
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_clips_filename ON clips (filename)"
+        )
+    conn.commit()
 
 # Example usage (optional, can be removed or moved to a main script)
 if __name__ == '__main__':
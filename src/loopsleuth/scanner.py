@@ -22,7 +22,10 @@ if str(SRC_DIR) not in sys.path:
 
 from loopsleuth.db import get_db_connection, get_default_db_path
 from loopsleuth.metadata import get_video_duration, FFprobeError, get_video_metadata
-from loopsleuth.thumbnailer import generate_thumbnail, ThumbnailError, generate_animated_preview
+from loopsleuth.thumbnailer import (
+    generate_thumbnail, ThumbnailError, generate_animated_preview,
+    store_thumbnail_blobs, PACK_THUMBNAILS,
+)
 from loopsleuth.hasher import calculate_phash, HasherError
 
 # Common video file extensions
@@ -121,7 +124,11 @@ def ingest_directory(
                 if existing and not force_rescan:
                     # Update scan_id so this clip is not deleted at the end
                     clip_id = existing[0]
-                    cursor.execute("UPDATE clips SET scan_id = ? WHERE id = ?", (scan_id, clip_id))
+                    cursor.execute(
+                        "UPDATE clips SET scan_id = ?, file_missing = 0"
+                        " WHERE id = ?",
+                        (scan_id, clip_id),
+                    )
                     skipped_count += 1
                     # Update progress for skipped
                     with progress_path.open("w") as f:
@@ -157,8 +164,11 @@ def ingest_directory(
                 if existing and force_rescan:
                     clip_id = existing[0]
                     cursor.execute(
-                        "UPDATE clips SET duration = ?, width = ?, height = ?, size = ?, codec_name = ?, scan_id = ? WHERE id = ?",
-                        (duration, width, height, size, codec_name, scan_id, clip_id)
+                        "UPDATE clips SET duration = ?, width = ?, height = ?,"
+                        " size = ?, codec_name = ?, scan_id = ?,"
+                        " file_missing = 0 WHERE id = ?",
+                        (duration, width, height, size, codec_name, scan_id,
+                         clip_id)
                     )
                 else:
                     cursor.execute(
@@ -199,6 +209,7 @@ def ingest_directory(
                             print(f"    Static thumbnail generated: {relative_thumb_path}")
 
                             # 2. Generate Animated Preview (if static was successful)
+                            anim_preview_path = None
                             try:
                                 print(f"    Attempting animated preview for: {filename}")
                                 anim_preview_path = generate_animated_preview(
@@ -213,7 +224,21 @@ def ingest_directory(
                                     print(f"      Failed to generate animated preview for {filename} (returned None).")
                             except (ThumbnailError, Exception) as e_anim:
                                 print(f"      Error generating animated preview for {filename}: {e_anim}", file=sys.stderr)
-                            
+                            # Replace the packed copies /thumbs falls back to
+                            if PACK_THUMBNAILS:
+                                try:
+                                    store_thumbnail_blobs(
+                                        cursor, clip_id,
+                                        static_thumb_path, anim_preview_path,
+                                    )
+                                except (OSError, sqlite3.Error) as e_blob:
+                                    print(
+                                        "      Error storing packed"
+                                        f" thumbnails for {filename}:"
+                                        f" {e_blob}",
+                                        file=sys.stderr,
+                                    )
+
                             # 3. Calculate pHash (uses static thumbnail path)
                             try:
                                 phash_str = calculate_phash(static_thumb_path)
@@ -239,7 +264,16 @@ def ingest_directory(
                                     if dup_found:
                                         if DUPLICATE_HANDLING_MODE == 'skip':
                                             print(f"[SKIP] Duplicate detected for {filename}, not inserting.")
-                                            cursor.execute("DELETE FROM clips WHERE id = ?", (clip_id,))
+                                            cursor.execute(
+                                                "DELETE FROM thumbnails"
+                                                " WHERE clip_id = ?",
+                                                (clip_id,),
+                                            )
+                                            cursor.execute(
+                                                "DELETE FROM clips"
+                                                " WHERE id = ?",
+                                                (clip_id,),
+                                            )
                                             conn.commit()
                                             skipped_count += 1
                                             with progress_path.open("w") as f:
@@ -284,6 +318,12 @@ def ingest_directory(
 
         # --- Delete all clips not from this scan (true replace behavior) ---
         cursor.execute("DELETE FROM clips WHERE scan_id != ? OR scan_id IS NULL", (scan_id,))
+        # Drop the purged clips' packed thumbnails (foreign keys aren't
+        # enforced)
+        cursor.execute(
+            "DELETE FROM thumbnails"
+            " WHERE clip_id NOT IN (SELECT id FROM clips)"
+        )
 
         conn.commit()
         print("\nScan complete.")
@@ -1,13 +1,23 @@
-"""Thumbnail generation for video clips using ffmpeg and Pillow."""
+"""Thumbnail generation for video clips using ffmpeg."""
 
 import subprocess
 import sys
 import os
+import functools
 import hashlib
-import sqlite3 # Import top-level for exception handling
-from io import BytesIO # Needed for Pillow processing
+from concurrent.futures import (
+    ProcessPoolExecutor, ThreadPoolExecutor, as_completed,
+)
+import sqlite3  # Import top-level for exception handling
+from array import array
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+# Add tqdm for progress bar if available
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
 
 # Adjust import path
 SCRIPTS_DIR = Path(__file__).parent.resolve()
@@ -15,56 +25,369 @@ SRC_DIR = SCRIPTS_DIR.parent
 if str(SRC_DIR) not in sys.path:
     sys.path.append(str(SRC_DIR))
 
-from PIL import Image, UnidentifiedImageError
 from loopsleuth.db import get_db_connection, get_default_db_path
-from loopsleuth.metadata import get_video_duration, FFprobeError # Import top-level for example
+from loopsleuth.metadata import get_video_duration, FFprobeError
 
 # Constants
-FFMPEG_COMMAND = "ffmpeg" # Assumes ffmpeg is in PATH
+FFMPEG_COMMAND = "ffmpeg"  # Assumes ffmpeg is in PATH
 THUMBNAIL_DIR_NAME = ".loopsleuth_data/thumbnails"
-THUMBNAIL_SIZE = (256, 256) # Target size (width, height) - keeping aspect ratio
-THUMBNAIL_FORMAT = "JPEG"
-THUMBNAIL_QUALITY = 85 # JPEG quality
+# Target size (width, height) - keeping aspect ratio
+THUMBNAIL_SIZE = (256, 256)
+THUMBNAIL_QUALITY = 85  # JPEG quality
+# Below this, skip input seeking for static thumbnails
+SHORT_CLIP_SECONDS = 2.0
 
-# Animated GIF Preview Constants
-ANIM_PREVIEW_SUFFIX = "_anim" # To differentiate from potential static GIFs
-ANIM_PREVIEW_FORMAT = "gif"
+# Animated Preview Constants
+ANIM_PREVIEW_SUFFIX = "_anim"  # To differentiate from the static thumbnail
+# Animated WebP: no palette pass, smaller than GIF
+ANIM_PREVIEW_FORMAT = "webp"
+ANIM_WEBP_QUALITY = 75  # libwebp lossy quality (0-100)
 ANIM_DURATION_S = 2.0  # Duration of the animated preview in seconds
 ANIM_FPS = 10  # Frames per second for the animated preview
 ANIM_WIDTH_PX = 256  # Width of the animated preview
 ANIM_LOOP_COUNT = 0  # 0 for infinite loop
-ANIM_TIME_PERCENT = 0.25 # Start at 25% of video duration, same as static thumb
+# Start at 25% of video duration, same as static thumb
+ANIM_TIME_PERCENT = 0.25
+
+# Packed thumbnails: also store each output's bytes in the thumbnails table.
+# Off by default, since it doubles thumbnail storage; /thumbs serves files
+# first and only falls back to the packed copy
+PACK_THUMBNAILS = os.environ.get("LOOPSLEUTH_PACK_THUMBNAILS", "0") == "1"
+
+# Batch DB writes
+THUMB_DB_BATCH_SIZE = 64  # thumbnail_path updates per executemany/commit
+THUMB_FETCH_BATCH_SIZE = 256  # Rows per fetchmany when reading clips
+# Clips per ffmpeg invocation in generate_thumbnails_batch
+THUMB_BATCH_MAX_INPUTS = 16
+
+# Worker processes in process_thumbnails, each running its own ffmpeg. Kept
+# modest by default: the pool is also started from the web app's background
+# scan
+THUMB_MAX_WORKERS = max(
+    1, int(os.environ.get("LOOPSLEUTH_THUMB_WORKERS", "4"))
+)
+
+# Hardware decoding
+VAAPI_RENDER_NODE = "/dev/dri/renderD128"
+
+
+@functools.lru_cache(maxsize=1)
+def _available_hwaccels() -> frozenset:
+    """
+    Hardware decode methods this ffmpeg build lists under -hwaccels (probed
+    once per process).
+    """
+    try:
+        result = subprocess.run(
+            [FFMPEG_COMMAND, "-hide_banner", "-hwaccels"],
+            capture_output=True, text=True, check=False, timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return frozenset()  # ffmpeg missing; the real invocation reports that
+    # "Hardware acceleration methods:" followed by one method per line
+    return frozenset(
+        line.strip() for line in result.stdout.splitlines()[1:] if line.strip()
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _hwaccel_args() -> Tuple[str, ...]:
+    """
+    Picks ffmpeg hardware decode flags for this machine (input options
+    prepended to every decode).
+
+    A method is only picked when its device exists and this ffmpeg build
+    lists it: ffmpeg rejects an -hwaccel it wasn't built with outright, so
+    passing one would fail every thumbnail. LOOPSLEUTH_HWACCEL overrides
+    detection ("none" disables it, any other value is passed to -hwaccel
+    as-is). Decoded frames are copied back to system memory, so the software
+    scale filters work unchanged.
+    """
+    override = os.environ.get("LOOPSLEUTH_HWACCEL")
+    if override:
+        return () if override.lower() == "none" else ("-hwaccel", override)
+    candidates: List[Tuple[str, ...]] = []
+    if sys.platform == "darwin":
+        candidates.append(("-hwaccel", "videotoolbox"))
+    elif sys.platform.startswith("linux"):
+        if os.path.exists("/dev/nvidia0"):
+            candidates.append(("-hwaccel", "cuda"))
+        if os.path.exists(VAAPI_RENDER_NODE):
+            candidates.append(
+                ("-hwaccel", "vaapi", "-hwaccel_device", VAAPI_RENDER_NODE)
+            )
+    if not candidates:
+        return ()  # Skip probing ffmpeg when there is nothing to pick
+    available = _available_hwaccels()
+    return next((args for args in candidates if args[1] in available), ())
+
+
+# Set in process_thumbnails workers, where parallelism comes from the process
+# pool: one thread per ffmpeg avoids oversubscribing cores and frame-threading
+# overhead on short clips. Standalone callers (e.g. the scanner) keep ffmpeg's
+# own threading.
+_single_threaded_ffmpeg = False
+
+
+def _use_single_threaded_ffmpeg() -> None:
+    """Process pool initializer: one thread per ffmpeg in this process."""
+    global _single_threaded_ffmpeg
+    _single_threaded_ffmpeg = True
+
+
+def _global_thread_args() -> List[str]:
+    """Global ffmpeg options limiting filter graph threads."""
+    if not _single_threaded_ffmpeg:
+        return []
+    return ["-filter_threads", "1", "-filter_complex_threads", "1"]
+
+
+def _input_thread_args() -> List[str]:
+    """Per-input ffmpeg options limiting decoder threads."""
+    return ["-threads", "1"] if _single_threaded_ffmpeg else []
+
 
 class ThumbnailError(Exception):
     """Custom exception for errors during thumbnail generation."""
     pass
 
+
+def _flush_thumbnail_updates(
+    conn: sqlite3.Connection,
+    pending_updates: List[Tuple[str, int]],
+    pending_blobs: List[Tuple[int, Optional[bytes], Optional[bytes]]],
+) -> List[int]:
+    """
+    Writes queued (thumbnail_path, clip_id) updates and (clip_id, jpeg, webp)
+    thumbnail bytes in a single transaction.
+
+    Returns:
+        The clip ids whose thumbnail_path could not be written (empty on
+        success).
+    """
+    if not pending_updates and not pending_blobs:
+        return []
+    try:
+        conn.executemany(
+            "UPDATE clips SET thumbnail_path = ?, file_missing = 0"
+            " WHERE id = ?",
+            pending_updates,
+        )
+        # A None keeps the stored blob, so regenerating one output leaves the
+        # other intact. Clips deleted mid-run are skipped rather than leaving
+        # orphaned blobs
+        conn.executemany(
+            """
+            INSERT INTO thumbnails (clip_id, jpeg, webp)
+            SELECT ?1, ?2, ?3 WHERE EXISTS (SELECT 1 FROM clips WHERE id = ?1)
+            ON CONFLICT(clip_id) DO UPDATE SET
+                jpeg = COALESCE(excluded.jpeg, jpeg),
+                webp = COALESCE(excluded.webp, webp)
+            """,
+            pending_blobs,
+        )
+        conn.commit()
+        return []
+    except sqlite3.Error as e:
+        print(
+            "  Error updating thumbnails for"
+            f" {len(pending_updates)} clip(s): {e}",
+            file=sys.stderr,
+        )
+        conn.rollback()
+        return [clip_id for _, clip_id in pending_updates]
+    finally:
+        pending_updates.clear()
+        pending_blobs.clear()
+
+
+def store_thumbnail_blobs(
+    conn: sqlite3.Connection,
+    clip_id: int,
+    static_path: Optional[Path],
+    anim_path: Optional[Path],
+) -> None:
+    """
+    Replaces a clip's packed thumbnail bytes after its files were regenerated.
+
+    Only called when PACK_THUMBNAILS is on. An output that wasn't generated
+    is stored as NULL rather than keeping stale bytes. Does not commit.
+
+    Args:
+        conn: Database connection (or cursor).
+        clip_id: The clip the outputs belong to.
+        static_path: The new static thumbnail, or None.
+        anim_path: The new animated preview, or None.
+    """
+    jpeg = static_path.read_bytes() if static_path else None
+    webp = anim_path.read_bytes() if anim_path else None
+    conn.execute(
+        """
+        INSERT INTO thumbnails (clip_id, jpeg, webp) VALUES (?, ?, ?)
+        ON CONFLICT(clip_id) DO UPDATE SET
+            jpeg = excluded.jpeg, webp = excluded.webp
+        """,
+        (clip_id, jpeg, webp),
+    )
+
+
+# Directories already created in this process; saves one mkdir syscall per
+# clip
+_MKDIR_CACHE: set[Path] = set()
+
+
+def _ensure_dir(directory: Path) -> Path:
+    """Creates a directory (and parents) once per process."""
+    if directory not in _MKDIR_CACHE:
+        directory.mkdir(parents=True, exist_ok=True)
+        _MKDIR_CACHE.add(directory)
+    return directory
+
+
+@functools.lru_cache(maxsize=16)
 def _get_thumbnail_dir(base_dir: Path = Path('.')) -> Path:
     """Gets the thumbnail storage directory path, creating it if necessary."""
-    thumb_dir = base_dir / THUMBNAIL_DIR_NAME
-    thumb_dir.mkdir(parents=True, exist_ok=True)
-    return thumb_dir
+    return _ensure_dir(base_dir / THUMBNAIL_DIR_NAME)
+
+
+def _path_hash(video_path_str: str) -> str:
+    """
+    Hashes a video path for ID-less preview filenames (BLAKE2b is faster than
+    SHA-1).
+    """
+    digest = hashlib.blake2b(video_path_str.encode('utf-8'), digest_size=20)
+    return digest.hexdigest()
+
+
+# Suffixes of every output named after the path hash, including older GIF
+# previews
+_PATH_OUTPUT_SUFFIXES = (
+    ".jpg",
+    f"{ANIM_PREVIEW_SUFFIX}.{ANIM_PREVIEW_FORMAT}",
+    f"{ANIM_PREVIEW_SUFFIX}.gif",
+)
+
+
+def _migrate_legacy_path_outputs(
+    output_dir: Path, video_path_str: str
+) -> None:
+    """
+    Renames ID-less outputs from the old SHA-1 path_<hash> names to the
+    current BLAKE2b ones, so they aren't orphaned (and a failed regeneration
+    keeps them).
+    """
+    legacy_hash = hashlib.sha1(video_path_str.encode('utf-8')).hexdigest()
+    legacy_base = f"path_{legacy_hash}"
+    new_base = f"path_{_path_hash(video_path_str)}"
+    for suffix in _PATH_OUTPUT_SUFFIXES:
+        legacy_path = output_dir / f"{legacy_base}{suffix}"
+        new_path = output_dir / f"{new_base}{suffix}"
+        try:
+            if legacy_path.exists() and not new_path.exists():
+                os.replace(legacy_path, new_path)
+        except OSError:
+            pass  # Left for the next run; regeneration doesn't depend on it
+
+
+def _get_output_base_name(
+    video_path_str: str, clip_id: Optional[int] = None
+) -> str:
+    """Base name shared by a clip's thumbnail and animated preview."""
+    if clip_id is not None:
+        # Prefer using DB ID if available (no hashing needed)
+        return f"clip_{clip_id}"
+    # Fallback to hash of path if ID is not provided
+    return f"path_{_path_hash(video_path_str)}"
 
-def _get_thumbnail_filename(video_path_str: str, clip_id: Optional[int] = None) -> str:
+
+def _get_output_filenames(
+    video_path_str: str, clip_id: Optional[int] = None
+) -> Tuple[str, str]:
+    """
+    Returns (thumbnail, animated preview) filenames, hashing the path at most
+    once.
+    """
+    base_name = _get_output_base_name(video_path_str, clip_id)
+    anim_suffix = f"{ANIM_PREVIEW_SUFFIX}.{ANIM_PREVIEW_FORMAT}"
+    return f"{base_name}.jpg", f"{base_name}{anim_suffix}"
+
+
+def _get_thumbnail_filename(
+    video_path_str: str, clip_id: Optional[int] = None
+) -> str:
     """Generates a unique filename for the thumbnail."""
-    if clip_id:
-        # Prefer using DB ID if available
-        return f"clip_{clip_id}.jpg"
-    else:
-        # Fallback to hash of path if ID is not provided
-        path_hash = hashlib.sha1(video_path_str.encode('utf-8')).hexdigest()
-        return f"path_{path_hash}.jpg"
-
-def _get_animated_preview_filename(video_path_str: str, clip_id: Optional[int] = None) -> str:
-    """Generates a unique filename for the animated GIF preview."""
-    base_name = ""
-    if clip_id:
-        base_name = f"clip_{clip_id}"
-    else:
-        path_hash = hashlib.sha1(video_path_str.encode('utf-8')).hexdigest()
-        base_name = f"path_{path_hash}"
+    return f"{_get_output_base_name(video_path_str, clip_id)}.jpg"
+
+
+def _get_animated_preview_filename(
+    video_path_str: str, clip_id: Optional[int] = None
+) -> str:
+    """Generates a unique filename for the animated preview."""
+    base_name = _get_output_base_name(video_path_str, clip_id)
     return f"{base_name}{ANIM_PREVIEW_SUFFIX}.{ANIM_PREVIEW_FORMAT}"
 
+
+def _temp_output_path(output_path: Path) -> Path:
+    """
+    Where ffmpeg writes an output before it replaces output_path (same
+    directory and extension).
+    """
+    return output_path.with_name(f".tmp_{output_path.name}")
+
+
+def _webp_encoder_args() -> List[str]:
+    """ffmpeg output args for the looping, lossy animated WebP preview."""
+    return [
+        "-c:v", "libwebp",
+        "-lossless", "0",
+        "-q:v", str(ANIM_WEBP_QUALITY),
+        "-preset", "picture",
+        "-loop", str(ANIM_LOOP_COUNT),
+    ]
+
+
+def _static_frame_args(
+    duration: float, timestamp_str: str, width: int
+) -> Tuple[List[str], str]:
+    """
+    Returns the input seek args and video filter used to grab a static frame.
+    """
+    if duration < SHORT_CLIP_SECONDS:
+        # Very short clips: seeking costs more than decoding from the start,
+        # so let the thumbnail filter pick a representative frame from the
+        # first batch
+        return [], f"thumbnail,scale={width}:-2"
+    # Snap to the keyframe at/before the timestamp and decode only keyframes:
+    # visually the same preview, without decoding the rest of the GOP
+    seek_args = [
+        "-noaccurate_seek", "-skip_frame", "nokey", "-ss", timestamp_str,
+    ]
+    return seek_args, f"scale={width}:-2"  # Scale width, auto height
+
+
+def _jpeg_qscale(quality: int) -> int:
+    """
+    Maps a 1-95 JPEG quality onto ffmpeg's 2-31 mjpeg -q:v scale (lower is
+    better).
+    """
+    quality = min(max(quality, 1), 95)
+    return round(2 + (95 - quality) * 29 / 94)
+
+
+def _jpeg_encoder_args(quality: int) -> List[str]:
+    """
+    ffmpeg output args for a baseline 4:2:0 JPEG, the layout libjpeg(-turbo)
+    decodes fastest.
+    """
+    # Standard Huffman tables: single-pass encode, ffmpeg defaults to a second
+    # optimizing pass
+    return [
+        "-pix_fmt", "yuvj420p",
+        "-q:v", str(_jpeg_qscale(quality)),
+        "-huffman", "default",
+    ]
+
+
 def generate_thumbnail(
     video_path: Path,
     duration: Optional[float] = None,
@@ -73,7 +396,7 @@ def generate_thumbnail(
     output_dir: Optional[Path] = None,
     target_size: Tuple[int, int] = THUMBNAIL_SIZE,
     quality: int = THUMBNAIL_QUALITY,
-    time_percent: float = 0.25 # Extract frame at 25% duration
+    time_percent: float = 0.25  # Extract frame at 25% duration
 ) -> Optional[Path]:
     """
     Generates a resized thumbnail for a video file.
@@ -92,84 +415,84 @@ def generate_thumbnail(
         The Path to the generated thumbnail file, or None if generation failed.
 
     Raises:
-        ThumbnailError: If ffmpeg fails or Pillow encounters an issue.
+        ThumbnailError: If ffmpeg fails to produce the thumbnail.
         FileNotFoundError: If ffmpeg executable is not found.
         ValueError: If duration is None or invalid.
     """
     if not video_path.is_file():
         raise FileNotFoundError(f"Video file not found: {video_path}")
     if duration is None or duration <= 0:
-        raise ValueError(f"Invalid or missing duration ({duration}) for {video_path}. Cannot calculate timestamp.")
+        raise ValueError(
+            f"Invalid or missing duration ({duration}) for {video_path}."
+            " Cannot calculate timestamp."
+        )
 
     # Ensure output directory exists
     if output_dir is None:
         output_dir = _get_thumbnail_dir()
     else:
-        output_dir.mkdir(parents=True, exist_ok=True)
+        _ensure_dir(output_dir)
 
     # Calculate timestamp (avoiding exactly 0 if possible for problematic videos)
     timestamp = max(0.01, duration * time_percent)
-    timestamp_str = f"{timestamp:.4f}" # Format as seconds.milliseconds
+    timestamp_str = f"{timestamp:.4f}"  # Format as seconds.milliseconds
 
-    # Generate output path
+    # Generate output path; ffmpeg writes a temp file, so a failed run keeps
+    # the old thumbnail
+    if clip_id is None:
+        _migrate_legacy_path_outputs(output_dir, str(video_path))
     thumb_filename = _get_thumbnail_filename(str(video_path), clip_id)
     output_path = output_dir / thumb_filename
+    temp_path = _temp_output_path(output_path)
 
     # ffmpeg command to extract one frame
     # -ss: seek to position (input seeking is faster for some formats)
     # -i: input file
     # -vframes 1: extract only one frame
     # -vf scale='w=...': scale filter, -2 ensures aspect ratio is maintained based on width
-    # -q:v 2: quality scale for MJPEG output (2-5 is often good)
-    # -f image2pipe: output raw image data to stdout
+    # -pix_fmt yuvj420p -q:v: 4:2:0 mjpeg at the requested quality; ffmpeg
+    #   writes the final JPEG itself
     # -loglevel error: suppress verbose output
+    seek_args, video_filter = _static_frame_args(
+        duration, timestamp_str, target_size[0]
+    )
     ffmpeg_extract_command = [
         FFMPEG_COMMAND,
-        "-ss", timestamp_str,
+        *_global_thread_args(),
+        *_hwaccel_args(),
+        *_input_thread_args(),
+        *seek_args,
         "-i", str(video_path),
         "-vframes", "1",
-        "-vf", f"scale={target_size[0]}:-2", # Scale width, auto height
-        "-q:v", "2", # High quality intermediate frame
-        "-f", "image2pipe",
-        "-c:v", "mjpeg", # Output as motion jpeg (single frame)
+        "-vf", video_filter,
+        *_jpeg_encoder_args(quality),
+        "-update", "1",
         "-loglevel", "error",
-        "-" # Output to stdout
+        "-y",  # Overwrite a leftover temp file
+        str(temp_path)
     ]
 
-    temp_frame_path = output_path.with_suffix(".tmp.jpg") # Temporary file for ffmpeg output if piping fails
-
     try:
-        # Try piping directly first (more efficient)
-        ffmpeg_process = subprocess.Popen(ffmpeg_extract_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        stdout, stderr = ffmpeg_process.communicate()
-
-        if ffmpeg_process.returncode != 0:
-            # If piping failed, maybe try writing to a temp file?
-            # Sometimes specific codecs/videos cause issues with piping.
-            # For now, raise error based on stderr.
-            error_msg = stderr.decode('utf-8', errors='ignore').strip()
+        result = subprocess.run(
+            ffmpeg_extract_command, capture_output=True, check=False
+        )
+
+        if result.returncode != 0:
+            error_msg = result.stderr.decode('utf-8', errors='ignore').strip()
+            temp_path.unlink(missing_ok=True)  # Clean up partial file
             raise ThumbnailError(
-                f"ffmpeg failed to extract frame for {video_path} at {timestamp_str}s. "
-                f"Return code: {ffmpeg_process.returncode}. Error: {error_msg or 'Unknown ffmpeg error'}"
+                f"ffmpeg failed to extract frame for {video_path} at"
+                f" {timestamp_str}s. Return code: {result.returncode}."
+                f" Error: {error_msg or 'Unknown ffmpeg error'}"
             )
 
-        if not stdout:
-             raise ThumbnailError(f"ffmpeg produced no output for {video_path}.")
-
-        # Process the image data from stdout with Pillow
-        try:
-            with Image.open(BytesIO(stdout)) as img:
-                 # Pillow already did scaling via ffmpeg, just save
-                 img.save(
-                    output_path,
-                    format=THUMBNAIL_FORMAT,
-                    quality=quality,
-                    optimize=True)
-        except UnidentifiedImageError as e:
-             raise ThumbnailError(f"Pillow could not identify image data from ffmpeg for {video_path}. Error: {e}") from e
-        except Exception as e: # Catch other Pillow errors
-            raise ThumbnailError(f"Pillow failed to save thumbnail for {video_path}. Error: {e}") from e
+        if not temp_path.exists() or temp_path.stat().st_size == 0:
+            temp_path.unlink(missing_ok=True)
+            raise ThumbnailError(
+                f"ffmpeg produced no output for {video_path}."
+            )
 
+        os.replace(temp_path, output_path)
         # print(f"Generated thumbnail: {output_path}")
         return output_path
 
@@ -177,28 +500,143 @@ def generate_thumbnail(
         # This occurs if FFMPEG_COMMAND is not found in PATH
         raise FileNotFoundError(
             f"'{FFMPEG_COMMAND}' command not found. "
-            f"Ensure FFmpeg is installed and '{FFMPEG_COMMAND}' is in your PATH."
+            f"Ensure FFmpeg is installed and '{FFMPEG_COMMAND}' is in"
+            " your PATH."
         )
+    except ThumbnailError:
+        raise
     except Exception as e:
-        # Catch other unexpected errors during the process
-        # Ensure we don't leave partial temp files if something else went wrong
-        if temp_frame_path.exists():
-             try:
-                 temp_frame_path.unlink()
-             except OSError:
-                 pass # Ignore cleanup error
-        # Re-raise original error or a new ThumbnailError
-        if isinstance(e, ThumbnailError) or isinstance(e, FileNotFoundError):
-            raise # Re-raise specific errors
-        else:
-            raise ThumbnailError(f"An unexpected error occurred generating thumbnail for {video_path}: {e}") from e
-    finally:
-         # Final cleanup check for temp file
-         if temp_frame_path.exists():
-             try:
-                 temp_frame_path.unlink()
-             except OSError:
-                 pass
+        temp_path.unlink(missing_ok=True)
+        raise ThumbnailError(
+            "An unexpected error occurred generating thumbnail for"
+            f" {video_path}: {e}"
+        ) from e
+
+
+def generate_thumbnails_batch(
+    clip_specs: List[Tuple[Path, float, Optional[int]]],
+    output_dir: Optional[Path] = None,
+    target_size: Tuple[int, int] = THUMBNAIL_SIZE,
+    quality: int = THUMBNAIL_QUALITY,
+    time_percent: float = 0.25,
+) -> List[Optional[Path]]:
+    """
+    Generates static thumbnails for several clips with one ffmpeg process per
+    chunk.
+
+    Each clip becomes its own seeked input mapped to its own JPEG output, so
+    ffmpeg startup and codec init are paid once per THUMB_BATCH_MAX_INPUTS
+    clips instead of once per clip. If a chunk fails (e.g. one corrupt
+    input), the clips it did not produce are retried one at a time with
+    generate_thumbnail.
+
+    Args:
+        clip_specs: (video_path, duration, clip_id) for each clip.
+        output_dir: The directory to save thumbnails (defaults to
+            THUMBNAIL_DIR_NAME).
+        target_size: Desired thumbnail size (width, height), maintains aspect
+            ratio.
+        quality: JPEG quality (1-95).
+        time_percent: Position in video duration (0.0 to 1.0) to grab frame
+            from.
+
+    Returns:
+        The generated thumbnail Path for each spec, in clip_specs order, or
+        None where that clip failed.
+
+    Raises:
+        FileNotFoundError: If ffmpeg executable is not found.
+    """
+    if output_dir is None:
+        output_dir = _get_thumbnail_dir()
+    else:
+        _ensure_dir(output_dir)
+
+    # Indexed by spec position; clip_id can be None for several specs
+    results: List[Optional[Path]] = [None] * len(clip_specs)
+    valid_specs = []
+    for spec_index, (video_path, duration, clip_id) in enumerate(clip_specs):
+        if duration is not None and duration > 0 and video_path.is_file():
+            valid_specs.append((spec_index, video_path, duration, clip_id))
+
+    encoder_args = _jpeg_encoder_args(quality)
+    for start in range(0, len(valid_specs), THUMB_BATCH_MAX_INPUTS):
+        chunk = valid_specs[start:start + THUMB_BATCH_MAX_INPUTS]
+        input_args: List[str] = []
+        output_args: List[str] = []
+        output_paths: List[Path] = []
+        for index, (_, video_path, duration, clip_id) in enumerate(chunk):
+            timestamp_str = f"{max(0.01, duration * time_percent):.4f}"
+            seek_args, video_filter = _static_frame_args(
+                duration, timestamp_str, target_size[0]
+            )
+            if clip_id is None:
+                _migrate_legacy_path_outputs(output_dir, str(video_path))
+            output_path = output_dir / _get_thumbnail_filename(
+                str(video_path), clip_id
+            )
+            # Write to a temp name and swap it in below, so the previous
+            # thumbnail survives a failed run; a leftover temp file would look
+            # like output
+            temp_path = _temp_output_path(output_path)
+            temp_path.unlink(missing_ok=True)
+            input_args += [
+                *_hwaccel_args(), *_input_thread_args(), *seek_args,
+                "-i", str(video_path),
+            ]
+            output_args += [
+                "-map", f"{index}:v:0",
+                "-frames:v", "1",
+                "-vf", video_filter,
+                *encoder_args,
+                "-update", "1",
+                str(temp_path),
+            ]
+            output_paths.append(output_path)
+
+        ffmpeg_batch_command = [
+            FFMPEG_COMMAND, "-loglevel", "error", "-y",
+            *_global_thread_args(), *input_args, *output_args,
+        ]
+        try:
+            subprocess.run(
+                ffmpeg_batch_command, capture_output=True, check=False
+            )
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"'{FFMPEG_COMMAND}' command not found. "
+                f"Ensure FFmpeg is installed and '{FFMPEG_COMMAND}' is in"
+                " your PATH."
+            )
+
+        for spec, output_path in zip(chunk, output_paths):
+            spec_index, video_path, duration, clip_id = spec
+            temp_path = _temp_output_path(output_path)
+            if temp_path.exists() and temp_path.stat().st_size > 0:
+                os.replace(temp_path, output_path)
+                results[spec_index] = output_path
+                continue
+            temp_path.unlink(missing_ok=True)
+            # Batch did not produce this one; fall back to a dedicated
+            # invocation
+            try:
+                results[spec_index] = generate_thumbnail(
+                    video_path,
+                    duration=duration,
+                    clip_id=clip_id,
+                    output_dir=output_dir,
+                    target_size=target_size,
+                    quality=quality,
+                    time_percent=time_percent,
+                )
+            except (ThumbnailError, ValueError) as e:
+                print(
+                    f"  Error generating thumbnail for {video_path.name}: {e}",
+                    file=sys.stderr,
+                )
+
+    return results
+
 
 def generate_animated_preview(
     video_path: Path,
@@ -207,7 +645,7 @@ def generate_animated_preview(
     output_dir: Optional[Path] = None,
 ) -> Optional[Path]:
     """
-    Generates an animated GIF preview for a video file.
+    Generates an animated WebP preview for a video file.
 
     Args:
         video_path: Path to the input video file.
@@ -231,80 +669,438 @@ def generate_animated_preview(
     if output_dir is None:
         output_dir = _get_thumbnail_dir()
     else:
-        output_dir.mkdir(parents=True, exist_ok=True)
+        _ensure_dir(output_dir)
 
     start_time_s = max(0.01, duration * ANIM_TIME_PERCENT)
+    if clip_id is None:
+        _migrate_legacy_path_outputs(output_dir, str(video_path))
     anim_filename = _get_animated_preview_filename(str(video_path), clip_id)
     output_path = output_dir / anim_filename
+    # A failed run keeps the old preview
+    temp_path = _temp_output_path(output_path)
 
-    # Two-pass ffmpeg command for optimized GIF
-    # Pass 1: Generate palette
-    # Pass 2: Use palette to generate GIF
-    # Simpler one-pass with split for palettegen/paletteuse in one command
-    vf_string = (
-        f"fps={ANIM_FPS},scale={ANIM_WIDTH_PX}:-1:flags=lanczos,"
-        f"split[s0][s1];[s0]palettegen=stats_mode=diff[p];[s1][p]paletteuse"
-    )
+    # WebP keeps full colour, so no palettegen/paletteuse pass is needed
+    vf_string = f"fps={ANIM_FPS},scale={ANIM_WIDTH_PX}:-1:flags=lanczos"
 
-    ffmpeg_gif_command = [
+    ffmpeg_anim_command = [
         FFMPEG_COMMAND,
+        *_global_thread_args(),
+        *_hwaccel_args(),
+        *_input_thread_args(),
         "-ss", f"{start_time_s:.4f}",
         "-t", f"{ANIM_DURATION_S:.4f}",
         "-i", str(video_path),
         "-vf", vf_string,
-        "-loop", str(ANIM_LOOP_COUNT),
+        *_webp_encoder_args(),
         "-an",  # No audio
-        "-gifflags", "+transdiff", # Optimize transparency changes
-        "-y", # Overwrite output file if it exists
+        "-y",  # Overwrite a leftover temp file
         "-loglevel", "error",
-        str(output_path)
+        str(temp_path)
     ]
-    
-    # print(f"Attempting to generate animated GIF: {' '.join(ffmpeg_gif_command)}")
+
+    # print(f"Generating animated preview: {' '.join(ffmpeg_anim_command)}")
 
     try:
         process = subprocess.run(
-            ffmpeg_gif_command,
-            capture_output=True, # Get stdout/stderr
-            text=True, # Decode output as text
-            check=False # Don't raise exception for non-zero exit, handle manually
+            ffmpeg_anim_command,
+            capture_output=True,  # Get stdout/stderr
+            text=True,  # Decode output as text
+            check=False  # Handle non-zero exit below instead of raising
         )
         if process.returncode != 0:
-            error_msg = process.stderr.strip() if process.stderr else "Unknown ffmpeg error during GIF generation."
+            error_msg = (
+                process.stderr.strip() if process.stderr else
+                "Unknown ffmpeg error during animated preview generation."
+            )
             # Clean up potentially incomplete file
-            if output_path.exists():
-                try: output_path.unlink()
-                except OSError: pass
+            temp_path.unlink(missing_ok=True)
             raise ThumbnailError(
                 f"ffmpeg failed to generate animated preview for {video_path} at {start_time_s:.4f}s. "
                 f"Return code: {process.returncode}. Error: {error_msg}"
             )
-        
-        if not output_path.exists() or output_path.stat().st_size == 0:
-            # Clean up empty file
-            if output_path.exists():
-                try: output_path.unlink()
-                except OSError: pass
-            raise ThumbnailError(f"ffmpeg produced no output or an empty file for animated preview of {video_path}.")
 
+        if not temp_path.exists() or temp_path.stat().st_size == 0:
+            temp_path.unlink(missing_ok=True)  # Clean up empty file
+            raise ThumbnailError(
+                "ffmpeg produced no output or an empty file for animated"
+                f" preview of {video_path}."
+            )
+
+        os.replace(temp_path, output_path)
         # print(f"Generated animated preview: {output_path}")
         return output_path
 
-    except FileNotFoundError: # Specifically for FFMPEG_COMMAND not found
+    except FileNotFoundError:  # Specifically for FFMPEG_COMMAND not found
         raise FileNotFoundError(
             f"'{FFMPEG_COMMAND}' command not found. "
-            f"Ensure FFmpeg is installed and '{FFMPEG_COMMAND}' is in your PATH."
+            f"Ensure FFmpeg is installed and '{FFMPEG_COMMAND}' is in"
+            " your PATH."
         )
     except Exception as e:
         # Clean up potentially incomplete file
-        if output_path.exists():
-            try: output_path.unlink()
-            except OSError: pass
+        try:
+            temp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
 
-        if isinstance(e, ThumbnailError) or isinstance(e, FileNotFoundError): # Re-raise specific caught errors
+        # Re-raise specific caught errors
+        if isinstance(e, ThumbnailError) or isinstance(e, FileNotFoundError):
             raise
-        else: # Wrap other exceptions
-            raise ThumbnailError(f"An unexpected error occurred generating animated preview for {video_path}: {e}") from e
+        else:  # Wrap other exceptions
+            raise ThumbnailError(
+                "An unexpected error occurred generating animated preview"
+                f" for {video_path}: {e}"
+            ) from e
+
+
+def generate_thumbnail_and_preview(
+    video_path: Path,
+    duration: Optional[float] = None,
+    clip_id: Optional[int] = None,
+    output_dir: Optional[Path] = None,
+    target_size: Tuple[int, int] = THUMBNAIL_SIZE,
+    quality: int = THUMBNAIL_QUALITY,
+) -> Tuple[Path, Path]:
+    """
+    Generates the static thumbnail and the animated preview from one decode.
+
+    The preview segment is decoded once and split: the first frame becomes the
+    JPEG thumbnail, the rest feeds the animated WebP.
+
+    Args:
+        video_path: Path to the input video file.
+        duration: Duration of the video in seconds (required to calculate
+            time).
+        clip_id: The primary key ID of the clip in the database (optional,
+            for filename).
+        output_dir: The directory to save outputs (defaults to
+            THUMBNAIL_DIR_NAME).
+        target_size: Desired thumbnail size (width, height), maintains aspect
+            ratio.
+        quality: JPEG quality (1-95).
+
+    Returns:
+        A tuple of (thumbnail_path, animated_preview_path).
+
+    Raises:
+        ThumbnailError: If ffmpeg fails or produces an empty output.
+        FileNotFoundError: If ffmpeg executable or video_path is not found.
+        ValueError: If duration is None or invalid.
+    """
+    if not video_path.is_file():
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+    if duration is None or duration <= 0:
+        raise ValueError(
+            f"Invalid or missing duration ({duration}) for {video_path}."
+            " Cannot calculate timestamp."
+        )
+
+    if output_dir is None:
+        output_dir = _get_thumbnail_dir()
+    else:
+        _ensure_dir(output_dir)
+
+    start_time_s = max(0.01, duration * ANIM_TIME_PERCENT)
+    if clip_id is None:
+        _migrate_legacy_path_outputs(output_dir, str(video_path))
+    thumb_name, anim_name = _get_output_filenames(str(video_path), clip_id)
+    thumb_path = output_dir / thumb_name
+    anim_path = output_dir / anim_name
+    # ffmpeg writes temp files that replace the outputs only once both are
+    # good, so a failed run keeps the previous thumbnail and preview
+    temp_thumb_path = _temp_output_path(thumb_path)
+    temp_anim_path = _temp_output_path(anim_path)
+
+    filter_graph = (
+        "[0:v]split=2[a][b];"
+        f"[a]select='eq(n\\,0)',scale={target_size[0]}:-2[thumb];"
+        f"[b]fps={ANIM_FPS},scale={ANIM_WIDTH_PX}:-1:flags=lanczos[anim]"
+    )
+    ffmpeg_fused_command = [
+        FFMPEG_COMMAND,
+        "-loglevel", "error",
+        "-y",  # Overwrite leftover temp files
+        *_global_thread_args(),
+        *_hwaccel_args(),
+        *_input_thread_args(),
+        "-ss", f"{start_time_s:.4f}",
+        "-t", f"{ANIM_DURATION_S:.4f}",
+        "-i", str(video_path),
+        "-filter_complex", filter_graph,
+        "-map", "[thumb]", "-frames:v", "1", *_jpeg_encoder_args(quality),
+        "-update", "1", str(temp_thumb_path),
+        "-map", "[anim]", *_webp_encoder_args(), str(temp_anim_path),
+    ]
+
+    def _cleanup() -> None:
+        for path in (temp_thumb_path, temp_anim_path):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    try:
+        process = subprocess.run(
+            ffmpeg_fused_command, capture_output=True, text=True, check=False
+        )
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"'{FFMPEG_COMMAND}' command not found. "
+            f"Ensure FFmpeg is installed and '{FFMPEG_COMMAND}' is in"
+            " your PATH."
+        )
+
+    if process.returncode != 0:
+        _cleanup()
+        error_msg = (
+            process.stderr.strip() if process.stderr else
+            "Unknown ffmpeg error"
+        )
+        raise ThumbnailError(
+            "ffmpeg failed to generate thumbnail and preview for"
+            f" {video_path} at {start_time_s:.4f}s."
+            f" Return code: {process.returncode}. Error: {error_msg}"
+        )
+    outputs = ((thumb_path, temp_thumb_path), (anim_path, temp_anim_path))
+    for path, temp_path in outputs:
+        if not temp_path.exists() or temp_path.stat().st_size == 0:
+            _cleanup()
+            raise ThumbnailError(
+                "ffmpeg produced no output or an empty file"
+                f" ({path.name}) for {video_path}."
+            )
+
+    os.replace(temp_thumb_path, thumb_path)
+    os.replace(temp_anim_path, anim_path)
+    return thumb_path, anim_path
+
+
+def _process_clip_chunk(
+    clips: List[Tuple[int, str, float, bool, bool]],
+    base_output_dir: Path,
+    threads: int = 1,
+) -> List[dict]:
+    """
+    Generates the static thumbnails and animated previews for a chunk of clips.
+
+    Runs in a worker process, so it never touches the database; the caller
+    applies the returned thumbnail_path values. Clips needing both outputs use
+    one fused decode; static-only clips are extracted via
+    generate_thumbnails_batch.
+
+    Args:
+        clips: (clip_id, path, db_duration, has_static, has_anim) for each
+            clip in the chunk; has_* say whether a usable output already
+            exists (always False when regenerating).
+        base_output_dir: Directory the thumbnails and previews are written to.
+        threads: Concurrent ffmpeg runs for this chunk (1 or 2); static-only
+            batches and previews run side by side when above 1.
+
+    Returns:
+        One dict per clip with clip_id, thumbnail_path (newly generated,
+        else None), jpeg/webp (bytes of newly generated outputs when
+        PACK_THUMBNAILS, else None), ok (overall success) and messages
+        (warnings/errors to report).
+    """
+    results: List[dict] = []
+    pending: List[dict] = []
+
+    # Pass 1: probe durations and work out what each clip needs
+    for clip_id, path_str, duration, has_static, has_anim in clips:
+        video_path = Path(path_str)
+        result = {
+            "clip_id": clip_id, "thumbnail_path": None, "jpeg": None,
+            "webp": None, "ok": False, "messages": [],
+        }
+        results.append(result)
+        try:
+            current_duration: Optional[float] = None
+            try:
+                current_duration = get_video_duration(video_path)
+                if current_duration is None or current_duration <= 0:
+                    current_duration = None  # Ensure it's None if invalid
+                    result["messages"].append(
+                        f"  Warning: Could not get valid duration for "
+                        f"{video_path.name} (ID: {clip_id}). "
+                        f"Animated preview skipped.")
+            except (FFprobeError, ValueError) as e:
+                result["messages"].append(
+                    f"  Error getting duration for {video_path.name} "
+                    f"(ID: {clip_id}): {e}. Animated preview skipped.")
+                current_duration = None
+
+            pending.append({
+                "result": result,
+                "video_path": video_path,
+                "current_duration": current_duration,
+                # Use an actual duration if available, otherwise the DB
+                # duration for static frame extraction
+                "duration_for_static": current_duration or duration,
+                "needs_static": not has_static,
+                "needs_anim": bool(current_duration) and not has_anim,
+            })
+        except Exception as e:  # Catch-all for this specific clip
+            result["messages"].append(
+                f"  Major unexpected error processing clip ID {clip_id} "
+                f"({video_path.name}): {e}")
+
+    def generate_statics() -> Dict[int, Optional[Path]]:
+        # Static-only clips, in as few ffmpeg runs as possible
+        static_specs = [
+            (item["video_path"], item["duration_for_static"],
+             item["result"]["clip_id"])
+            for item in pending
+            if item["needs_static"] and not item["needs_anim"]
+        ]
+        if not static_specs:
+            return {}
+        try:
+            batch_paths = generate_thumbnails_batch(
+                static_specs, output_dir=base_output_dir)
+            return {clip_id: path for (_, _, clip_id), path
+                    in zip(static_specs, batch_paths)}
+        except FileNotFoundError as e:
+            for item in pending:
+                if item["needs_static"] and not item["needs_anim"]:
+                    item["result"]["messages"].append(
+                        f"  Error during static thumbnail generation for "
+                        f"{item['video_path'].name}: {e}")
+            return {}
+
+    def generate_anims(
+    ) -> Tuple[Dict[int, Optional[Path]], Dict[int, Optional[Path]]]:
+        # Clips needing both outputs share one decode; the rest only get a
+        # preview
+        fused_static_paths: Dict[int, Optional[Path]] = {}
+        anim_paths: Dict[int, Optional[Path]] = {}
+        for item in pending:
+            if not item["needs_anim"]:
+                continue
+            clip_id = item["result"]["clip_id"]
+            video_path = item["video_path"]
+            anim_paths[clip_id] = None
+            if item["needs_static"]:
+                fused_static_paths[clip_id] = None
+                try:
+                    static_path, anim_path = generate_thumbnail_and_preview(
+                        video_path,
+                        duration=item["current_duration"],
+                        clip_id=clip_id,
+                        output_dir=base_output_dir
+                    )
+                    fused_static_paths[clip_id] = static_path
+                    anim_paths[clip_id] = anim_path
+                    continue
+                except (ThumbnailError, ValueError):
+                    # Some inputs choke on the fused graph; retry as
+                    # separate runs
+                    try:
+                        fused_static_paths[clip_id] = generate_thumbnail(
+                            video_path,
+                            duration=item["duration_for_static"],
+                            clip_id=clip_id,
+                            output_dir=base_output_dir
+                        )
+                    except (ThumbnailError, ValueError) as e:
+                        item["result"]["messages"].append(
+                            f"  Error during static thumbnail generation for "
+                            f"{video_path.name}: {e}")
+                except FileNotFoundError as e:
+                    item["result"]["messages"].append(
+                        f"  Error during thumbnail generation for "
+                        f"{video_path.name}: {e}")
+                    continue
+            try:
+                anim_paths[clip_id] = generate_animated_preview(
+                    video_path,
+                    duration=item["current_duration"],
+                    clip_id=clip_id,
+                    output_dir=base_output_dir
+                )
+                if not anim_paths[clip_id]:
+                    item["result"]["messages"].append(
+                        f"  Failed to generate animated preview for "
+                        f"{video_path.name} (generation returned None or "
+                        f"empty file).")
+            except (ThumbnailError, FileNotFoundError, ValueError) as e:
+                item["result"]["messages"].append(
+                    f"  Error during animated preview generation for "
+                    f"{video_path.name}: {e}")
+        return fused_static_paths, anim_paths
+
+    # Pass 2: static-only batches and previews (fused with the static frame
+    # where both are needed) are independent decodes. The caller sizes
+    # threads so the process pool and these runs together fit the cores
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            static_future = executor.submit(generate_statics)
+            anim_future = executor.submit(generate_anims)
+            static_paths = static_future.result()
+            fused_static_paths, anim_paths = anim_future.result()
+    else:
+        static_paths = generate_statics()
+        fused_static_paths, anim_paths = generate_anims()
+    static_paths.update(fused_static_paths)
+
+    # Pass 3: final accounting
+    for item in pending:
+        result = item["result"]
+        clip_id = result["clip_id"]
+        video_path = item["video_path"]
+        current_duration = item["current_duration"]
+        try:
+            static_thumbnail_processed_ok = False
+            animated_preview_processed_ok = False
+
+            # 1. Static Thumbnail
+            if item["needs_static"]:
+                generated_static_path = static_paths.get(clip_id)
+                # Generators only return non-empty outputs
+                if generated_static_path:
+                    result["thumbnail_path"] = str(
+                        generated_static_path.relative_to(Path.cwd()))
+                    if PACK_THUMBNAILS:
+                        result["jpeg"] = generated_static_path.read_bytes()
+                    static_thumbnail_processed_ok = True
+                else:
+                    result["messages"].append(
+                        f"  Failed to generate static thumbnail for "
+                        f"{video_path.name} (generation returned None or "
+                        f"empty file).")
+            else:
+                # Exists and not forcing regeneration
+                static_thumbnail_processed_ok = True
+
+            # 2. Animated Preview (only when duration is valid)
+            if item["needs_anim"]:
+                generated_anim_path = anim_paths.get(clip_id)
+                if generated_anim_path is not None:
+                    if PACK_THUMBNAILS:
+                        result["webp"] = generated_anim_path.read_bytes()
+                    animated_preview_processed_ok = True
+            else:
+                # Exists already, or no valid duration so the preview is not
+                # applicable. Consider it "processed_ok" for the sake of
+                # overall clip success if static is fine.
+                animated_preview_processed_ok = True
+
+            # --- Final Accounting for the clip ---
+            if static_thumbnail_processed_ok and animated_preview_processed_ok:
+                result["ok"] = True
+            else:
+                result["messages"].append(
+                    f"  Error processing clip ID {clip_id}: "
+                    f"Static OK={static_thumbnail_processed_ok}, "
+                    f"Anim OK={animated_preview_processed_ok} "
+                    f"(Duration valid: {bool(current_duration)})")
+
+        except Exception as e:  # Catch-all for this specific clip
+            result["messages"].append(
+                f"  Major unexpected error processing clip ID {clip_id} "
+                f"({video_path.name}): {e}")
+
+    return results
+
 
 def process_thumbnails(
     db_path: Path = get_default_db_path(),
@@ -317,7 +1113,8 @@ def process_thumbnails(
     Args:
         db_path: Path to the SQLite database.
         limit: Maximum number of thumbnails to generate in one run (optional).
-        force_regenerate: If True, regenerate thumbnails even if they exist (optional).
+        force_regenerate: If True, regenerate thumbnails even if they exist
+            (optional).
 
     Returns:
         A tuple containing (success_count, error_count).
@@ -325,16 +1122,19 @@ def process_thumbnails(
     conn = None
     success_count = 0
     error_count = 0
-    base_output_dir = _get_thumbnail_dir(db_path.parent) # Store thumbs relative to DB location
+    pending_updates: List[Tuple[str, int]] = []
+    pending_blobs: List[Tuple[int, Optional[bytes], Optional[bytes]]] = []
+    succeeded_ids = set()  # Clips counted in success_count
+    failed_update_ids: List[int] = []
+    # Store thumbs relative to DB location
+    base_output_dir = _get_thumbnail_dir(db_path.parent)
 
     print(f"Processing missing thumbnails (DB: {db_path})...")
 
     try:
+        # One connection for the whole run; updates are committed in batches
         conn = get_db_connection(db_path)
-        # Use a separate cursor for updates within the loop
-        conn.isolation_level = None # Autocommit mode for updates
         read_cursor = conn.cursor()
-        update_cursor = conn.cursor()
 
         query = """
             SELECT id, path, duration
@@ -342,134 +1142,144 @@ def process_thumbnails(
             WHERE duration IS NOT NULL AND duration > 0
         """
         if not force_regenerate:
-            query += " AND thumbnail_path IS NULL"
+            query += " AND thumbnail_path IS NULL AND NOT file_missing"
 
+        params: Tuple = ()
         if limit is not None and limit > 0:
-            query += f" LIMIT {limit}"
+            query += " LIMIT ?"
+            params = (limit,)
 
-        read_cursor.execute(query)
+        read_cursor.execute(query, params)
 
-        row = read_cursor.fetchone()
-        while row is not None:
-            clip_id, path_str, duration = row['id'], row['path'], row['duration']
-            video_path = Path(path_str)
-            print(f"- Processing clip ID {clip_id}: {video_path.name}")
+        # Stream rows straight into column arrays (struct-of-arrays) instead of
+        # holding Row objects, with a single stat pass so moved/deleted files
+        # never reach ffmpeg
+        ids: List[int] = []
+        paths: List[str] = []
+        durations = array('d')
+        missing: List[Tuple[int, str]] = []
+        while True:
+            rows = read_cursor.fetchmany(THUMB_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for clip_id, path_str, duration in rows:
+                if os.path.isfile(path_str):
+                    ids.append(clip_id)
+                    paths.append(path_str)
+                    durations.append(duration)
+                else:
+                    missing.append((clip_id, path_str))
+        if missing:
+            print(f"  Warning: {len(missing)} video file(s) not found, "
+                  f"skipping:", file=sys.stderr)
+            for clip_id, path_str in missing:
+                print(f"    - {path_str} (ID: {clip_id})", file=sys.stderr)
+            error_count += len(missing)
+            # Flag them in one statement so later runs stop re-selecting them
+            # (a flag rather than a thumbnail_path sentinel, which the web UI,
+            # TUI and hasher would treat as a real file); rescans clear it
+            conn.executemany(
+                "UPDATE clips SET file_missing = 1 WHERE id = ?",
+                [(clip_id,) for clip_id, _ in missing],
+            )
+            conn.commit()
 
-            if not video_path.exists():
-                print(f"  Warning: Video file not found: {video_path}. Skipping.", file=sys.stderr)
-                error_count += 1
-                row = read_cursor.fetchone() # Move to next row
-                continue
+        # Warnings/errors are buffered and flushed once at the end, not per
+        # clip
+        messages: List[str] = []
+        progress = None
+        if tqdm:
+            progress = tqdm(total=len(ids), desc="Thumbnails", unit="clip")
+        done = 0  # Clips finished, for the plain progress line without tqdm
 
-            try:
-                # Check for existing static thumbnail
-                static_thumb_name = _get_thumbnail_filename(str(video_path), clip_id)
-                static_thumb_path = base_output_dir / static_thumb_name
-                # Ensure we use the most up-to-date existence check after potential generation
-                # static_thumb_exists_initially = static_thumb_path.exists() and static_thumb_path.stat().st_size > 0
-
-                # Check for existing animated preview
-                anim_preview_name = _get_animated_preview_filename(str(video_path), clip_id)
-                anim_preview_path = base_output_dir / anim_preview_name
-                # anim_preview_exists_initially = anim_preview_path.exists() and anim_preview_path.stat().st_size > 0
-                
-                current_duration: Optional[float] = None
-                try:
-                    current_duration = get_video_duration(video_path)
-                    if current_duration is None or current_duration <= 0:
-                        current_duration = None # Ensure it's None if invalid
-                        print(f"  Warning: Could not get valid duration for {video_path.name} (ID: {clip_id}). Animated preview will be skipped.")
-                except (FFprobeError, ValueError) as e:
-                    print(f"  Error getting duration for {video_path.name} (ID: {clip_id}): {e}. Animated preview will be skipped.")
-                    current_duration = None
-
-                # --- Generation Logic ---
-                static_thumbnail_processed_ok = False
-                animated_preview_processed_ok = False
-
-                # Determine if we need to generate (or regenerate)
-                needs_static_generation = force_regenerate or not (static_thumb_path.exists() and static_thumb_path.stat().st_size > 0)
-                needs_anim_generation = current_duration and (force_regenerate or not (anim_preview_path.exists() and anim_preview_path.stat().st_size > 0))
-
-                # 1. Process Static Thumbnail
-                if needs_static_generation:
-                    print(f"  Generating static thumbnail for: {video_path.name} (ID: {clip_id})")
+        # One directory read replaces per-clip exists()/stat() calls on outputs
+        existing_outputs = set()
+        if not force_regenerate:
+            with os.scandir(base_output_dir) as entries:
+                for entry in entries:
                     try:
-                        # Use an actual duration if available, otherwise a sensible default for static frame extraction
-                        duration_for_static = current_duration if current_duration and current_duration > 0 else 1.0 
-                        generated_static_path = generate_thumbnail(
-                            video_path,
-                            duration=duration_for_static,
-                            clip_id=clip_id,
-                            output_dir=base_output_dir
-                        )
-                        if generated_static_path and generated_static_path.exists() and generated_static_path.stat().st_size > 0:
-                            update_cursor.execute("BEGIN")
-                            update_cursor.execute(
-                                "UPDATE clips SET thumbnail_path = ? WHERE id = ?",
-                                (str(generated_static_path.relative_to(Path.cwd())), clip_id)
-                            )
-                            update_cursor.execute("COMMIT")
-                            static_thumbnail_processed_ok = True
-                            print(f"    Static thumbnail generated: {generated_static_path.name}")
-                        else:
-                            print(f"    Failed to generate static thumbnail for {video_path.name} (generation returned None or empty file).")
-                            static_thumbnail_processed_ok = False
-                    except (ThumbnailError, FileNotFoundError, ValueError, sqlite3.Error) as e:
-                        print(f"    Error during static thumbnail generation/DB update for {video_path.name}: {e}")
-                        if conn: conn.rollback()
-                        static_thumbnail_processed_ok = False
-                else:
-                    # print(f"  Static thumbnail already exists for {video_path.name} (ID: {clip_id}).")
-                    static_thumbnail_processed_ok = True # Exists and not forcing regeneration
-
-                # 2. Process Animated Preview (only if static is OK and duration is valid)
-                if current_duration:
-                    if needs_anim_generation:
-                        if static_thumbnail_processed_ok: # Only proceed if static part is fine
-                            print(f"  Generating animated preview for: {video_path.name} (ID: {clip_id})")
-                            try:
-                                generated_anim_path = generate_animated_preview(
-                                    video_path,
-                                    duration=current_duration,
-                                    clip_id=clip_id,
-                                    output_dir=base_output_dir
-                                )
-                                if generated_anim_path and generated_anim_path.exists() and generated_anim_path.stat().st_size > 0:
-                                    animated_preview_processed_ok = True
-                                    print(f"    Animated preview generated: {generated_anim_path.name}")
-                                else:
-                                    print(f"    Failed to generate animated preview for {video_path.name} (generation returned None or empty file).")
-                                    animated_preview_processed_ok = False
-                            except (ThumbnailError, FileNotFoundError, ValueError) as e:
-                                print(f"    Error during animated preview generation for {video_path.name}: {e}")
-                                animated_preview_processed_ok = False
+                        if entry.is_file() and entry.stat().st_size > 0:
+                            existing_outputs.add(entry.name)
+                    except OSError:
+                        pass  # Vanished between listing and stat
+
+        # Clips are independent ffmpeg jobs, so fan chunks of them out across
+        # up to THUMB_MAX_WORKERS processes; each chunk extracts its static
+        # frames with batched ffmpeg runs. No clips to process means no pool
+        # at all
+        if ids:
+            cpus = os.cpu_count() or 1
+            workers = min(THUMB_MAX_WORKERS, cpus, len(ids))
+            # Cores the process pool leaves idle go to a second ffmpeg run
+            # per chunk; a pool that fills every core runs chunks serially
+            threads = max(1, min(2, cpus // workers))
+            chunk_size = max(
+                1, min(THUMB_BATCH_MAX_INPUTS, -(-len(ids) // workers)))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_use_single_threaded_ffmpeg,
+            ) as executor:
+                futures = {}
+                for start in range(0, len(ids), chunk_size):
+                    stop = min(start + chunk_size, len(ids))
+                    chunk = []
+                    for i in range(start, stop):
+                        thumb_name, anim_name = _get_output_filenames(
+                            paths[i], ids[i])
+                        chunk.append((
+                            ids[i], paths[i], durations[i],
+                            thumb_name in existing_outputs,
+                            anim_name in existing_outputs,
+                        ))
+                    future = executor.submit(
+                        _process_clip_chunk, chunk, base_output_dir, threads
+                    )
+                    futures[future] = chunk
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        # Worker process died or result could not be returned
+                        for clip_id, path_str, *_ in chunk:
+                            messages.append(
+                                f"  Major unexpected error processing clip "
+                                f"ID {clip_id} ({Path(path_str).name}): {e}")
+                        error_count += len(chunk)
+                        chunk_results = []
+                    for result in chunk_results:
+                        messages.extend(result["messages"])
+                        if result["thumbnail_path"] is not None:
+                            pending_updates.append(
+                                (result["thumbnail_path"], result["clip_id"]))
+                        if (result["jpeg"] is not None
+                                or result["webp"] is not None):
+                            pending_blobs.append((result["clip_id"],
+                                                  result["jpeg"],
+                                                  result["webp"]))
+                        if result["ok"]:
+                            success_count += 1
+                            succeeded_ids.add(result["clip_id"])
                         else:
-                            print(f"  Skipping animated preview for {video_path.name} as static thumbnail processing failed or was skipped.")
-                            animated_preview_processed_ok = False # Cannot generate if static failed
+                            error_count += 1
+                    pending = max(len(pending_updates), len(pending_blobs))
+                    if pending >= THUMB_DB_BATCH_SIZE:
+                        failed_update_ids += _flush_thumbnail_updates(
+                            conn, pending_updates, pending_blobs
+                        )
+                    if progress is not None:
+                        progress.update(len(chunk))
                     else:
-                        # print(f"  Animated preview already exists for {video_path.name} (ID: {clip_id}).")
-                        animated_preview_processed_ok = True # Exists and not forcing regeneration
-                else:
-                    # No valid duration, so animated preview is not applicable.
-                    # Consider it "processed_ok" for the sake of overall clip success if static is fine.
-                    # print(f"  Skipping animated preview for {video_path.name} due to invalid/missing duration.")
-                    animated_preview_processed_ok = True 
-
-                # --- Final Accounting for the clip ---
-                if static_thumbnail_processed_ok and animated_preview_processed_ok:
-                    success_count += 1
-                    # print(f"  Successfully processed clip ID {clip_id}")
-                else:
-                    error_count += 1
-                    print(f"  Error processing clip ID {clip_id}: Static OK={static_thumbnail_processed_ok}, Anim OK={animated_preview_processed_ok} (Duration valid: {bool(current_duration)})")
-
-            except Exception as e: # Catch-all for unexpected errors for this specific clip
-                 print(f"  Major unexpected error processing clip ID {clip_id} ({video_path.name}): {e}", file=sys.stderr)
-                 error_count += 1
+                        done += len(chunk)
+                        print(f"  Thumbnails: {done}/{len(ids)}", end="\r",
+                              file=sys.stderr, flush=True)
 
-            # Fetch next row before potentially long processing
-            row = read_cursor.fetchone()
+        if progress is not None:
+            progress.close()
+        elif ids:
+            print(file=sys.stderr)  # End the progress line
+        if messages:
+            print("\n".join(messages), file=sys.stderr)
 
     except sqlite3.Error as e:
         print(f"Database error during thumbnail processing: {e}", file=sys.stderr)
@@ -477,6 +1287,14 @@ def process_thumbnails(
         print(f"An unexpected error occurred: {e}", file=sys.stderr)
     finally:
         if conn:
+            failed_update_ids += _flush_thumbnail_updates(
+                conn, pending_updates, pending_blobs
+            )
+            # Clips counted as successes whose thumbnail_path never landed in
+            # the DB become errors; failed clips were already counted as such
+            moved = len(succeeded_ids.intersection(failed_update_ids))
+            success_count -= moved
+            error_count += moved
             conn.close()
             print("Database connection closed.")
 
@@ -487,6 +1305,7 @@ def process_thumbnails(
 # Note: This requires a real video file, ffmpeg installed, and ideally
 # a database entry created by the scanner to have duration and ID.
 
+
 if __name__ == "__main__":
     from pathlib import Path
     import sys
@@ -498,4 +1317,4 @@ if __name__ == "__main__":
     success, error = process_thumbnails(db_path=db_path, force_regenerate=False)
     print(f"Thumbnail processing complete. Success: {success}, Errors: {error}")
 
-# """ 
\ No newline at end of file
+# """
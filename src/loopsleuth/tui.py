@@ -1,17 +1,23 @@
 """Textual User Interface for LoopSleuth."""
 
+import re
 import sys
 import sqlite3
 import subprocess
+import threading
+import functools
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-import os
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-# Adjust import path
-SCRIPTS_DIR = Path(__file__).parent.resolve()
-SRC_DIR = SCRIPTS_DIR.parent
-if str(SRC_DIR) not in sys.path:
-    sys.path.append(str(SRC_DIR))
+# Adjust import path, only when run from a checkout (e.g.
+# python -m src.loopsleuth.tui); imported as loopsleuth.tui, the package is
+# already importable
+if __package__ != "loopsleuth":
+    SCRIPTS_DIR = Path(__file__).parent.resolve()
+    SRC_DIR = SCRIPTS_DIR.parent
+    if str(SRC_DIR) not in sys.path:
+        sys.path.append(str(SRC_DIR))
 
 from textual.app import App, ComposeResult
 from textual.containers import Container, VerticalScroll, Horizontal
@@ -19,229 +25,478 @@ from textual.widgets import Header, Footer, Static, Input, Button
 from textual.reactive import reactive
 from textual.events import Key
 from textual.screen import ModalScreen
-from textual import events # Import events
-from textual.geometry import Region # Import Region
+from textual import events  # Import events
+from textual import work
+from textual.timer import Timer
+from textual.worker import Worker, get_current_worker
 
 # Import database functions and default path
-from loopsleuth.db import get_db_connection, get_default_db_path
+from loopsleuth.db import (
+    apply_pragmas, get_db_connection, get_default_db_path,
+)
 # Import the exporter function
 from loopsleuth.exporter import export_starred_clips
 
+# ClipCard markup, precompiled so a repaint is a single %-format
+_STAR_ON = "[b green]★[/]"
+_STAR_OFF = "[dim]☆[/]"
+# The Image widget isn't available, so the first line is a thumbnail
+# placeholder
+_INFO_TEMPLATE = (
+    "[dim]No Thumbnail (Image widget unavailable)[/dim]\n"
+    "[b]%s[/b]\n{star} ID: %s\nTags: {tags}"
+)
+# One template per (starred, has tags) state, indexed by
+# (starred << 1) | has_tags
+_INFO_TEMPLATES = tuple(
+    _INFO_TEMPLATE.format(star=_STAR_ON if starred else _STAR_OFF,
+                          tags="%s" if has_tags else "--")
+    for starred in (False, True)
+    for has_tags in (False, True)
+)
+
+# Star/tag edits are coalesced and written in one transaction after this delay
+WRITE_DEBOUNCE_S = 0.25
+
+# Queued writes; the clip id is always the last parameter
+TOGGLE_STAR_SQL = "UPDATE clips SET starred = NOT starred WHERE id = ?"
+SET_TAGS_SQL = "UPDATE clips SET tags = ? WHERE id = ?"
+
+
+@dataclass(slots=True)
+class ClipRow:
+    """One clip's grid metadata, in the column order of ClipGrid's SELECT.
+
+    Rows are shared between ClipGrid.all_clips_data and the card showing them,
+    so star/tag edits mutate the row in place.
+    """
+    id: int
+    filename: str
+    thumbnail_path: Optional[str]
+    starred: bool
+    tags: Optional[str]
+
+
+# Splits on commas and swallows the whitespace around them in one pass
+_TAG_SPLIT = re.compile(r"\s*,\s*")
+
+
+@functools.lru_cache(maxsize=1024)
+def _normalize_tags(raw: str) -> str:
+    """Normalizes a comma-separated tag string to "a, b, c" (memoized)."""
+    return ", ".join(t for t in _TAG_SPLIT.split(raw.strip()) if t)
+
 
 class ClipCard(Static):
     """Widget to display information about a single video clip."""
 
     # Store the raw clip data dictionary
-    clip_data = reactive[Optional[Dict[str, Any]]](None)
-
-    DEFAULT_CSS = """
-    ClipCard {
-        border: round $primary;
-        /* Fixed height is important for scroll calculation */
-        height: 12; # Reduced height as there's no image placeholder needed now
-        layout: vertical;
-        padding: 1;
-        margin: 1;
-        width: 1fr;
-        /* Add transition for smoother loading appearance */
-        transition: opacity 300ms linear;
-    }
-    ClipCard > Static#info-text { /* Style the text part */
-        height: auto;
-        width: 100%;
-    }
-    ClipCard:focus {
-        border: thick $accent;
-        background: $accent-darken-1;
-    }
-    """
+    clip_data = reactive[Optional[ClipRow]](None)
+    # Editable fields get their own reactives so an edit only touches its field
+    starred = reactive(False, init=False, repaint=False)
+    tags = reactive("", init=False, repaint=False)
 
-    def __init__(self, clip_id: int, clip_data: Dict[str, Any], **kwargs):
-        # Assign a unique ID for easier querying
-        super().__init__(id=f"clip-card-{clip_id}", **kwargs)
-        # Set clip_data only after super().__init__ to trigger reactive update
-        self.clip_data = clip_data
-        self.can_focus = True # Make cards focusable
+    def __init__(self, clip_data: ClipRow, **kwargs):
+        # No per-clip widget ID: ClipGrid recycles cards for different clips
+        super().__init__(**kwargs)
+        self._markup_key: Optional[Tuple[Any, ...]] = None
+        self._cached_markup = ""
+        # set_reactive stores the data without firing watchers/refresh, and
+        # the markup is set once here, before the card is mounted
+        self._load_row(clip_data)
+        # The card renders its own markup; no child widgets to compose or
+        # lay out
+        self.update(self._info_markup())
+        self.can_focus = True  # Make cards focusable
+
+    def _load_row(self, clip_data: ClipRow) -> None:
+        """Points the card's reactives at clip_data without firing watchers."""
+        self.set_reactive(ClipCard.clip_data, clip_data)
+        self.set_reactive(ClipCard.starred, bool(clip_data.starred))
+        self.set_reactive(ClipCard.tags, clip_data.tags or "")
+
+    def show_clip(self, clip_data: ClipRow) -> None:
+        """Retargets this (recycled) card to another clip."""
+        # Equal rows (ClipRow compares by value) only need the reference
+        # swapped
+        unchanged = clip_data == self.clip_data
+        # update_display() below repaints explicitly, so skip the reactive
+        # refresh
+        self._load_row(clip_data)
+        if self.is_mounted and not unchanged:
+            self.update_display()
+
+    def watch_clip_data(
+        self, old: Optional[ClipRow], new: Optional[ClipRow]
+    ) -> None:
+        """Handles direct clip_data assignment; equal rows never reach here."""
+        if new is not None:
+            self._load_row(new)
+        if self.is_mounted:
+            self.update_display()
+
+    def watch_starred(self, starred: bool) -> None:
+        """Writes the new star state through to the shared row and repaints."""
+        if self.clip_data:
+            self.clip_data.starred = starred
+        if self.is_mounted:
+            self.update_display()
 
-    def compose(self) -> ComposeResult:
-        """Compose the clip card with thumbnail and text info."""
+    def watch_tags(self, tags: str) -> None:
+        """Writes the new tags through to the shared row and repaints."""
+        if self.clip_data:
+            self.clip_data.tags = tags
+        if self.is_mounted:
+            self.update_display()
+
+    def _info_markup(self) -> str:
+        """Returns the card markup, rebuilt only when displayed fields
+        change."""
         if not self.clip_data:
-            yield Static("[b]Error:[/b] No data.")
-            return  # Stop composing if no data
-
-        # Safely get data
-        clip_id = self.clip_data.get('id', 'N/A')
-        filename = self.clip_data.get('filename', 'Unknown')
-        starred = self.clip_data.get('starred', False)
-        tags = self.clip_data.get('tags', '')
-        thumb_rel = self.clip_data.get('thumbnail_path', None)
-
-        star_icon = "[b green]★[/]" if starred else "[dim]☆[/]"
-        tags_display = f"Tags: {tags}" if tags else "Tags: --"
-
-        # Fallback: show a placeholder (Image widget not available)
-        # If you upgrade Textual and the Image widget becomes available, you can restore thumbnail rendering here.
-        yield Static("[dim]No Thumbnail (Image widget unavailable)[/dim]", id="thumb-img")
-
-        # Show the text information
-        yield Static(
-            f"[b]{filename}[/b]\n"
-            f"{star_icon} ID: {clip_id}\n"
-            f"{tags_display}",
-            id="info-text"  # Add ID for clarity
+            self._markup_key = None
+            return "[b]Error:[/b] No data."
+        key = (
+            self.clip_data.id,
+            self.clip_data.filename,
+            bool(self.clip_data.starred),
+            self.clip_data.tags,
         )
+        if key != self._markup_key:
+            clip_id, filename, starred, tags = key
+            self._markup_key = key
+            tags = _normalize_tags(tags or "")
+            if tags:
+                self._cached_markup = _INFO_TEMPLATES[(starred << 1) | 1] % (
+                    filename, clip_id, tags)
+            else:
+                self._cached_markup = _INFO_TEMPLATES[starred << 1] % (
+                    filename, clip_id)
+        return self._cached_markup
 
     def update_display(self):
-        """Updates the text info part of the card."""
-        # Find the info Static widget and update its content
-        info_static = self.query_one("#info-text", Static)
-
-        # Rebuild the text content based on potentially updated self.clip_data
-        if self.clip_data:
-            clip_id = self.clip_data.get('id', 'N/A')
-            filename = self.clip_data.get('filename', 'Unknown')
-            starred = self.clip_data.get('starred', False)
-            tags = self.clip_data.get('tags', '')
-            star_icon = "[b green]★[/]" if starred else "[dim]☆[/]"
-            tags_display = f"Tags: {tags}" if tags else "Tags: --"
-
-            info_static.update(
-                f"[b]{filename}[/b]\n"
-                f"{star_icon} ID: {clip_id}\n"
-                f"{tags_display}"
-            )
-        else:
-            info_static.update("[b]Error:[/b] No data.")
+        """Updates the card's text from its current data."""
+        old_key = self._markup_key
+        markup = self._info_markup()
+        # Skip the Static update (and its repaint) when nothing visible changed
+        if self._markup_key is not None and self._markup_key == old_key:
+            return
+        self.update(markup)
 
 
 class ClipGrid(VerticalScroll):
-    """A scrollable container displaying ClipCards in a grid layout."""
-
-    DEFAULT_CSS = """
-    ClipGrid {
-        layout: grid;
-        grid-size: 3; /* Number of columns */
-        grid-gutter: 1 2; /* Vertical and horizontal spacing */
-        padding: 1;
-    }
     """
+    A scrollable, virtualized grid of ClipCards.
+
+    Only the rows intersecting the viewport (plus a few rows of over-scan)
+    have mounted cards; spacers above and below stand in for the rest so the
+    scrollbar reflects the full library. Cards scrolled out of the window are
+    recycled for the rows scrolling in, so the widget count stays
+    O(visible).
+    """
+
     # Store all clip data separately from mounted widgets
-    all_clips_data: List[Dict[str, Any]] = []
-    # Store grid geometry - Assume fixed for now, could be dynamic
+    all_clips_data: List[ClipRow] = []
+    # Grid geometry - fixed row height keeps the index math O(1)
     grid_cols: int = 3
-    card_height: int = 14 # Approx. height (ClipCard height 12 + margin 1*2)
+    card_height: int = 14  # ClipCard height 12 + margin 1*2
+    overscan_rows: int = 2  # Extra rows mounted above/below the viewport
+    fetch_batch_size: int = 64  # Rows per fetchmany() while loading metadata
 
-    def __init__(self, db_path: Path = get_default_db_path(), **kwargs):
+    def __init__(self, db_path: Path, **kwargs):
         super().__init__(**kwargs)
+        # The loader reads through its own connection, not the app's shared one
         self.db_path = db_path
+        self._cards: List[ClipCard] = []  # Mounted cards, in display order
+        # Index into all_clips_data shown by self._cards[0]
+        self._first_index = 0
+        # True once the first metadata load has been applied
+        self._loaded = False
+        # Same rows as all_clips_data, keyed by clip id
+        self._rows_by_id: Dict[int, ClipRow] = {}
+        # Fixed children, kept as references so scrolling never runs a DOM
+        # query
+        self._spacer_top = Static(id="spacer-top", classes="grid-spacer")
+        self._window = Container(id="clip-window")
+        self._spacer_bottom = Static(id="spacer-bottom", classes="grid-spacer")
+
+    def compose(self) -> ComposeResult:
+        yield self._spacer_top
+        yield self._window
+        yield self._spacer_bottom
 
     def on_mount(self) -> None:
-        """Load metadata and mount placeholder cards when the widget is mounted."""
+        """Load metadata and mount the visible cards once mounted."""
         self.load_clips_metadata()
-        self.mount_all_cards_unloaded()
 
-    def load_clips_metadata(self):
-        """Query the database for clip metadata only."""
-        self.all_clips_data = [] # Clear previous data
-        conn = None
+    def load_clips_metadata(self) -> None:
+        """
+        Starts a background reload of clip metadata; the grid updates when
+        it lands.
+        """
+        self._fetch_clips()
+
+    @work(exclusive=True, thread=True)
+    def _fetch_clips(self) -> None:
+        """Query the database for clip metadata only (worker thread)."""
+        worker = get_current_worker()
+        clips: List[ClipRow] = []
+        viewport_rows = -(-max(self.size.height, 1) // self.card_height)
+        first_screen = self.grid_cols * (viewport_rows + self.overscan_rows)
+        conn: Optional[sqlite3.Connection] = None
         try:
-            conn = get_db_connection(self.db_path)
+            # A separate read connection: under WAL its read transaction
+            # keeps one snapshot for the whole scan, so star/tag UPDATEs on
+            # the app's connection can't make it skip or repeat rows, and no
+            # lock is shared
+            conn = sqlite3.connect(self.db_path)
+            apply_pragmas(conn)
+            # Plain tuples: ClipRow(*row) needs no sqlite3.Row wrapper
             cursor = conn.cursor()
+            # Default size for fetchmany()
+            cursor.arraysize = self.fetch_batch_size
             cursor.execute("""
                 SELECT id, filename, thumbnail_path, starred, tags
                 FROM clips
                 ORDER BY filename ASC
             """)
-            # Fetch all rows as dictionaries
-            keys = [description[0] for description in cursor.description]
-            self.all_clips_data = [dict(zip(keys, row)) for row in cursor.fetchall()]
-
+            while True:
+                rows = cursor.fetchmany()
+                if not rows or worker.is_cancelled:
+                    break
+                had_first_screen = len(clips) >= first_screen
+                clips.extend(ClipRow(*row) for row in rows)
+                if (not self._loaded and not had_first_screen
+                        and len(clips) >= first_screen):
+                    # Show the first screenful now; the rest is still being
+                    # read
+                    self.app.call_from_thread(self._apply_clips, list(clips))
         except sqlite3.Error as e:
-            self.app.push_screen(ErrorScreen(f"Database Error loading metadata:\n{e}"))
             print(f"Database error loading clips: {e}", file=sys.stderr)
+            self.app.call_from_thread(
+                self.app.push_screen,
+                ErrorScreen(f"Database Error loading metadata:\n{e}"))
+            return
         except Exception as e:
-            self.app.push_screen(ErrorScreen(f"Unexpected Error loading metadata:\n{e}"))
             print(f"Unexpected error loading clips: {e}", file=sys.stderr)
+            self.app.call_from_thread(
+                self.app.push_screen,
+                ErrorScreen(f"Unexpected Error loading metadata:\n{e}"))
+            return
         finally:
-            if conn:
+            if conn is not None:
                 conn.close()
-
-    def mount_all_cards_unloaded(self):
-        """Mount ClipCard widgets for all clips, but without loading images."""
-        self.remove_children() # Clear any existing widgets (like error messages)
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._apply_clips, clips)
+
+    def _apply_clips(self, clips: List[ClipRow]) -> None:
+        """
+        Installs freshly loaded clip metadata (UI thread), diffing it against
+        the current data so an unchanged refresh does no widget work.
+        """
+        old_by_id = self._rows_by_id
+        changed = not self._loaded or len(clips) != len(self.all_clips_data)
+        for i, clip in enumerate(clips):
+            old = old_by_id.get(clip.id)
+            if old is not None and old == clip:
+                # Keep the existing row so the card showing it is not
+                # retargeted
+                clips[i] = clip = old
+            if not changed and self.all_clips_data[i] is not clip:
+                changed = True
+        if not changed:
+            return
+        was_empty = not self.all_clips_data
+        self.all_clips_data = clips
+        self._rows_by_id = {clip.id: clip for clip in clips}
+        self._loaded = True
+        if was_empty or not clips:
+            self.reset_window()  # Swap the "no clips" placeholder in or out
+        else:
+            self.update_window()  # Retargets only the cards whose clip changed
+
+    def reset_window(self) -> None:
+        """Drops all mounted cards and rebuilds the window from
+        all_clips_data."""
+        window = self._window
+        window.remove_children()
+        self._cards = []
+        self._first_index = 0
+        if not self.all_clips_data:
+            window.mount(Static("No clips found in the database."))
+        self.update_window()
+
+    def update_window(self) -> None:
+        """Mounts/recycles cards so exactly the visible rows (+ over-scan)
+        exist."""
+        if not self.is_mounted:
+            return
+        total = len(self.all_clips_data)
+        cols = self.grid_cols
+        total_rows = -(-total // cols)
+        viewport_rows = -(-max(self.size.height, 1) // self.card_height)
+        first_row = max(
+            0, int(self.scroll_y) // self.card_height - self.overscan_rows)
+        first_row = min(first_row, max(0, total_rows - 1))
+        last_row = min(
+            total_rows, first_row + viewport_rows + 2 * self.overscan_rows)
+        first_index = first_row * cols
+        last_index = min(total, last_row * cols)
+
+        # Batch the spacer resize and every move/retarget/mount into one
+        # repaint
+        with self.app.batch_update():
+            self._spacer_top.styles.height = first_row * self.card_height
+            self._spacer_bottom.styles.height = (
+                (total_rows - last_row) * self.card_height)
+            self._shift_window(first_index, last_index)
+
+    def _shift_window(self, first_index: int, last_index: int) -> None:
+        """Recycles, trims, and mounts cards so they cover
+        [first_index, last_index)."""
+        window = self._window
+        wanted = last_index - first_index
+        shift = first_index - self._first_index
+        cards = self._cards
+        if cards and 0 < shift < len(cards):
+            # Scrolled down: recycle cards from the top to the bottom
+            anchor = cards[-1]
+            for card in cards[:shift]:
+                window.move_child(card, after=anchor)
+                anchor = card
+            cards = cards[shift:] + cards[:shift]
+        elif cards and 0 < -shift < len(cards):
+            # Scrolled up: recycle cards from the bottom to the top
+            anchor = cards[0]
+            for card in reversed(cards[shift:]):
+                window.move_child(card, before=anchor)
+                anchor = card
+            cards = cards[shift:] + cards[:shift]
+
+        # Grow or shrink the pool to fit the viewport
+        if len(cards) > wanted:
+            for card in cards[wanted:]:
+                card.remove()
+            cards = cards[:wanted]
+        # Build any new cards up front so they are mounted in one call
+        new_cards = [
+            ClipCard(clip_data=self.all_clips_data[first_index + i])
+            for i in range(len(cards), wanted)
+        ]
+
+        # Retarget any card whose slot now shows a different clip
+        for i, card in enumerate(cards):
+            clip = self.all_clips_data[first_index + i]
+            if card.clip_data is not clip:
+                card.show_clip(clip)
+        if new_cards:
+            window.mount(*new_cards)
+        self._cards = cards + new_cards
+        self._first_index = first_index
+
+    def remove_clips(self, clip_ids: Set[int]) -> None:
+        """Drops clips' rows; later cards shift up by retargeting, not
+        remounting."""
+        # One compaction pass for the whole batch; the list order drives the
+        # window
+        self.all_clips_data = [
+            c for c in self.all_clips_data if c.id not in clip_ids]
+        for clip_id in clip_ids:
+            self._rows_by_id.pop(clip_id, None)
         if self.all_clips_data:
-            cards = [
-                ClipCard(clip_id=clip['id'], clip_data=clip)
-                for clip in self.all_clips_data
-            ]
-            self.mount(*cards) # Mount all cards
+            self.update_window()
+        else:
+            self.reset_window()  # Show the "no clips" placeholder
+
+    def set_tags(self, clip_id: int, tags: str) -> None:
+        """Applies a tag edit to the clip's row and to the card showing it, if
+        any."""
+        row = self._rows_by_id.get(clip_id)
+        if row is None:
+            return  # Deleted (or not loaded yet)
+        card = next(
+            (card for card in self._cards if card.clip_data is row), None)
+        if card is not None:
+            card.tags = tags  # Watcher updates the shared row and repaints
         else:
-            self.mount(Static("No clips found in the database."))
+            row.tags = tags
+
+    def sync_rows(
+        self, state_by_id: Dict[int, Tuple[bool, Optional[str]]]
+    ) -> None:
+        """Applies DB-confirmed (starred, tags) states to the rows and any
+        cards showing them."""
+        if not state_by_id:
+            return
+        cards_by_id = {
+            card.clip_data.id: card for card in self._cards if card.clip_data}
+        for clip_id, (starred, tags) in state_by_id.items():
+            row = self._rows_by_id.get(clip_id)
+            if row is None:
+                continue  # Deleted (or not loaded yet)
+            card = cards_by_id.get(row.id)
+            if card is not None:
+                # Watchers write the row and repaint, and only fire on a
+                # change
+                card.starred = starred
+                card.tags = tags
+            else:
+                row.starred = starred
+                row.tags = tags
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        height = self.card_height
+        if int(old_value) // height != int(new_value) // height:
+            self.update_window()
 
     def on_resize(self, event: events.Resize) -> None:
-        """Handles resize events."""
-        # Future: could dynamically adjust grid_cols here
-        pass # No action needed currently as image loading removed
+        """Handles resize events: the number of visible rows may have
+        changed."""
+        self.update_window()
 
 
 class EditTagsScreen(ModalScreen[str]):
     """A modal screen for editing clip tags."""
 
-    # Store the clip ID and original widget to update later
+    # Store the clip ID; the edit is applied by ID since cards are recycled
     clip_id: int
-    original_widget: ClipCard
-
-    DEFAULT_CSS = """
-    EditTagsScreen {
-        align: center middle;
-    }
-
-    #edit-tags-container {
-        width: 80%;
-        height: auto;
-        border: thick $primary;
-        background: $surface;
-    }
-
-    #tags-input {
-        margin: 1;
-    }
-    """
 
     BINDINGS = [
         ("escape", "cancel_edit", "Cancel"),
         # ("enter", "submit_edit", "Submit") # Input handles enter by default
     ]
 
-    def __init__(self, clip_id: int, current_tags: str, original_widget: ClipCard, **kwargs):
+    def __init__(self, clip_id: int, current_tags: str, **kwargs):
         super().__init__(**kwargs)
         self.clip_id = clip_id
         self.current_tags = current_tags
-        self.original_widget = original_widget
+        self._input = Input(
+            value=self.current_tags,
+            placeholder="tag1, tag2, ...",
+            id="tags-input"
+        )
 
     def compose(self) -> ComposeResult:
         with Container(id="edit-tags-container"):
             yield Static("Edit tags (comma-separated), press Enter to submit, Escape to cancel:")
-            yield Input(
-                value=self.current_tags,
-                placeholder="tag1, tag2, ...",
-                id="tags-input"
-            )
+            yield self._input
 
     def on_mount(self) -> None:
         """Focus the input field when the screen is mounted."""
-        self.query_one(Input).focus()
+        self._input.focus()
 
     def on_input_submitted(self, event: Input.Submitted) -> None:
         """Handle the submission of the input field."""
-        new_tags = event.value.strip() # Get the entered value
-        # Optional: normalize tags (e.g., lowercase, remove extra spaces)
-        new_tags = ", ".join(t.strip() for t in new_tags.split(",") if t.strip())
-        self.dismiss(new_tags) # Dismiss the screen and return the new tags
+        if event.value == self.current_tags:
+            # Enter without edits: nothing to normalize or save
+            self.dismiss(self.current_tags)
+            return
+        new_tags = _normalize_tags(event.value)  # Canonical "a, b, c" form
+        self.dismiss(new_tags)  # Dismiss the screen and return the new tags
 
     def action_cancel_edit(self) -> None:
         """Handle cancellation."""
-        self.dismiss(self.current_tags) # Dismiss and return original tags
+        self.dismiss(self.current_tags)  # Dismiss and return original tags
 
 
 class ConfirmDeleteScreen(ModalScreen[bool]):
@@ -250,29 +505,7 @@ class ConfirmDeleteScreen(ModalScreen[bool]):
     # Store info about the clip to be deleted
     clip_id: int
     clip_filename: str
-    clip_widget: ClipCard # Keep track of the widget to remove
-
-    DEFAULT_CSS = """
-    ConfirmDeleteScreen {
-        align: center middle;
-    }
-    #confirm-delete-container {
-        width: 60; /* Set a fixed width */
-        max-width: 80%; /* But don't allow it to exceed 80% screen width */
-        height: auto;
-        padding: 1 2;
-        border: thick $error;
-        background: $surface;
-    }
-    #confirm-delete-buttons {
-        width: 100%;
-        align-horizontal: right;
-        padding-top: 1;
-    }
-    Button {
-        margin-left: 2;
-    }
-    """
+    clip_widget: ClipCard  # Keep track of the widget to remove
 
     def __init__(self, clip_id: int, clip_filename: str, clip_widget: ClipCard, **kwargs):
         super().__init__(**kwargs)
@@ -295,9 +528,9 @@ class ConfirmDeleteScreen(ModalScreen[bool]):
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Handle button presses."""
         if event.button.id == "confirm-delete-yes":
-            self.dismiss(True) # Return True to confirm deletion
+            self.dismiss(True)  # Return True to confirm deletion
         else:
-            self.dismiss(False) # Return False to cancel
+            self.dismiss(False)  # Return False to cancel
 
 
 class ErrorScreen(ModalScreen[None]):
@@ -306,22 +539,6 @@ class ErrorScreen(ModalScreen[None]):
         super().__init__(**kwargs)
         self.error_message = error_message
 
-    DEFAULT_CSS = """
-    ErrorScreen {
-        align: center middle;
-    }
-    #error-container {
-        width: auto;
-        max-width: 80%;
-        height: auto;
-        max-height: 80%;
-        border: thick $error;
-        background: $surface;
-        padding: 1 2;
-    }
-    #error-message { margin-bottom: 1; }
-    """
-
     def compose(self) -> ComposeResult:
         yield Container(
             Static(f"[b red]Error[/]:", id="error-title"),
@@ -340,15 +557,8 @@ class ErrorScreen(ModalScreen[None]):
 class LoopSleuthApp(App[None]):
     """The main Textual application for LoopSleuth."""
 
-    # Embed all necessary CSS directly
-    CSS = """
-    Screen {
-        /* Add global screen styles if needed */
-    }
-    Container#main-container {
-        height: 1fr; /* Ensure container fills space */
-    }
-    """ + ClipGrid.DEFAULT_CSS + ClipCard.DEFAULT_CSS + EditTagsScreen.DEFAULT_CSS + ConfirmDeleteScreen.DEFAULT_CSS + ErrorScreen.DEFAULT_CSS
+    # All widget/screen styles live in one stylesheet next to this module
+    CSS_PATH = "loopsleuth.tcss"
 
     BINDINGS = [
         ("q", "quit", "Quit"),
@@ -366,387 +576,567 @@ class LoopSleuthApp(App[None]):
         """Initialize the app, ensuring base class init and setting DB path."""
         super().__init__(**kwargs)
         self.db_path = db_path
+        # One connection for the app's lifetime, opened in on_load
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        # Debounced star/tag writes: (sql, params) pairs awaiting
+        # _flush_writes
+        self._pending_writes: List[Tuple[str, Tuple[Any, ...]]] = []
+        self._flush_timer: Optional[Timer] = None
+        self._flush_worker: Optional[Worker] = None
+        # Batch handed to _flush_in_thread but not yet claimed by it; held
+        # with _flush_lock while claiming and writing, so batches commit in
+        # order
+        self._handoff: List[Tuple[str, Tuple[Any, ...]]] = []
+        self._flush_lock = threading.Lock()
+        self._flush_seq = 0  # Commit order of flushed batches
+        # Per clip: flush that last synced its row
+        self._synced_seq: Dict[int, int] = {}
+        self._grid: Optional[ClipGrid] = None  # Created in compose()
+
+    def on_load(self) -> None:
+        """Open the shared DB connection before any widget (e.g. ClipGrid)
+        needs it."""
+        # get_db_connection applies the WAL/synchronous/cache pragmas
+        self._conn = get_db_connection(self.db_path, check_same_thread=False)
+
+    def on_unmount(self) -> None:
+        """Flush queued writes and close the shared DB connection on exit."""
+        self._flush_writes(wait=True)
+        if self._conn:
+            # _flush_lock: a flush worker still writing finishes before the
+            # close
+            with self._flush_lock, self._db_lock:
+                self._conn.close()
+                self._conn = None
 
     def compose(self) -> ComposeResult:
         """Create child widgets for the app."""
+        self._grid = ClipGrid(db_path=self.db_path)
         yield Header()
         yield Container(
-            ClipGrid(db_path=self.db_path), # Pass db_path
+            self._grid,  # Loads through its own read connection
             id="main-container"
         )
         yield Footer()
 
     def action_refresh_grid(self) -> None:
         """Refreshes the grid by reloading metadata and remounting cards."""
-        self.log("Refreshing grid...") # Add log
-        grid = self.query_one(ClipGrid)
+        self.log("Refreshing grid...")  # Add log
+        grid = self._grid
+        # Make sure the reload sees pending edits
+        self._flush_writes(wait=True)
         # Clear focus first to avoid issues if focused element is removed
         self.screen.set_focus(None)
+        # Reloads in the background, then re-windows
         grid.load_clips_metadata()
-        grid.mount_all_cards_unloaded()
         # Try focusing the grid itself after refresh
         self.set_timer(0.1, lambda: self.screen.set_focus(grid))
 
     def action_toggle_star(self) -> None:
         """Toggle the starred status of the currently focused clip."""
         try:
-            focused_widget = self.query_one("ClipCard:focus")
+            # No DOM query needed for the focused card
+            focused_widget = self.focused
             if focused_widget and isinstance(focused_widget, ClipCard):
-                clip_id = focused_widget.clip_data.get('id')
-                current_star_status = focused_widget.clip_data.get('starred', False)
+                clip_id = focused_widget.clip_data.id
+                current_star_status = focused_widget.starred
                 if clip_id is not None:
-                    # Optimistically update UI first
                     new_star_status = not current_star_status
-                    # Create a *copy* of the data and update it
-                    updated_data = focused_widget.clip_data.copy()
-                    updated_data['starred'] = new_star_status
-                    # Assign the new dictionary back to trigger reactive update
-                    focused_widget.clip_data = updated_data
-                    # Explicitly tell the card to update its text display
-                    focused_widget.update_display()
-
-                    # Then, update the database
-                    self.update_star_in_db(clip_id, new_star_status, focused_widget)
+                    # Updates the card immediately; the DB write is debounced
+                    self.update_star_in_db(
+                        clip_id, new_star_status, focused_widget)
             else:
                 self.log("No ClipCard focused to toggle star.")
         except Exception as e:
-            self.log(f"Error toggling star: {e}")
+            self.log("Error toggling star:", e)
             self.app.push_screen(ErrorScreen(f"Error toggling star:\n{e}"))
 
     def action_edit_tags(self) -> None:
         """Open the modal screen to edit tags for the focused clip."""
         try:
-            focused_widget = self.query_one("ClipCard:focus")
+            # No DOM query needed for the focused card
+            focused_widget = self.focused
             if focused_widget and isinstance(focused_widget, ClipCard):
-                clip_id = focused_widget.clip_data.get('id')
-                current_tags = focused_widget.clip_data.get('tags', '')
+                clip_id = focused_widget.clip_data.id
+                current_tags = focused_widget.tags
                 if clip_id is not None:
                     # Define callback to handle result from modal
                     def check_edit_result(new_tags: str):
-                        if new_tags is not None: # Check if submit vs cancel
-                            self.log(f"Updating tags for clip {clip_id} to: {new_tags}")
-                            # Update DB and the original widget's data
-                            self.update_tags_in_db(clip_id, new_tags, focused_widget)
+                        # Cancel returns the current tags; skip the write
+                        # when nothing changed
+                        unchanged = (current_tags,
+                                     _normalize_tags(current_tags))
+                        if new_tags is not None and new_tags not in unchanged:
+                            self.log("Updating tags for clip", clip_id,
+                                     "to:", new_tags)
+                            # By ID: the card may show another clip by now
+                            # (cards are recycled)
+                            self.update_tags_in_db(clip_id, new_tags)
 
                     # Push the modal screen
                     self.push_screen(
-                        EditTagsScreen(clip_id, current_tags, focused_widget),
+                        EditTagsScreen(clip_id, current_tags),
                         check_edit_result
                     )
             else:
                 self.log("No ClipCard focused to edit tags.")
         except Exception as e:
-            self.log(f"Error initiating tag edit: {e}")
-            self.app.push_screen(ErrorScreen(f"Error initiating tag edit:\n{e}"))
+            self.log("Error initiating tag edit:", e)
+            self.app.push_screen(
+                ErrorScreen(f"Error initiating tag edit:\n{e}"))
 
     def action_request_delete(self) -> None:
         """Request confirmation to delete the focused clip."""
         try:
-            focused_widget = self.query_one("ClipCard:focus")
+            # No DOM query needed for the focused card
+            focused_widget = self.focused
             if focused_widget and isinstance(focused_widget, ClipCard):
-                clip_id = focused_widget.clip_data.get('id')
-                clip_filename = focused_widget.clip_data.get('filename', 'Unknown')
+                clip_id = focused_widget.clip_data.id
+                clip_filename = focused_widget.clip_data.filename
                 if clip_id is not None:
                     # Define callback
                     def handle_delete_confirmation(confirmed: bool):
                         if confirmed:
-                            self.log(f"Confirmed deletion for clip {clip_id}")
+                            self.log("Confirmed deletion for clip", clip_id)
                             self.delete_clip(clip_id, focused_widget)
                         else:
                             self.log("Deletion cancelled.")
 
                     # Push confirmation screen
                     self.push_screen(
-                        ConfirmDeleteScreen(clip_id, clip_filename, focused_widget),
+                        ConfirmDeleteScreen(
+                            clip_id, clip_filename, focused_widget),
                         handle_delete_confirmation
                     )
             else:
                 self.log("No ClipCard focused to delete.")
         except Exception as e:
-            self.log(f"Error initiating delete request: {e}")
-            self.app.push_screen(ErrorScreen(f"Error initiating delete request:\n{e}"))
+            self.log("Error initiating delete request:", e)
+            self.app.push_screen(
+                ErrorScreen(f"Error initiating delete request:\n{e}"))
 
     def action_export_starred(self) -> None:
-        """Export starred clip paths to a file."""
+        """Export starred clip paths to a file (written on a worker thread)."""
+        output_file = Path("keepers.txt")  # Or make configurable
+        # The exporter reads through its own connection; include
+        # not-yet-flushed stars
+        self._flush_writes(wait=True)
+        self.export_starred(output_file)
+
+    @work(thread=True, exclusive=True, group="export")
+    def export_starred(self, output_file: Path) -> None:
+        """Runs export_starred_clips off the UI thread and reports back on
+        it."""
         try:
-            output_file = Path("keepers.txt") # Or make configurable
-            export_starred_clips(self.db_path, output_file)
-            self.log(f"Exported starred clips to {output_file}")
-            # Maybe show a notification? Textual doesn't have built-in popups easily
-            # For now, log is sufficient. Could add a temporary status message.
-            self.bell() # Simple notification
+            ok, message = export_starred_clips(self.db_path, output_file)
         except Exception as e:
-            self.log(f"Error exporting starred clips: {e}")
-            self.app.push_screen(ErrorScreen(f"Error exporting starred clips:\n{e}"))
-
-    async def delete_clip(self, clip_id: int, clip_widget: ClipCard):
-        """Deletes a clip from the database and filesystem, then removes its card."""
-        conn = None
-        clip_path_str = None
-        thumb_path_str = None
-
-        # --- 1. Get paths from the widget's data before deleting from DB ---
-        if clip_widget.clip_data:
-             # Use .get() for safety
-            clip_path_str = clip_widget.clip_data.get("filepath") # Assuming 'filepath' is stored
-            thumb_path_str = clip_widget.clip_data.get("thumbnail_path")
-
-        # --- If filepath wasn't in the widget data, query the DB ---
-        if not clip_path_str:
-            try:
-                conn = get_db_connection(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT filepath, thumbnail_path FROM clips WHERE id = ?", (clip_id,))
-                result = cursor.fetchone()
-                if result:
-                    clip_path_str = result["filepath"]
-                    thumb_path_str = result["thumbnail_path"]
-                else:
-                    self.log(f"Could not find clip {clip_id} in DB to get filepath.")
-                    # Optionally show error, but proceed to delete DB entry anyway
-            except sqlite3.Error as e:
-                self.log(f"Database error fetching clip path for deletion: {e}")
-                self.app.push_screen(ErrorScreen(f"DB Error getting path for delete:\n{e}"))
-                # Decide if we should stop here or try to continue
-                if conn: conn.close() # Ensure connection closed on error
-                return # Stop deletion if we can't confirm paths
-            finally:
-                if conn and not conn.in_transaction: # Avoid closing if in transaction (shouldn't be here)
-                    conn.close()
-                    conn = None # Reset conn
-
-
-        # --- 2. Delete from Database ---
-        conn = None # Reset conn for the delete operation
-        deleted_from_db = False
+            ok, message = False, str(e)
+        self.call_from_thread(self._finish_export, output_file, ok, message)
+
+    def _finish_export(
+        self, output_file: Path, ok: bool, message: str
+    ) -> None:
+        """Applies an export result on the UI thread."""
+        if not ok:
+            self.log("Error exporting starred clips:", message)
+            self.push_screen(
+                ErrorScreen(f"Error exporting starred clips:\n{message}"))
+            return
+        self.log("Exported starred clips to", output_file)
+        # Maybe show a notification? Textual doesn't have built-in popups
+        # easily
+        # For now, log is sufficient. Could add a temporary status message.
+        self.bell()  # Simple notification
+
+    def delete_clip(self, clip_id: int, clip_widget: ClipCard):
+        """Deletes a single clip (see delete_clips)."""
+        self.delete_clips([clip_id])
+
+    @work(thread=True, group="delete")
+    def delete_clips(self, clip_ids: List[int]):
+        """
+        Deletes clips from the database and filesystem in one transaction,
+        then drops them from the grid. Runs on a worker thread; UI updates go
+        through call_from_thread.
+        """
+        if not clip_ids:
+            return
+        placeholders = ",".join("?" * len(clip_ids))
+        # self.log isn't bound to the app on worker threads (it would print
+        # to the terminal), so log args are collected here and logged on the
+        # UI thread
+        log_lines: List[Tuple[Any, ...]] = []
+
+        # --- 1. Delete from Database, getting the paths back in one go ---
         try:
-            conn = get_db_connection(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM clips WHERE id = ?", (clip_id,))
-            conn.commit()
-            if cursor.rowcount > 0:
-                self.log(f"Deleted clip {clip_id} from database.")
-                deleted_from_db = True
-            else:
-                 self.log(f"Clip {clip_id} not found in database for deletion.")
-                 # Treat as success if goal is removal, but log it.
-
-        except sqlite3.Error as e:
-            self.log(f"Database error deleting clip {clip_id}: {e}")
-            self.app.push_screen(ErrorScreen(f"Database error deleting clip:\n{e}"))
-            # Decide whether to proceed with file deletion if DB failed
-        finally:
-            if conn:
-                conn.close()
-
-        # --- 3. Delete Files (only if DB delete was attempted or successful) ---
-        # Delete video file
-        if clip_path_str:
-            try:
-                clip_path = Path(clip_path_str)
-                if clip_path.exists():
-                    clip_path.unlink()
-                    self.log(f"Deleted video file: {clip_path}")
+            with self._db_lock, self._conn:
+                self._conn.execute(
+                    f"DELETE FROM thumbnails "
+                    f"WHERE clip_id IN ({placeholders})", clip_ids)
+                if sqlite3.sqlite_version_info >= (3, 35, 0):
+                    deleted = self._conn.execute(
+                        f"DELETE FROM clips WHERE id IN ({placeholders}) "
+                        f"RETURNING id, path, thumbnail_path",
+                        clip_ids,
+                    ).fetchall()
                 else:
-                    self.log(f"Video file not found, skipping deletion: {clip_path}")
-            except OSError as e:
-                self.log(f"Error deleting video file {clip_path}: {e}")
-                self.app.push_screen(ErrorScreen(f"OS Error deleting video file:\n{e}"))
-            except Exception as e: # Catch any other unexpected errors
-                 self.log(f"Unexpected error deleting video file {clip_path}: {e}")
-                 self.app.push_screen(ErrorScreen(f"Error deleting video file:\n{e}"))
-
-        # Delete thumbnail file
-        if thumb_path_str:
-            try:
-                thumb_path = Path(thumb_path_str)
-                if thumb_path.exists():
-                    thumb_path.unlink()
-                    self.log(f"Deleted thumbnail file: {thumb_path}")
-                else:
-                    self.log(f"Thumbnail file not found, skipping deletion: {thumb_path}")
-            except OSError as e:
-                self.log(f"Error deleting thumbnail file {thumb_path}: {e}")
-                self.app.push_screen(ErrorScreen(f"OS Error deleting thumbnail:\n{e}"))
-            except Exception as e: # Catch any other unexpected errors
-                 self.log(f"Unexpected error deleting thumbnail {thumb_path}: {e}")
-                 self.app.push_screen(ErrorScreen(f"Error deleting thumbnail:\n{e}"))
-
-
-        # --- 4. Remove the widget from the UI ---
+                    deleted = self._conn.execute(
+                        f"SELECT id, path, thumbnail_path FROM clips "
+                        f"WHERE id IN ({placeholders})", clip_ids
+                    ).fetchall()
+                    self._conn.execute(
+                        f"DELETE FROM clips WHERE id IN ({placeholders})",
+                        clip_ids)
+        except sqlite3.Error as e:
+            self.call_from_thread(
+                self.log, "Database error deleting clip(s)", clip_ids, e)
+            self.call_from_thread(
+                self.push_screen,
+                ErrorScreen(f"Database error deleting clip:\n{e}"))
+            return  # Don't touch files whose DB rows are still there
+        log_lines.append(("Deleted", len(deleted), "of", len(clip_ids),
+                          "clip(s) from database."))
+
+        # --- 2. Delete Files (unlink directly; a missing file is fine) ---
+        for row in deleted:
+            for label, path_str in (("video file", row["path"]),
+                                    ("thumbnail", row["thumbnail_path"])):
+                if not path_str:
+                    continue
+                file_path = Path(path_str)
+                try:
+                    file_path.unlink()
+                    log_lines.append(("Deleted", label, file_path))
+                except FileNotFoundError:
+                    log_lines.append(
+                        (label, "not found, skipping deletion:", file_path))
+                except OSError as e:
+                    log_lines.append(("Error deleting", label, file_path, e))
+                    self.call_from_thread(
+                        self.push_screen,
+                        ErrorScreen(f"OS Error deleting {label}:\n{e}"))
+
+        # --- 3. Drop the clips from the grid (UI thread) ---
+        self.call_from_thread(
+            self._remove_clips_from_grid, set(clip_ids), log_lines)
+
+    def _remove_clips_from_grid(
+        self, clip_ids: Set[int], log_lines: List[Tuple[Any, ...]]
+    ) -> None:
+        """Removes deleted clips' rows from ClipGrid and re-windows the
+        cards."""
+        for args in log_lines:
+            self.log(*args)
         try:
-            # Find the grid to update its internal list
-            grid = self.query_one(ClipGrid)
-            # Remove the clip from the grid's internal data list
-            grid.all_clips_data = [c for c in grid.all_clips_data if c.get('id') != clip_id]
-
-            await clip_widget.remove() # Use await for async remove
-            self.log(f"Removed ClipCard widget for clip {clip_id}.")
+            grid = self._grid
+            grid.remove_clips(clip_ids)
+            self.log("Removed", len(clip_ids), "clip(s) from the grid.")
             # Optionally, refocus the grid or the next/previous element
             self.set_timer(0.1, lambda: self.screen.set_focus(grid))
         except Exception as e:
-             self.log(f"Error removing clip widget {clip_id}: {e}")
-             # The item might already be gone, or focus issues. Grid refresh might fix.
-
-    def update_star_in_db(self, clip_id: int, new_star_status: bool, widget_to_update: ClipCard):
-        """Updates the starred status for a clip in the database and refreshes the widget."""
-        conn = None
+            self.log("Error removing clip widgets", clip_ids, e)
+            # The item might already be gone, or focus issues. Grid refresh
+            # might fix.
+
+    def _queue_write(self, sql: str, params: Tuple[Any, ...]) -> None:
+        """Queues a write; queued writes are flushed together after
+        WRITE_DEBOUNCE_S."""
+        self._pending_writes.append((sql, params))
+        if self._flush_timer is None:
+            self._flush_timer = self.set_timer(
+                WRITE_DEBOUNCE_S, self._flush_writes)
+
+    def _flush_writes(self, wait: bool = False) -> None:
+        """
+        Hands all queued writes to a DB worker thread.
+
+        Args:
+            wait: Run the writes inline instead (used on refresh and exit,
+                where the DB must be up to date before continuing). Waits for a
+                worker flush already writing, and takes over a batch handed
+                to a worker that hasn't started, so writes stay in order.
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+            self._flush_timer = None
+        if wait:
+            with self._flush_lock:
+                writes = self._handoff + self._pending_writes
+                self._handoff, self._pending_writes = [], []
+                if not writes or self._conn is None:
+                    return
+                seq, result = self._write_batch_in_order(writes)
+            self._finish_flush(seq, len(writes), *result)
+            return
+        if not self._pending_writes or self._conn is None:
+            return
+        if self._flush_worker is not None and self._flush_worker.is_running:
+            # One flush at a time keeps writes in order; retry after this one
+            self._flush_timer = self.set_timer(
+                WRITE_DEBOUNCE_S, self._flush_writes)
+            return
+        self._handoff, self._pending_writes = self._pending_writes, []
+        self._flush_worker = self._flush_in_thread()
+
+    @work(thread=True, group="db-writes")
+    def _flush_in_thread(self) -> None:
+        """Worker body for _flush_writes; reports back on the UI thread."""
+        with self._flush_lock:
+            writes, self._handoff = self._handoff, []
+            if not writes or self._conn is None:
+                return  # An inline flush already wrote this batch
+            seq, result = self._write_batch_in_order(writes)
+        self.call_from_thread(self._finish_flush, seq, len(writes), *result)
+
+    def _write_batch_in_order(
+        self, writes: List[Tuple[str, Tuple[Any, ...]]]
+    ) -> Tuple[int, Tuple[Dict[int, Tuple[bool, Optional[str]]],
+                          Optional[sqlite3.Error]]]:
+        """Runs _write_batch and numbers it; callers hold _flush_lock."""
+        self._flush_seq += 1
+        return self._flush_seq, self._write_batch(writes)
+
+    def _write_batch(
+        self, writes: List[Tuple[str, Tuple[Any, ...]]]
+    ) -> Tuple[Dict[int, Tuple[bool, Optional[str]]],
+               Optional[sqlite3.Error]]:
+        """
+        Runs queued writes with executemany inside a single transaction, then
+        reads back the touched clips' final state with one SELECT.
+
+        Returns:
+            ((starred, tags) per touched clip id, error or None)
+        """
+        # Group by statement; executemany keeps per-statement order, so the
+        # last edit of a clip wins
+        grouped: Dict[str, List[Tuple[Any, ...]]] = {}
+        for sql, params in writes:
+            grouped.setdefault(sql, []).append(params)
+        returned: Dict[int, Tuple[bool, Optional[str]]] = {}
         try:
-            conn = get_db_connection(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("UPDATE clips SET starred = ? WHERE id = ?", (new_star_status, clip_id))
-            conn.commit()
-            self.log(f"Updated star status for clip {clip_id} to {new_star_status} in DB.")
-            # Update the widget's internal data *after* successful DB commit
-            # Create a new dict to ensure reactivity works
-            updated_data = widget_to_update.clip_data.copy()
-            updated_data['starred'] = new_star_status
-            widget_to_update.clip_data = updated_data
-            # Explicitly tell the card to update its display text
-            widget_to_update.update_display()
-
+            with self._db_lock, self._conn:  # Commits (or rolls back) on exit
+                for sql, params_list in grouped.items():
+                    self._conn.executemany(sql, params_list)
+                clip_ids = list({params[-1] for sql, params in writes})
+                placeholders = ",".join("?" * len(clip_ids))
+                rows = self._conn.execute(
+                    "SELECT id, starred, tags FROM clips"
+                    f" WHERE id IN ({placeholders})",
+                    clip_ids,
+                )
+                for clip_id, starred, tags in rows:
+                    returned[clip_id] = (bool(starred), tags)
         except sqlite3.Error as e:
-            self.log(f"Database error updating star status for clip {clip_id}: {e}")
-            self.app.push_screen(ErrorScreen(f"Database error updating star:\n{e}"))
-            # Revert optimistic UI update on failure
-            # Create a new dict to ensure reactivity works
-            reverted_data = widget_to_update.clip_data.copy()
-            reverted_data['starred'] = not new_star_status # Set back to original
-            widget_to_update.clip_data = reverted_data
-            widget_to_update.update_display() # Update display back
-        finally:
-            if conn:
-                conn.close()
+            return {}, e
+        return returned, None
+
+    def _finish_flush(
+        self,
+        seq: int,
+        count: int,
+        returned: Dict[int, Tuple[bool, Optional[str]]],
+        error: Optional[sqlite3.Error],
+    ) -> None:
+        """Applies a flush result (seq from _write_batch_in_order) on the UI
+        thread."""
+        if error is not None:
+            self.log("Database error flushing", count, "clip update(s):",
+                     error)
+            if self.is_running:
+                self.push_screen(
+                    ErrorScreen(f"Database error saving changes:\n{error}"))
+                # The optimistic UI edits were rolled back in the DB; reload
+                # to match it
+                self._grid.load_clips_metadata()
+            return
+        self.log("Flushed", count, "queued clip update(s) to DB.")
+        # A worker's result can arrive after a newer inline flush; keep the
+        # newer state
+        fresh = {clip_id: state for clip_id, state in returned.items()
+                 if self._synced_seq.get(clip_id, 0) < seq}
+        self._synced_seq.update(dict.fromkeys(fresh, seq))
+        # Sync cards/rows with the star/tag state the DB actually ended up
+        # with
+        if self._grid is not None:
+            self._grid.sync_rows(fresh)
+
+    def update_star_in_db(self, clip_id: int, new_star_status: bool,
+                          widget_to_update: ClipCard):
+        """Updates the widget's starred status and queues a DB-side toggle."""
+        # Watcher updates the shared row and repaints
+        widget_to_update.starred = new_star_status
+        # The DB flips the flag itself, so queued toggles compose correctly;
+        # the flush reads the final state back into the grid
+        self._queue_write(TOGGLE_STAR_SQL, (clip_id,))
+
+    def update_tags_in_db(self, clip_id: int, new_tags: str):
+        """Updates the clip's tags in the grid and queues the matching DB
+        write."""
+        if self._grid is not None:
+            self._grid.set_tags(clip_id, new_tags)
+        self._queue_write(SET_TAGS_SQL, (new_tags, clip_id))
 
-    def update_tags_in_db(self, clip_id: int, new_tags: str, widget_to_update: ClipCard):
-        """Updates tags for a clip in the database and refreshes the widget."""
-        conn = None
-        original_tags = widget_to_update.clip_data.get('tags', '') # Store original for revert
-        try:
-            conn = get_db_connection(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("UPDATE clips SET tags = ? WHERE id = ?", (new_tags, clip_id))
-            conn.commit()
-            self.log(f"Updated tags for clip {clip_id} to '{new_tags}' in DB.")
-            # Update the widget's internal data *after* successful DB commit
-            # Create a new dict to ensure reactivity works
-            updated_data = widget_to_update.clip_data.copy()
-            updated_data['tags'] = new_tags
-            widget_to_update.clip_data = updated_data
-            # Explicitly tell the card to update its display text
-            widget_to_update.update_display()
 
-        except sqlite3.Error as e:
-            self.log(f"Database error updating tags for clip {clip_id}: {e}")
-            self.app.push_screen(ErrorScreen(f"Database error updating tags:\n{e}"))
-            # Revert optimistic UI update on failure (though we didn't do one here)
-            # It's good practice to ensure the widget reflects DB state if possible
-            # If the update failed, the widget should ideally show original_tags
-            # Create a new dict to ensure reactivity works
-            reverted_data = widget_to_update.clip_data.copy()
-            reverted_data['tags'] = original_tags # Revert to original tags visually
-            widget_to_update.clip_data = reverted_data
-            widget_to_update.update_display()
-        finally:
-            if conn:
-                conn.close()
+# --- Main execution block for testing --- #
 
+def run_prerequisites(db_path: Path, isolated: bool = False) -> bool:
+    """
+    Runs the thumbnailer and hasher over the test DB to ensure test data
+    exists.
 
-# --- Main execution block for testing --- #
+    Args:
+        db_path: The test database the thumbnailer/hasher examples use.
+        isolated: Run each step's ``python -m`` example in its own interpreter
+            (the old behaviour, kept for regression testing) instead of
+            calling it in-process.
 
-def run_prerequisites():
-    """Runs thumbnailer and hasher examples to ensure test data exists."""
+    Returns:
+        True if both steps completed, False otherwise.
+    """
+    if isolated:
+        return _run_prerequisites_isolated()
+    if not db_path.exists():
+        print(f"[Error] Test database not found: {db_path}")
+        return False
+    try:
+        # Imported here so the TUI itself doesn't require the hashing deps
+        from loopsleuth.thumbnailer import process_thumbnails
+        from loopsleuth.hasher import process_hashes
+
+        print("Generating missing thumbnails to ensure test data...")
+        success, errors = process_thumbnails(
+            db_path=db_path, force_regenerate=False)
+        print(f"Thumbnailer completed. Success: {success}, Errors: {errors}")
+
+        print("\nCalculating missing hashes to ensure test data...")
+        success, errors = process_hashes(db_path=db_path)
+        print(f"Hasher completed. Success: {success}, Errors: {errors}")
+        return True
+    except ImportError as e:
+        print(f"[Error] Prerequisite modules could not be imported ({e})")
+    except FileNotFoundError as e:
+        print(f"[Error] Prerequisite tool not found ({e})")
+        print("        Ensure FFmpeg/FFprobe are installed and "
+              "./temp_thumb_test/test_clip.mp4 exists.")
+    except Exception as e:
+        print(f"[Error] An unexpected error occurred running "
+              f"prerequisites: {e}")
+    return False
+
+
+def _run_prerequisites_isolated() -> bool:
+    """Runs the thumbnailer and hasher examples as subprocesses."""
     try:
         print("Running thumbnailer example to ensure test data...")
-        # Use capture_output=False if you want to see their print statements
-        subprocess.run([sys.executable, "-m", "src.loopsleuth.thumbnailer"], check=True, text=True, capture_output=True)
+        # Output streams straight to our terminal instead of being buffered
+        # until exit
+        subprocess.run([sys.executable, "-m", "src.loopsleuth.thumbnailer"],
+                       check=True)
         print("Thumbnailer example completed.")
 
         print("\nRunning hasher example to ensure test data...")
-        subprocess.run([sys.executable, "-m", "src.loopsleuth.hasher"], check=True, text=True, capture_output=True)
+        subprocess.run([sys.executable, "-m", "src.loopsleuth.hasher"],
+                       check=True)
         print("Hasher example completed.")
         return True
     except FileNotFoundError as e:
-        print(f"[Error] Prerequisite script components not found or Python can't find modules ({e})")
-        print("        Make sure you are running from the project root directory (loopsleuth/).")
+        print(f"[Error] Prerequisite script components not found or Python "
+              f"can't find modules ({e})")
+        print("        Make sure you are running from the project root "
+              "directory (loopsleuth/).")
     except subprocess.CalledProcessError as e:
         print(f"[Error] Running prerequisite script failed:")
         print(f"  Command: {' '.join(e.cmd)}")
         print(f"  Return Code: {e.returncode}")
-        # Print stderr first as it often contains the useful error message
-        if e.stderr:
-             print(f"  Stderr:\n{e.stderr}")
-        if e.stdout:
-            print(f"  Stdout:\n{e.stdout}")
-        print("        Ensure FFmpeg/FFprobe are installed and ./temp_thumb_test/test_clip.mp4 exists.")
+        print("  (See the script's output above for details.)")
+        print("        Ensure FFmpeg/FFprobe are installed and "
+              "./temp_thumb_test/test_clip.mp4 exists.")
     except Exception as e:
-        print(f"[Error] An unexpected error occurred running prerequisite scripts: {e}")
+        print(f"[Error] An unexpected error occurred running prerequisite "
+              f"scripts: {e}")
     return False
 
+
 if __name__ == "__main__":
     # Define the path to the test database used by the examples
     TEST_DB = Path("./temp_thumb_test.db")
 
     # Ensure prerequisite data exists
     print("--- Setting up Test Environment --- ")
-    prereqs_ok = run_prerequisites()
+    # --isolated runs the examples as subprocesses, as before
+    prereqs_ok = run_prerequisites(
+        TEST_DB, isolated="--isolated" in sys.argv[1:])
     if not prereqs_ok:
-        print("\n[Error] Could not set up test environment. Aborting TUI launch.")
+        print("\n[Error] Could not set up test environment. "
+              "Aborting TUI launch.")
         sys.exit(1)
 
-    # --- Manually add a second clip for testing navigation --- 
+    # --- Manually add extra clips for testing navigation ---
     # Assuming prerequisites ran and created the first clip & thumb/hash
-    # Assumes you copied 'test_clip.mp4' to 'test_clip_copy.mp4' in temp_thumb_test/
-    second_clip_name = "test_clip_copy.mp4"
-    second_clip_path = Path("./temp_thumb_test") / second_clip_name
-    if second_clip_path.exists():
+    # Assumes you copied 'test_clip.mp4' to each of these names in
+    # temp_thumb_test/
+    extra_clip_names = ["test_clip_copy.mp4"]
+    extra_clip_paths = [
+        Path("./temp_thumb_test") / name for name in extra_clip_names]
+    present_clip_paths = [p for p in extra_clip_paths if p.exists()]
+    for missing in sorted(set(extra_clip_paths) - set(present_clip_paths)):
+        print(f"Warning: Extra test clip '{missing}' not found. "
+              f"Cannot add to DB for UI testing.")
+    if present_clip_paths:
         conn_add = None
         try:
             conn_add = get_db_connection(TEST_DB)
-            cursor_add = conn_add.cursor()
-            # Check if it already exists (to avoid duplicate entries on re-runs)
-            cursor_add.execute("SELECT 1 FROM clips WHERE filename = ?", (second_clip_name,))
-            if cursor_add.fetchone() is None:
-                # Use metadata from the first clip for simplicity, only change path/filename
-                cursor_add.execute("SELECT duration, thumbnail_path, phash, path FROM clips LIMIT 1") # Added path
-                first_clip_meta = cursor_add.fetchone()
+            with conn_add:  # One transaction for the whole seeding step
+                # Use metadata from the first clip for simplicity, only
+                # change path/filename
+                first_clip_meta = conn_add.execute(
+                    "SELECT duration, thumbnail_path, phash, path "
+                    "FROM clips LIMIT 1"
+                ).fetchone()
                 if first_clip_meta:
-                    # Construct a plausible unique path for the copy
                     original_path = Path(first_clip_meta['path'])
-                    new_path = original_path.parent / second_clip_name # Use the new filename
-                    
-                    # Use a different thumbnail path to avoid deleting the same one twice
                     original_thumb_rel = first_clip_meta['thumbnail_path']
-                    new_thumb_rel = None
-                    if original_thumb_rel:
-                        thumb_p = Path(original_thumb_rel)
-                        new_thumb_rel = str(thumb_p.with_stem(f"{thumb_p.stem}_copy"))
-                    
-                    cursor_add.execute("""
-                        INSERT INTO clips (path, filename, duration, thumbnail_path, phash)
+                    rows = []
+                    for clip_path in present_clip_paths:
+                        # Use a different thumbnail path to avoid deleting
+                        # the same one twice
+                        new_thumb_rel = None
+                        if original_thumb_rel:
+                            thumb_p = Path(original_thumb_rel)
+                            new_thumb_rel = str(thumb_p.with_stem(
+                                f"{thumb_p.stem}_{clip_path.stem}"))
+                        new_path = original_path.parent / clip_path.name
+                        rows.append((
+                            str(new_path.resolve()),
+                            clip_path.name,
+                            first_clip_meta['duration'],
+                            new_thumb_rel,  # Use new thumb path if available
+                            # Reuse hash for simplicity
+                            first_clip_meta['phash'],
+                        ))
+                    # path is UNIQUE, so re-runs skip clips that are already
+                    # there
+                    cursor_add = conn_add.executemany("""
+                        INSERT OR IGNORE INTO clips
+                            (path, filename, duration, thumbnail_path, phash)
                         VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        str(new_path.resolve()), # Use constructed new path
-                        second_clip_name,
-                        first_clip_meta['duration'],
-                        new_thumb_rel, # Use new thumb path if available
-                        first_clip_meta['phash'] # Reuse hash for simplicity
-                    ))
-                    conn_add.commit()
-                    print(f"Manually added second clip '{second_clip_name}' to test DB for UI testing.")
+                    """, rows)
+                    if cursor_add.rowcount:
+                        print(f"Manually added {cursor_add.rowcount} extra "
+                              f"clip(s) to test DB for UI testing.")
                 else:
-                    print("Warning: Could not find first clip's metadata to copy for second clip.")
-            # else: Already exists, do nothing
+                    print("Warning: Could not find first clip's metadata to "
+                          "copy for extra clips.")
         except sqlite3.Error as e:
-            print(f"Warning: Database error adding second clip for testing: {e}")
+            print(f"Warning: Database error adding extra clips for "
+                  f"testing: {e}")
         except Exception as e:
-             print(f"Warning: Error adding second clip for testing: {e}")
+            print(f"Warning: Error adding extra clips for testing: {e}")
         finally:
             if conn_add:
                 conn_add.close()
-    else:
-        print(f"Warning: Second test clip '{second_clip_path}' not found. Cannot add to DB for UI testing.")
-    # --- End manual clip addition --- 
+    # --- End manual clip addition ---
 
     print("-----------------------------------")
 
@@ -754,4 +1144,4 @@ if __name__ == "__main__":
     # Instantiate the app directly, passing the test DB path
     test_app = LoopSleuthApp(db_path=TEST_DB)
     test_app.run()
-    print("--------------------") 
\ No newline at end of file
+    print("--------------------")
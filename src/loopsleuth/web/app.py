@@ -6,27 +6,53 @@ LoopSleuth Web Frontend (FastAPI)
 - Uses Jinja2 templates and static files
 """
 from fastapi import FastAPI, Request, HTTPException, Form, Body, status, BackgroundTasks, Query
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse, JSONResponse, StreamingResponse
+from fastapi.responses import (
+    HTMLResponse, FileResponse, RedirectResponse, JSONResponse,
+    StreamingResponse, Response,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from jinja2 import (
+    Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape,
+)
+# Use orjson for JSON responses if available
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from pathlib import Path
 import sys
-sys.path.append(str((Path(__file__).parent.parent.parent).resolve()))  # Ensure src/ is importable
+# Make src/ importable only when run as a script
+# (python src/loopsleuth/web/app.py); imported as loopsleuth.web.app, the
+# package is already on the path
+if __package__ != "loopsleuth.web":
+    SRC_DIR = str(Path(__file__).parent.parent.parent.resolve())
+    if SRC_DIR not in sys.path:
+        sys.path.append(SRC_DIR)
 from loopsleuth.db import get_db_connection, get_default_db_path
 from urllib.parse import unquote
 from loopsleuth.scanner import ingest_directory
+from loopsleuth.thumbnailer import PACK_THUMBNAILS
 import mimetypes  # <-- Add this import
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Tuple
+from contextlib import asynccontextmanager, contextmanager
+import anyio.to_thread
+import queue
+import threading
 import tempfile
 import os
 import shutil
 import platform
 import subprocess
+import sqlite3
 import json
 from datetime import datetime, timedelta
 import re
 import io
+import time
+import zlib
+
 
 def get_db_path_from_request(request: Request) -> Path:
     """
@@ -38,9 +64,91 @@ def get_db_path_from_request(request: Request) -> Path:
         return Path(db_param)
     return Path(os.environ.get("LOOPSLEUTH_DB_PATH", "loopsleuth.db"))
 
+
+class ConnectionPool:
+    """
+    Keeps warm SQLite connections per database path for the request
+    threadpool, so hot pages don't pay connect + schema check + cold page
+    cache per request.
+    A connection is only ever used by the one request that checked it out.
+    """
+
+    def __init__(self, max_idle: int = 8):
+        self.max_idle = max_idle
+        self._idle: Dict[str, queue.LifoQueue] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, db_path: Path) -> Iterator[sqlite3.Connection]:
+        """
+        Checks out a connection to db_path, opening one if none is idle.
+
+        Yields:
+            A connection with WAL and the other get_db_connection pragmas
+            applied.
+        """
+        with self._lock:
+            idle = self._idle.setdefault(
+                str(db_path), queue.LifoQueue(self.max_idle))
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            conn = get_db_connection(db_path, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                # Don't hand the next request a half-done write
+                conn.rollback()
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self) -> None:
+        """Closes every idle connection (on app shutdown)."""
+        with self._lock:
+            idle_queues, self._idle = list(self._idle.values()), {}
+        for idle in idle_queues:
+            while True:
+                try:
+                    idle.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+# Sync endpoints run on a threadpool; at most this many idle connections are
+# kept per DB
+db_pool = ConnectionPool(
+    max_idle=int(os.environ.get("LOOPSLEUTH_DB_POOL_SIZE", "8")))
+
+# Sync endpoints share anyio's default thread limiter (40 tokens); raise it so
+# slow SQLite reads on one endpoint don't queue thumbnail/static requests
+# behind them
+THREADPOOL_SIZE = int(os.environ.get("LOOPSLEUTH_THREADPOOL_SIZE", "64"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = THREADPOOL_SIZE
+    yield
+    db_pool.close_all()
+
+if orjson is not None:
+    class FastJSONResponse(JSONResponse):
+        """JSONResponse serialized with orjson (straight to bytes, no str
+        round-trip)."""
+        def render(self, content) -> bytes:
+            # Some routes key dicts by int ids, which stdlib json stringifies
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+else:
+    FastJSONResponse = JSONResponse
+
 # --- App setup ---
 # Use the main production database by default
-app = FastAPI(title="LoopSleuth Web")
+app = FastAPI(title="LoopSleuth Web", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
 
 # Mount static files (for thumbnails, CSS, JS, etc.)
 static_dir = Path(__file__).parent / "static"
@@ -48,7 +156,37 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
 # Set up Jinja2 templates
 templates_dir = Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=str(templates_dir))
+# Compiled template bytecode is cached on disk, so a restart skips re-parsing
+# and re-compiling every template; set LOOPSLEUTH_TEMPLATE_AUTO_RELOAD=0 in
+# production to also skip the per-render template mtime check
+JINJA_CACHE_DIR = Path(
+    os.environ.get("LOOPSLEUTH_TEMPLATE_CACHE_DIR")
+    or Path(tempfile.gettempdir()) / "loopsleuth-jinja-{}".format(
+        os.getuid() if hasattr(os, "getuid") else "user")
+).resolve()
+
+
+class LazyBytecodeCache(FileSystemBytecodeCache):
+    """Bytecode cache that creates its directory on first write and never
+    fails a render."""
+    def dump_bytecode(self, bucket) -> None:
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            print(f"[Templates] Could not write bytecode cache to "
+                  f"{self.directory}: {e}")
+
+
+templates_env = Environment(
+    loader=FileSystemLoader(str(templates_dir)),
+    autoescape=select_autoescape(),
+    auto_reload=os.environ.get("LOOPSLEUTH_TEMPLATE_AUTO_RELOAD", "1") != "0",
+    cache_size=-1,  # Never evict; there are only a handful of templates
+    bytecode_cache=LazyBytecodeCache(str(JINJA_CACHE_DIR)),
+)
+templates = Jinja2Templates(env=templates_env)
+
 
 # --- Custom Jinja2 filter for file size formatting ---
 def filesizeformat(value):
@@ -62,10 +200,160 @@ def filesizeformat(value):
         value /= 1024.0
     return f"{value:.1f} PB"
 
+
 templates.env.filters["filesizeformat"] = filesizeformat
 
 THUMB_DIR = Path(".loopsleuth_data/thumbnails")
-STATIC_DIR = Path(__file__).parent / "static" # Define static dir for placeholder check
+# Define static dir for placeholder check
+STATIC_DIR = Path(__file__).parent / "static"
+
+# --- Shared SQL ---
+# One literal per statement, so every route hits the same entry in each
+# pooled connection's statement cache instead of re-preparing a differently
+# indented copy
+CLIP_TAGS_SQL = """
+    SELECT t.name FROM tags t
+    JOIN clip_tags ct ON t.id = ct.tag_id
+    WHERE ct.clip_id = ?
+    ORDER BY t.name ASC
+"""
+# Batched variants for a page of clips: the ids go in as one JSON array
+# parameter, so the SQL text (and its cached statement) is the same for any
+# page size
+PAGE_TAGS_SQL = """
+    SELECT ct.clip_id, t.name FROM clip_tags ct
+    JOIN tags t ON t.id = ct.tag_id
+    WHERE ct.clip_id IN (SELECT value FROM json_each(?))
+    ORDER BY t.name ASC
+"""
+PAGE_PLAYLISTS_SQL = """
+    SELECT pc.clip_id, p.id, p.name FROM playlist_clips pc
+    JOIN playlists p ON pc.playlist_id = p.id
+    WHERE pc.clip_id IN (SELECT value FROM json_each(?))
+    ORDER BY p.name ASC
+"""
+CLIP_DETAIL_SQL = """
+    SELECT id, filename, path, thumbnail_path, starred, width, height, size,
+        codec_name
+    FROM clips WHERE id = ?
+"""
+
+
+def fetch_page_tags_and_playlists(
+    cursor: sqlite3.Cursor, clip_ids: List[int]
+) -> Tuple[Dict[int, List[str]], Dict[int, List[Dict]]]:
+    """
+    Loads the tags and playlist memberships of a page of clips in two queries
+    (instead of two per clip).
+
+    Returns:
+        (sorted tag names per clip id, [{"id", "name"}] playlists per clip id)
+    """
+    tags_by_clip: Dict[int, List[str]] = {
+        clip_id: [] for clip_id in clip_ids}
+    playlists_by_clip: Dict[int, List[Dict]] = {
+        clip_id: [] for clip_id in clip_ids}
+    if not clip_ids:
+        return tags_by_clip, playlists_by_clip
+    ids_json = json.dumps(clip_ids)
+    cursor.execute(PAGE_TAGS_SQL, (ids_json,))
+    for clip_id, name in cursor.fetchall():
+        tags_by_clip[clip_id].append(name)
+    cursor.execute(PAGE_PLAYLISTS_SQL, (ids_json,))
+    for clip_id, playlist_id, name in cursor.fetchall():
+        playlists_by_clip[clip_id].append({"id": playlist_id, "name": name})
+    return tags_by_clip, playlists_by_clip
+
+
+# Optional grid/api_clips filters (?starred=0|1, ?tag=name), written as static
+# NULL guards so the SQL text (and its cached statement) is the same whether or
+# not a filter is set. Expects the clips table aliased as c.
+CLIP_FILTER_SQL = """
+    (:starred IS NULL OR c.starred = :starred)
+    AND (:tag IS NULL OR EXISTS (
+        SELECT 1 FROM clip_tags ct JOIN tags t ON t.id = ct.tag_id
+        WHERE ct.clip_id = c.id AND t.name = :tag
+    ))
+"""
+
+
+def get_clip_filters(request: Request) -> Dict[str, object]:
+    """Parses the starred/tag filter query params into CLIP_FILTER_SQL
+    parameters."""
+    starred = request.query_params.get("starred")
+    tag = (request.query_params.get("tag") or "").strip()
+    return {
+        "starred": int(starred == "1") if starred in ("0", "1") else None,
+        "tag": tag or None,
+    }
+
+
+# Whitelisted grid sort columns/directions. Besides keeping request values out
+# of the SQL text, this bounds the ORDER BY variants (and so cached statements)
+VALID_SORTS = {"filename", "modified_at", "size", "duration", "starred"}
+VALID_ORDERS = {"asc", "desc"}
+
+
+def get_order_by(sort: str, order: str, starred_first: bool) -> str:
+    """Builds the ORDER BY clause for whitelisted sort/order values."""
+    if starred_first:
+        return f"starred DESC, {sort} {order.upper()}"
+    return f"{sort} {order.upper()}"
+
+
+# --- Conditional GET support ---
+# Changes on every server start, so pages rendered by older code/templates
+# never revalidate
+_BOOT_ID = f"{os.getpid():x}{time.time_ns():x}"
+
+
+def get_db_etag(db_path: Path) -> Optional[str]:
+    """
+    Returns a weak ETag for the current contents of the database at db_path.
+
+    Every commit, whichever process makes it (this app, a background scan, the
+    TUI), touches the DB file or its WAL, so their mtime/size change whenever
+    the data does. Two stat() calls are much cheaper than the queries and
+    template render they let a 304 skip.
+
+    Returns:
+        The ETag, or None if the DB file can't be stat'ed (no caching then).
+    """
+    parts = [_BOOT_ID]
+    for path in (db_path, Path(f"{db_path}-wal")):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            if path == db_path:
+                return None
+            parts.append("0")  # Not in WAL mode, or no connection open
+            continue
+        except OSError:
+            return None
+        if path != db_path and st.st_size == 0:
+            # Opening a connection creates an empty WAL; that's no change to
+            # the data
+            parts.append("0")
+            continue
+        parts.append(f"{st.st_mtime_ns:x}.{st.st_size:x}")
+    return 'W/"' + "-".join(parts) + '"'
+
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """Returns a 304 response if the client's cached copy matches etag."""
+    if etag is not None and etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={
+            "ETag": etag, "Cache-Control": "private, no-cache"})
+    return None
+
+
+def with_etag(response: Response, etag: Optional[str]) -> Response:
+    """Marks a page as cacheable, but only after revalidating against etag."""
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
 
 # --- Routes ---
 @app.get("/", response_class=HTMLResponse)
@@ -75,11 +363,22 @@ def grid(request: Request):
     Supports filtering by playlist_id (if provided as a query param).
     """
     db_path = get_db_path_from_request(request)
+    # Taken before reading, so a write that lands mid-render changes the next
+    # ETag
+    etag = get_db_etag(db_path)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
     default_scan_folder = "E:/Downloads"
     sort = request.query_params.get("sort", "filename")
     order = request.query_params.get("order", "asc")
+    if sort not in VALID_SORTS:
+        sort = "filename"
+    if order not in VALID_ORDERS:
+        order = "asc"
     starred_first = request.query_params.get("starred_first", "0") == "1"
     playlist_id = request.query_params.get("playlist_id")
+    filters = get_clip_filters(request)
     try:
         page = int(request.query_params.get("page", 1))
         if page < 1:
@@ -93,86 +392,86 @@ def grid(request: Request):
     except Exception:
         per_page = 100
     offset = (page - 1) * per_page
-    if starred_first:
-        order_by = f"starred DESC, {sort} {order.upper()}"
-    else:
-        order_by = f"{sort} {order.upper()}"
-    conn = None
+    order_by = get_order_by(sort, order, starred_first)
     clips = []
     total_clips = 0
     has_duplicates = False
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        # Check for flagged duplicates
-        cursor.execute("SELECT 1 FROM clips WHERE needs_review = 1 LIMIT 1")
-        if cursor.fetchone():
-            has_duplicates = True
-        # Get the latest scan_id
-        cursor.execute("SELECT id FROM scans ORDER BY scanned_at DESC LIMIT 1")
-        row = cursor.fetchone()
-        latest_scan_id = row[0] if row else None
-        if latest_scan_id is not None:
-            if playlist_id:
-                # Filter by playlist membership
-                cursor.execute("""
-                    SELECT COUNT(*) FROM playlist_clips pc
-                    JOIN clips c ON pc.clip_id = c.id
-                    WHERE pc.playlist_id = ? AND c.scan_id = ?
-                """, (playlist_id, latest_scan_id))
-                total_clips = cursor.fetchone()[0]
-                cursor.execute(f"""
-                    SELECT c.id, c.filename, c.path, c.duration, c.thumbnail_path, c.starred, c.size, c.modified_at
-                    FROM playlist_clips pc
-                    JOIN clips c ON pc.clip_id = c.id
-                    WHERE pc.playlist_id = ? AND c.scan_id = ?
-                    ORDER BY pc.position ASC, c.id ASC
-                    LIMIT ? OFFSET ?
-                """, (playlist_id, latest_scan_id, per_page, offset))
-            else:
-                cursor.execute("SELECT COUNT(*) FROM clips WHERE scan_id = ?", (latest_scan_id,))
-                total_clips = cursor.fetchone()[0]
-                cursor.execute(f"""
-                    SELECT id, filename, path, duration, thumbnail_path, starred, size, modified_at
-                    FROM clips
-                    WHERE scan_id = ?
-                    ORDER BY {order_by}
-                    LIMIT ? OFFSET ?
-                """, (latest_scan_id, per_page, offset))
-        else:
-            total_clips = 0
-            cursor.execute("SELECT id, filename, path, duration, thumbnail_path, starred, size, modified_at FROM clips WHERE 0")
-        for row in cursor.fetchall():
-            clip = dict(row)
-            # Fetch tags for this clip
-            cursor.execute("""
-                SELECT t.name FROM tags t
-                JOIN clip_tags ct ON t.id = ct.tag_id
-                WHERE ct.clip_id = ?
-                ORDER BY t.name ASC
-            """, (clip['id'],))
-            tag_list = [r[0] for r in cursor.fetchall()]
-            clip['tags'] = tag_list
-            thumb_path = clip.get('thumbnail_path', '')
-            if thumb_path:
-                clip['thumb_filename'] = thumb_path.replace('\\', '/').split('/')[-1]
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            # Check for flagged duplicates
+            cursor.execute(
+                "SELECT 1 FROM clips WHERE needs_review = 1 LIMIT 1")
+            if cursor.fetchone():
+                has_duplicates = True
+            # Get the latest scan_id
+            cursor.execute(
+                "SELECT id FROM scans ORDER BY scanned_at DESC LIMIT 1")
+            row = cursor.fetchone()
+            latest_scan_id = row[0] if row else None
+            if latest_scan_id is not None:
+                params = dict(filters, playlist_id=playlist_id,
+                              scan_id=latest_scan_id, limit=per_page,
+                              offset=offset)
+                if playlist_id:
+                    # Filter by playlist membership
+                    cursor.execute(f"""
+                        SELECT COUNT(*) FROM playlist_clips pc
+                        JOIN clips c ON pc.clip_id = c.id
+                        WHERE pc.playlist_id = :playlist_id
+                            AND c.scan_id = :scan_id AND {CLIP_FILTER_SQL}
+                    """, params)
+                    total_clips = cursor.fetchone()[0]
+                    cursor.execute(f"""
+                        SELECT c.id, c.filename, c.path, c.duration,
+                            c.thumbnail_path, c.starred, c.size, c.modified_at
+                        FROM playlist_clips pc
+                        JOIN clips c ON pc.clip_id = c.id
+                        WHERE pc.playlist_id = :playlist_id
+                            AND c.scan_id = :scan_id AND {CLIP_FILTER_SQL}
+                        ORDER BY pc.position ASC, c.id ASC
+                        LIMIT :limit OFFSET :offset
+                    """, params)
+                else:
+                    cursor.execute(f"""
+                        SELECT COUNT(*) FROM clips c
+                        WHERE c.scan_id = :scan_id AND {CLIP_FILTER_SQL}
+                    """, params)
+                    total_clips = cursor.fetchone()[0]
+                    cursor.execute(f"""
+                        SELECT id, filename, path, duration, thumbnail_path,
+                            starred, size, modified_at
+                        FROM clips c
+                        WHERE c.scan_id = :scan_id AND {CLIP_FILTER_SQL}
+                        ORDER BY {order_by}
+                        LIMIT :limit OFFSET :offset
+                    """, params)
             else:
-                clip['thumb_filename'] = ''
-            # --- Fetch playlists for this clip ---
-            cursor.execute("""
-                SELECT p.id, p.name FROM playlist_clips pc
-                JOIN playlists p ON pc.playlist_id = p.id
-                WHERE pc.clip_id = ?
-                ORDER BY p.name ASC
-            """, (clip['id'],))
-            clip['playlists'] = [dict(id=r[0], name=r[1]) for r in cursor.fetchall()]
-            clips.append(clip)
+                total_clips = 0
+                cursor.execute(
+                    "SELECT id, filename, path, duration, thumbnail_path, "
+                    "starred, size, modified_at FROM clips WHERE 0")
+            # Iterate the cursor itself: no intermediate fetchall() list of
+            # Rows
+            page_clips = [dict(row) for row in cursor]
+            # Tags and playlists for the whole page in two queries
+            tags_by_clip, playlists_by_clip = fetch_page_tags_and_playlists(
+                cursor, [clip['id'] for clip in page_clips]
+            )
+            for clip in page_clips:
+                clip['tags'] = tags_by_clip[clip['id']]
+                thumb_path = clip.get('thumbnail_path', '')
+                if thumb_path:
+                    clip['thumb_filename'] = (
+                        thumb_path.replace('\\', '/').split('/')[-1])
+                else:
+                    clip['thumb_filename'] = ''
+                clip['playlists'] = playlists_by_clip[clip['id']]
+            clips = page_clips
     except Exception as e:
         print(f"[Error] Could not load clips: {e}")
-    finally:
-        if conn:
-            conn.close()
-    return templates.TemplateResponse(
+        etag = None  # Don't let clients cache the empty error page
+    response = templates.TemplateResponse(
         "grid.html", {
             "request": request,
             "clips": clips,
@@ -186,6 +485,8 @@ def grid(request: Request):
             "has_duplicates": has_duplicates
         }
     )
+    return with_etag(response, etag)
+
 
 @app.get("/clip/{clip_id}", response_class=HTMLResponse)
 def clip_detail(request: Request, clip_id: int):
@@ -193,102 +494,187 @@ def clip_detail(request: Request, clip_id: int):
     Detail page for a single clip: video playback and metadata.
     """
     db_path = get_db_path_from_request(request)
-    conn = None
+    etag = get_db_etag(db_path)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
     clip = None
     video_mime = "video/mp4"  # Default
     all_playlists = []
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, filename, path, thumbnail_path, starred, width, height, size, codec_name
-            FROM clips WHERE id = ?
-        """, (clip_id,))
-        row = cursor.fetchone()
-        if row:
-            clip = dict(row)
-            # Fetch tags for this clip
-            cursor.execute("""
-                SELECT t.name FROM tags t
-                JOIN clip_tags ct ON t.id = ct.tag_id
-                WHERE ct.clip_id = ?
-                ORDER BY t.name ASC
-            """, (clip['id'],))
-            tag_list = [r[0] for r in cursor.fetchall()]
-            clip['tags'] = tag_list
-            # Guess MIME type from filename
-            mime, _ = mimetypes.guess_type(clip['path'])
-            if mime and mime.startswith('video/'):
-                video_mime = mime
-            # Fetch all playlists and annotate membership
-            cursor.execute("SELECT id, name FROM playlists ORDER BY name ASC")
-            playlists = [dict(id=r[0], name=r[1]) for r in cursor.fetchall()]
-            # Fetch playlist IDs for this clip
-            cursor.execute("SELECT playlist_id FROM playlist_clips WHERE clip_id = ?", (clip['id'],))
-            member_ids = set(r[0] for r in cursor.fetchall())
-            for pl in playlists:
-                pl['is_member'] = pl['id'] in member_ids
-            all_playlists = playlists
-        else:
-            # Return a custom 404 page if the clip is not found
-            return templates.TemplateResponse(
-                "404.html", {"request": request, "message": f"Clip with ID {clip_id} not found."}, status_code=404
-            )
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(CLIP_DETAIL_SQL, (clip_id,))
+            row = cursor.fetchone()
+            if row:
+                clip = dict(row)
+                # Fetch tags for this clip
+                cursor.execute(CLIP_TAGS_SQL, (clip['id'],))
+                tag_list = [r[0] for r in cursor.fetchall()]
+                clip['tags'] = tag_list
+                # Guess MIME type from filename
+                mime, _ = mimetypes.guess_type(clip['path'])
+                if mime and mime.startswith('video/'):
+                    video_mime = mime
+                # Fetch all playlists and annotate membership
+                cursor.execute(
+                    "SELECT id, name FROM playlists ORDER BY name ASC")
+                playlists = [
+                    dict(id=r[0], name=r[1]) for r in cursor.fetchall()]
+                # Fetch playlist IDs for this clip
+                cursor.execute(
+                    "SELECT playlist_id FROM playlist_clips "
+                    "WHERE clip_id = ?", (clip['id'],))
+                member_ids = set(r[0] for r in cursor.fetchall())
+                for pl in playlists:
+                    pl['is_member'] = pl['id'] in member_ids
+                all_playlists = playlists
+            else:
+                # Return a custom 404 page if the clip is not found
+                return templates.TemplateResponse(
+                    "404.html",
+                    {"request": request,
+                     "message": f"Clip with ID {clip_id} not found."},
+                    status_code=404
+                )
     except Exception as e:
         print(f"[Error] Could not load clip {clip_id}: {e}")
         # Return a user-friendly error page
         return templates.TemplateResponse(
             "error.html", {"request": request, "message": f"An error occurred while loading the clip: {e}"}, status_code=500
         )
-    finally:
-        if conn:
-            conn.close()
-    return templates.TemplateResponse(
-        "clip_detail.html", {"request": request, "clip": clip, "video_mime": video_mime, "all_playlists": all_playlists}
+    response = templates.TemplateResponse(
+        "clip_detail.html", {
+            "request": request,
+            "clip": clip,
+            "video_mime": video_mime,
+            "all_playlists": all_playlists,
+        }
     )
+    return with_etag(response, etag)
+
+
+THUMB_BLOB_RE = re.compile(r"^clip_(\d+)(_anim\.webp|\.jpg)$")
+# Thumbnail names are keyed by clip id and get overwritten on regeneration, so
+# they can't be marked immutable; browsers reuse them for max-age seconds and
+# then revalidate against the ETag
+THUMB_MAX_AGE = int(os.environ.get("LOOPSLEUTH_THUMB_MAX_AGE", "3600"))
+THUMB_CACHE_CONTROL = f"public, max-age={THUMB_MAX_AGE}"
+
+
+def thumbnail_response(request: Request, response: Response) -> Response:
+    """Adds thumbnail caching headers, or swaps in a 304 if the client's copy
+    is current."""
+    etag = response.headers.get("etag")
+    if etag is not None and etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={
+            "ETag": etag, "Cache-Control": THUMB_CACHE_CONTROL})
+    response.headers["Cache-Control"] = THUMB_CACHE_CONTROL
+    return response
+
+
+def _thumbnail_file(request: Request, path: Path) -> Response:
+    """FileResponse for a thumbnail on disk, with its ETag set up front so it
+    can be validated."""
+    return thumbnail_response(
+        request, FileResponse(path, stat_result=path.stat()))
+
+
+def _load_thumbnail_blob(db_path: Path, filename: str) -> Optional[Response]:
+    """Returns the packed thumbnail bytes for a clip_<id> filename, if
+    stored."""
+    match = THUMB_BLOB_RE.match(filename)
+    if not match:
+        return None
+    if match.group(2) == "_anim.webp":
+        column, media_type = "webp", "image/webp"
+    else:
+        column, media_type = "jpeg", "image/jpeg"
+    try:
+        with db_pool.acquire(db_path) as conn:
+            row = conn.execute(
+                f"SELECT {column} FROM thumbnails WHERE clip_id = ?",
+                (int(match.group(1)),),
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"[Serve Thumbnail] DB error reading packed thumbnail "
+              f"{filename}: {e}")
+        return None
+    if row is None or row[0] is None:
+        return None
+    blob = row[0]
+    etag = f'"{zlib.crc32(blob):08x}-{len(blob):x}"'
+    return Response(content=blob, media_type=media_type,
+                    headers={"ETag": etag})
+
 
 @app.get("/thumbs/{filename}")
-def serve_thumbnail(filename: str):
+def serve_thumbnail(filename: str, request: Request):
     # Basic security: prevent path traversal
     if ".." in filename or filename.startswith("/"):
         print(f"[Serve Thumbnail] Invalid filename attempt: {filename}")
         raise HTTPException(status_code=400, detail="Invalid filename.")
 
-    print(f"[Serve Thumbnail] Requested filename: {filename}") # Log requested filename
+    # Log requested filename
+    print(f"[Serve Thumbnail] Requested filename: {filename}")
 
     if filename == "missing.jpg":
         print(f"[Serve Thumbnail] Explicitly asked for missing.jpg. This is unusual.")
         # Let's try to serve the actual placeholder if this happens, to avoid deeper errors
         # This is a temporary diagnostic measure.
-        placeholder_path = STATIC_DIR / "placeholder.png" # Assuming you have this
+        # Assuming you have this
+        placeholder_path = STATIC_DIR / "placeholder.png"
         if placeholder_path.is_file():
             print(f"[Serve Thumbnail] Serving actual placeholder.png for missing.jpg request: {placeholder_path}")
-            return FileResponse(placeholder_path)
+            return _thumbnail_file(request, placeholder_path)
         else:
             print(f"[Serve Thumbnail] Actual placeholder.png not found at {placeholder_path} when missing.jpg was requested.")
             raise HTTPException(status_code=404, detail="Fallback placeholder missing.jpg and actual placeholder.png not found.")
 
     thumb_path = THUMB_DIR / filename
-    print(f"[Serve Thumbnail] Attempting to serve: {thumb_path}") # Log full path
+    # Log full path
+    print(f"[Serve Thumbnail] Attempting to serve: {thumb_path}")
 
     if not thumb_path.is_file():
         print(f"[Serve Thumbnail] File not found at path: {thumb_path}")
-        # If an _anim.gif is not found, let's try to serve its static .jpg counterpart
+        # With LOOPSLEUTH_PACK_THUMBNAILS=1, fall back to the copy packed in
+        # the DB
+        if PACK_THUMBNAILS:
+            blob_response = _load_thumbnail_blob(
+                get_db_path_from_request(request), filename)
+            if blob_response is not None:
+                return thumbnail_response(request, blob_response)
+        # If an _anim.webp is not found, try a GIF preview from older versions,
+        # then its static .jpg counterpart
         # This is a more graceful fallback than a generic 404 for the animation
-        if filename.endswith("_anim.gif"):
-            static_filename = filename.replace("_anim.gif", ".jpg")
+        if filename.endswith("_anim.webp"):
+            legacy_filename = filename.replace("_anim.webp", "_anim.gif")
+            legacy_thumb_path = THUMB_DIR / legacy_filename
+            if legacy_thumb_path.is_file():
+                print(f"[Serve Thumbnail] Serving legacy GIF preview "
+                      f"{legacy_filename} for {filename}.")
+                return _thumbnail_file(request, legacy_thumb_path)
+        if filename.endswith("_anim.webp") or filename.endswith("_anim.gif"):
+            static_filename = filename.rsplit("_anim.", 1)[0] + ".jpg"
             static_thumb_path = THUMB_DIR / static_filename
-            print(f"[Serve Thumbnail] Animated GIF {filename} not found, trying static fallback: {static_thumb_path}")
+            print(f"[Serve Thumbnail] Animated preview {filename} not found, "
+                  f"trying static fallback: {static_thumb_path}")
             if static_thumb_path.is_file():
-                print(f"[Serve Thumbnail] Serving static fallback {static_filename} for missing animated GIF.")
-                return FileResponse(static_thumb_path)
+                print(f"[Serve Thumbnail] Serving static fallback "
+                      f"{static_filename} for missing animated preview.")
+                return _thumbnail_file(request, static_thumb_path)
             else:
                 print(f"[Serve Thumbnail] Static fallback {static_filename} also not found.")
-        # If still not found (or wasn't an anim.gif request), raise 404 for the original request
-        raise HTTPException(status_code=404, detail=f"Thumbnail {filename} not found, and no suitable fallback available.")
-    
+        # If still not found (or wasn't an animated preview request), raise
+        # 404 for the original request
+        raise HTTPException(
+            status_code=404,
+            detail=f"Thumbnail {filename} not found, and no suitable "
+                   f"fallback available.")
+
     print(f"[Serve Thumbnail] Serving file: {thumb_path}")
-    return FileResponse(thumb_path)
+    return _thumbnail_file(request, thumb_path)
+
 
 @app.get("/media/{filename:path}")
 def serve_video(filename: str):
@@ -305,6 +691,7 @@ def serve_video(filename: str):
         return FileResponse("404.mp4", status_code=404)  # Optionally serve a placeholder
     return FileResponse(file_path)
 
+
 @app.post("/scan_folder")
 def scan_folder(request: Request, folder_path: str = Form(...), force_rescan: bool = Form(False), db_path: Optional[str] = Form(None), db_path_manual: Optional[str] = Form(None), background_tasks: BackgroundTasks = None):
     """
@@ -318,7 +705,9 @@ def scan_folder(request: Request, folder_path: str = Form(...), force_rescan: bo
     if not scan_folder_path.exists() or not scan_folder_path.is_dir():
         return JSONResponse({"error": f"Scan folder does not exist or is not a directory: {scan_folder_path}"}, status_code=400)
     if not os.access(scan_folder_path, os.R_OK):
-        return JSONResponse({"error": f"Scan folder is not readable: {scan_folder_path}"}, status_code=400)
+        return JSONResponse(
+            {"error": f"Scan folder is not readable: {scan_folder_path}"},
+            status_code=400)
 
     # --- Database path resolution and validation ---
     db_path_final = None
@@ -335,15 +724,22 @@ def scan_folder(request: Request, folder_path: str = Form(...), force_rescan: bo
     # Validate DB path: must not be a directory, must not contain forbidden chars, must not be reserved, must end with .db
     db_name = db_path_final.name
     if db_path_final.is_dir():
-        return JSONResponse({"error": f"Database path cannot be a directory: {db_path_final}"}, status_code=400)
+        return JSONResponse(
+            {"error": f"Database path cannot be a directory: {db_path_final}"},
+            status_code=400)
     if re.search(forbidden_chars, db_name):
         return JSONResponse({"error": f"Database name contains forbidden characters: {db_name}"}, status_code=400)
     if db_name.split(".")[0].upper() in reserved_names:
-        return JSONResponse({"error": f"Database name is a reserved system name: {db_name}"}, status_code=400)
+        return JSONResponse(
+            {"error": f"Database name is a reserved system name: {db_name}"},
+            status_code=400)
     if not db_name.lower().endswith(".db"):
-        return JSONResponse({"error": f"Database name must end with .db: {db_name}"}, status_code=400)
+        return JSONResponse(
+            {"error": f"Database name must end with .db: {db_name}"},
+            status_code=400)
     if not db_name or db_name.strip() == "":
-        return JSONResponse({"error": "Database name cannot be empty."}, status_code=400)
+        return JSONResponse(
+            {"error": "Database name cannot be empty."}, status_code=400)
     # Optionally: check for write permission in the target directory
     db_dir = db_path_final.parent.resolve()
     if not db_dir.exists():
@@ -352,13 +748,16 @@ def scan_folder(request: Request, folder_path: str = Form(...), force_rescan: bo
         except Exception as e:
             return JSONResponse({"error": f"Could not create database directory: {db_dir}. Error: {e}"}, status_code=400)
     if not os.access(db_dir, os.W_OK):
-        return JSONResponse({"error": f"Database directory is not writable: {db_dir}"}, status_code=400)
+        return JSONResponse(
+            {"error": f"Database directory is not writable: {db_dir}"},
+            status_code=400)
 
     # --- Scan lock: prevent overlapping scans ---
     if lock_path.exists():
         mtime = datetime.fromtimestamp(lock_path.stat().st_mtime)
         if datetime.now() - mtime < timedelta(hours=1):
-            return JSONResponse({"error": "A scan is already in progress."}, status_code=409)
+            return JSONResponse(
+                {"error": "A scan is already in progress."}, status_code=409)
         else:
             # Stale lock, remove it
             lock_path.unlink()
@@ -398,31 +797,34 @@ def scan_folder(request: Request, folder_path: str = Form(...), force_rescan: bo
             lock_path.unlink()
         return JSONResponse({"error": f"Scan failed: {e}"}, status_code=500)
 
+
 @app.post("/star/{clip_id}")
 def toggle_star(request: Request, clip_id: int):
     """Toggle the 'starred' flag for a clip and return the new state as JSON."""
     db_path = get_db_path_from_request(request)
-    conn = None
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT starred FROM clips WHERE id = ?", (clip_id,))
-        row = cursor.fetchone()
-        if not row:
-            return JSONResponse({"error": "Clip not found"}, status_code=404)
-        new_star = 0 if row[0] else 1
-        cursor.execute("UPDATE clips SET starred = ? WHERE id = ?", (new_star, clip_id))
-        conn.commit()
-        return JSONResponse({"starred": new_star})
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT starred FROM clips WHERE id = ?", (clip_id,))
+            row = cursor.fetchone()
+            if not row:
+                return JSONResponse(
+                    {"error": "Clip not found"}, status_code=404)
+            new_star = 0 if row[0] else 1
+            cursor.execute(
+                "UPDATE clips SET starred = ? WHERE id = ?",
+                (new_star, clip_id))
+            conn.commit()
+            return JSONResponse({"starred": new_star})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 class TagUpdate(BaseModel):
     tags: List[str]
 
+
 @app.post("/tag/{clip_id}")
 def update_tags(request: Request, clip_id: int, tag_update: TagUpdate = Body(...)):
     """
@@ -432,62 +834,63 @@ def update_tags(request: Request, clip_id: int, tag_update: TagUpdate = Body(...
     print(f"[DEBUG] Received tag update for clip {clip_id}: {tag_update}")
     tags = [t.strip() for t in tag_update.tags if t.strip()]
     db_path = get_db_path_from_request(request)
-    conn = None
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        # Insert new tags into tags table if not present
-        tag_ids = []
-        for tag in tags:
-            cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-            row = cursor.fetchone()
-            if row:
-                tag_id = row[0]
-            else:
-                cursor.execute("INSERT INTO tags (name) VALUES (?)", (tag,))
-                tag_id = cursor.lastrowid
-            tag_ids.append(tag_id)
-        # Remove all existing tag links for this clip
-        cursor.execute("DELETE FROM clip_tags WHERE clip_id = ?", (clip_id,))
-        # Add new tag links
-        for tag_id in tag_ids:
-            cursor.execute("INSERT INTO clip_tags (clip_id, tag_id) VALUES (?, ?)", (clip_id, tag_id))
-        
-        # --- Remove orphaned tags (tags not referenced by any clip) ---
-        cursor.execute("""
-            DELETE FROM tags
-            WHERE id NOT IN (SELECT tag_id FROM clip_tags)
-        """)
-        # ------------------------------------------------------------
-        
-        conn.commit()
-        return JSONResponse({"tags": tags})
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            # Insert new tags into tags table if not present
+            tag_ids = []
+            for tag in tags:
+                cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
+                row = cursor.fetchone()
+                if row:
+                    tag_id = row[0]
+                else:
+                    cursor.execute(
+                        "INSERT INTO tags (name) VALUES (?)", (tag,))
+                    tag_id = cursor.lastrowid
+                tag_ids.append(tag_id)
+            # Remove all existing tag links for this clip
+            cursor.execute(
+                "DELETE FROM clip_tags WHERE clip_id = ?", (clip_id,))
+            # Add new tag links
+            for tag_id in tag_ids:
+                cursor.execute(
+                    "INSERT INTO clip_tags (clip_id, tag_id) VALUES (?, ?)",
+                    (clip_id, tag_id))
+
+            # --- Remove orphaned tags (tags not referenced by any clip) ---
+            cursor.execute("""
+                DELETE FROM tags
+                WHERE id NOT IN (SELECT tag_id FROM clip_tags)
+            """)
+            # ------------------------------------------------------------
+
+            conn.commit()
+            return JSONResponse({"tags": tags})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.get("/tags")
 def get_all_tags(request: Request, q: str = None):
     """Return a list of all tag names for autocomplete/suggestions. If 'q' is provided, return only tags starting with the prefix (case-insensitive)."""
     db_path = get_db_path_from_request(request)
-    conn = None
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        if q:
-            # Use parameterized LIKE for case-insensitive prefix search
-            cursor.execute("SELECT name FROM tags WHERE LOWER(name) LIKE ? ORDER BY name ASC", (q.lower() + '%',))
-        else:
-            cursor.execute("SELECT name FROM tags ORDER BY name ASC")
-        tags = [row[0] for row in cursor.fetchall()]
-        return JSONResponse({"tags": tags})
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            if q:
+                # Use parameterized LIKE for case-insensitive prefix search
+                cursor.execute(
+                    "SELECT name FROM tags WHERE LOWER(name) LIKE ? "
+                    "ORDER BY name ASC",
+                    (q.lower() + '%',))
+            else:
+                cursor.execute("SELECT name FROM tags ORDER BY name ASC")
+            tags = [row[0] for row in cursor.fetchall()]
+            return JSONResponse({"tags": tags})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.post("/test_tag/{clip_id}")
 async def test_tag(clip_id: int, request: Request):
@@ -495,12 +898,14 @@ async def test_tag(clip_id: int, request: Request):
     print("[DEBUG] /test_tag received:", data)
     return {"received": data}
 
+
 class BatchTagUpdate(BaseModel):
     clip_ids: List[int]
     add_tags: Optional[List[str]] = None
     remove_tags: Optional[List[str]] = None
     clear: Optional[bool] = False
 
+
 @app.post("/batch_tag")
 def batch_tag_update(request: Request, batch_update: BatchTagUpdate = Body(...)):
     """
@@ -512,174 +917,193 @@ def batch_tag_update(request: Request, batch_update: BatchTagUpdate = Body(...))
     Returns: {clip_id: [updated tags, ...], ...}
     """
     db_path = get_db_path_from_request(request)
-    conn = None
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        add_tags = [t.strip() for t in (batch_update.add_tags or []) if t.strip()]
-        remove_tags = [t.strip() for t in (batch_update.remove_tags or []) if t.strip()]
-        result: Dict[int, List[str]] = {}
-        for clip_id in batch_update.clip_ids:
-            # Fetch current tag IDs and names for this clip
-            cursor.execute("""
-                SELECT t.id, t.name FROM tags t
-                JOIN clip_tags ct ON t.id = ct.tag_id
-                WHERE ct.clip_id = ?
-            """, (clip_id,))
-            tag_rows = cursor.fetchall()
-            current_tag_ids = {row[0]: row[1] for row in tag_rows}
-            current_tag_names = set(current_tag_ids.values())
-            if batch_update.clear:
-                # Remove all tags for this clip
-                cursor.execute("DELETE FROM clip_tags WHERE clip_id = ?", (clip_id,))
-                result[clip_id] = []
-                continue
-            # Remove tags if specified
-            if remove_tags:
-                remove_tag_ids = []
-                for tag in remove_tags:
-                    cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-                    row = cursor.fetchone()
-                    if row:
-                        remove_tag_ids.append(row[0])
-                for tag_id in remove_tag_ids:
-                    cursor.execute("DELETE FROM clip_tags WHERE clip_id = ? AND tag_id = ?", (clip_id, tag_id))
-            # Add tags if specified
-            if add_tags:
-                for tag in add_tags:
-                    # Insert tag if not present
-                    cursor.execute("SELECT id FROM tags WHERE name = ?", (tag,))
-                    row = cursor.fetchone()
-                    if row:
-                        tag_id = row[0]
-                    else:
-                        cursor.execute("INSERT INTO tags (name) VALUES (?)", (tag,))
-                        tag_id = cursor.lastrowid
-                    # Add link if not already present
-                    cursor.execute("SELECT 1 FROM clip_tags WHERE clip_id = ? AND tag_id = ?", (clip_id, tag_id))
-                    if not cursor.fetchone():
-                        cursor.execute("INSERT INTO clip_tags (clip_id, tag_id) VALUES (?, ?)", (clip_id, tag_id))
-            # Fetch updated tags for this clip
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            add_tags = [t.strip() for t in (batch_update.add_tags or [])
+                        if t.strip()]
+            remove_tags = [t.strip() for t in (batch_update.remove_tags or [])
+                           if t.strip()]
+            result: Dict[int, List[str]] = {}
+            for clip_id in batch_update.clip_ids:
+                # Fetch current tag IDs and names for this clip
+                cursor.execute("""
+                    SELECT t.id, t.name FROM tags t
+                    JOIN clip_tags ct ON t.id = ct.tag_id
+                    WHERE ct.clip_id = ?
+                """, (clip_id,))
+                tag_rows = cursor.fetchall()
+                current_tag_ids = {row[0]: row[1] for row in tag_rows}
+                current_tag_names = set(current_tag_ids.values())
+                if batch_update.clear:
+                    # Remove all tags for this clip
+                    cursor.execute(
+                        "DELETE FROM clip_tags WHERE clip_id = ?", (clip_id,))
+                    result[clip_id] = []
+                    continue
+                # Remove tags if specified
+                if remove_tags:
+                    remove_tag_ids = []
+                    for tag in remove_tags:
+                        cursor.execute(
+                            "SELECT id FROM tags WHERE name = ?", (tag,))
+                        row = cursor.fetchone()
+                        if row:
+                            remove_tag_ids.append(row[0])
+                    for tag_id in remove_tag_ids:
+                        cursor.execute(
+                            "DELETE FROM clip_tags WHERE clip_id = ? "
+                            "AND tag_id = ?",
+                            (clip_id, tag_id))
+                # Add tags if specified
+                if add_tags:
+                    for tag in add_tags:
+                        # Insert tag if not present
+                        cursor.execute(
+                            "SELECT id FROM tags WHERE name = ?", (tag,))
+                        row = cursor.fetchone()
+                        if row:
+                            tag_id = row[0]
+                        else:
+                            cursor.execute(
+                                "INSERT INTO tags (name) VALUES (?)", (tag,))
+                            tag_id = cursor.lastrowid
+                        # Add link if not already present
+                        cursor.execute(
+                            "SELECT 1 FROM clip_tags WHERE clip_id = ? "
+                            "AND tag_id = ?",
+                            (clip_id, tag_id))
+                        if not cursor.fetchone():
+                            cursor.execute(
+                                "INSERT INTO clip_tags (clip_id, tag_id) "
+                                "VALUES (?, ?)",
+                                (clip_id, tag_id))
+                # Fetch updated tags for this clip
+                cursor.execute(CLIP_TAGS_SQL, (clip_id,))
+                updated_tags = [row[0] for row in cursor.fetchall()]
+                result[clip_id] = updated_tags
+            # Remove orphaned tags (tags not referenced by any clip)
             cursor.execute("""
-                SELECT t.name FROM tags t
-                JOIN clip_tags ct ON t.id = ct.tag_id
-                WHERE ct.clip_id = ?
-                ORDER BY t.name ASC
-            """, (clip_id,))
-            updated_tags = [row[0] for row in cursor.fetchall()]
-            result[clip_id] = updated_tags
-        # Remove orphaned tags (tags not referenced by any clip)
-        cursor.execute("""
-            DELETE FROM tags
-            WHERE id NOT IN (SELECT tag_id FROM clip_tags)
-        """)
-        conn.commit()
-        return JSONResponse(result)
+                DELETE FROM tags
+                WHERE id NOT IN (SELECT tag_id FROM clip_tags)
+            """)
+            conn.commit()
+            return JSONResponse(result)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 class ExportSelectedRequest(BaseModel):
     clip_ids: List[int]
 
+
 @app.post("/export_selected")
-def export_selected(export_req: ExportSelectedRequest = Body(...)):
+def export_selected(request: Request,
+                    export_req: ExportSelectedRequest = Body(...)):
     """
     Export the absolute paths of selected clips as a downloadable keepers.txt file.
     Accepts JSON: {"clip_ids": [1,2,3,...]}
     Returns: keepers.txt (text/plain, one absolute path per line)
     """
     db_path = get_db_path_from_request(request)
-    conn = None
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        paths = []
-        for clip_id in export_req.clip_ids:
-            cursor.execute("SELECT path FROM clips WHERE id = ?", (clip_id,))
-            row = cursor.fetchone()
-            if row and row[0]:
-                paths.append(str(row[0]))
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            paths = []
+            for clip_id in export_req.clip_ids:
+                cursor.execute(
+                    "SELECT path FROM clips WHERE id = ?", (clip_id,))
+                row = cursor.fetchone()
+                if row and row[0]:
+                    paths.append(str(row[0]))
         if not paths:
-            return JSONResponse({"error": "No valid paths for selected clips."}, status_code=400)
+            return JSONResponse(
+                {"error": "No valid paths for selected clips."},
+                status_code=400)
         # Write to a temporary file
         with tempfile.NamedTemporaryFile("w", delete=False, encoding="utf-8", suffix=".txt") as tmp:
             for p in paths:
                 tmp.write(p + "\n")
             tmp_path = tmp.name
         # Return as a downloadable file
-        return FileResponse(tmp_path, filename="keepers.txt", media_type="text/plain")
+        # (temp file cleanup is left to the OS; a background task could
+        # remove it)
+        return FileResponse(tmp_path, filename="keepers.txt",
+                            media_type="text/plain")
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
-        # Clean up temp file after response (handled by OS, but can add background task if needed)
+
 
 class CopySelectedRequest(BaseModel):
     clip_ids: List[int]
     dest_folder: str
 
+
 @app.post("/copy_selected")
-def copy_selected(copy_req: CopySelectedRequest = Body(...)):
+def copy_selected(request: Request, copy_req: CopySelectedRequest = Body(...)):
     """
     Copy the selected clips to the specified destination folder.
     Accepts JSON: {"clip_ids": [1,2,3,...], "dest_folder": "/path/to/folder"}
     Returns: {"results": {filename: "ok"|"error: ...", ...}}
     """
     db_path = get_db_path_from_request(request)
-    conn = None
     results = {}
     try:
         dest = Path(copy_req.dest_folder)
         if not dest.exists() or not dest.is_dir():
-            return JSONResponse({"error": f"Destination folder does not exist: {dest}"}, status_code=400)
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        for clip_id in copy_req.clip_ids:
-            cursor.execute("SELECT filename, path FROM clips WHERE id = ?", (clip_id,))
-            row = cursor.fetchone()
-            if not row or not row[1]:
-                results[str(clip_id)] = "error: missing path"
-                continue
-            src = Path(row[1])
-            if not src.exists():
-                results[row[0]] = f"error: source not found ({src})"
-                continue
-            try:
-                shutil.copy2(src, dest / src.name)
-                results[row[0]] = "ok"
-            except Exception as e:
-                results[row[0]] = f"error: {e}"
-        return JSONResponse({"results": results})
+            return JSONResponse(
+                {"error": f"Destination folder does not exist: {dest}"},
+                status_code=400)
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            for clip_id in copy_req.clip_ids:
+                cursor.execute(
+                    "SELECT filename, path FROM clips WHERE id = ?",
+                    (clip_id,))
+                row = cursor.fetchone()
+                if not row or not row[1]:
+                    results[str(clip_id)] = "error: missing path"
+                    continue
+                src = Path(row[1])
+                if not src.exists():
+                    results[row[0]] = f"error: source not found ({src})"
+                    continue
+                try:
+                    shutil.copy2(src, dest / src.name)
+                    results[row[0]] = "ok"
+                except Exception as e:
+                    results[row[0]] = f"error: {e}"
+            return JSONResponse({"results": results})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 # --- Playlist Management Models ---
 class PlaylistCreateRequest(BaseModel):
     name: str
 
+
 class PlaylistRenameRequest(BaseModel):
     name: str
 
+
 class PlaylistClipUpdateRequest(BaseModel):
     clip_ids: List[int]
 
+
 class PlaylistReorderRequest(BaseModel):
     clip_ids: List[int]  # New order for this playlist
 
+
 class PlaylistExportFormat(str):
     pass  # For future: enum for 'txt', 'zip', 'tox'
 
+
 class MultiPlaylistClipUpdateRequest(BaseModel):
     clip_ids: List[int]
     playlist_ids: List[int]
 
+
 # --- Playlist Endpoints ---
 @app.post("/playlists")
 async def create_playlist(request: Request):
@@ -688,247 +1112,273 @@ async def create_playlist(request: Request):
     data = await request.json()
     name = data.get("name")
     if not name or not name.strip():
-        return JSONResponse({"error": "Playlist name required"}, status_code=400)
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    # Determine next order value
-    cursor.execute("SELECT MAX(\"order\") FROM playlists")
-    row = cursor.fetchone()
-    next_order = (row[0] + 1) if row and row[0] is not None else 0
-    cursor.execute("INSERT INTO playlists (name, \"order\") VALUES (?, ?)", (name.strip(), next_order))
-    conn.commit()
-    playlist_id = cursor.lastrowid
-    cursor.execute("SELECT id, name, created_at, \"order\" FROM playlists WHERE id = ?", (playlist_id,))
-    playlist = cursor.fetchone()
-    conn.close()
-    return {"id": playlist[0], "name": playlist[1], "created_at": playlist[2], "order": playlist[3]}
+        return JSONResponse(
+            {"error": "Playlist name required"}, status_code=400)
+    with db_pool.acquire(db_path) as conn:
+        cursor = conn.cursor()
+        # Determine next order value
+        cursor.execute("SELECT MAX(\"order\") FROM playlists")
+        row = cursor.fetchone()
+        next_order = (row[0] + 1) if row and row[0] is not None else 0
+        cursor.execute(
+            "INSERT INTO playlists (name, \"order\") VALUES (?, ?)",
+            (name.strip(), next_order))
+        conn.commit()
+        playlist_id = cursor.lastrowid
+        cursor.execute(
+            "SELECT id, name, created_at, \"order\" FROM playlists "
+            "WHERE id = ?",
+            (playlist_id,))
+        playlist = cursor.fetchone()
+    return {"id": playlist[0], "name": playlist[1],
+            "created_at": playlist[2], "order": playlist[3]}
+
 
 @app.patch("/playlists/{playlist_id}")
 def rename_playlist(playlist_id: int, req: PlaylistRenameRequest):
     """Rename a playlist."""
-    conn = None
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        cursor.execute("UPDATE playlists SET name = ? WHERE id = ?", (req.name, playlist_id))
-        if cursor.rowcount == 0:
-            return JSONResponse({"error": "Playlist not found"}, status_code=404)
-        conn.commit()
-        return {"id": playlist_id, "name": req.name}
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE playlists SET name = ? WHERE id = ?",
+                (req.name, playlist_id))
+            if cursor.rowcount == 0:
+                return JSONResponse(
+                    {"error": "Playlist not found"}, status_code=404)
+            conn.commit()
+            return {"id": playlist_id, "name": req.name}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.delete("/playlists/{playlist_id}")
 def delete_playlist(playlist_id: int):
     """Delete a playlist and its associations."""
-    conn = None
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM playlists WHERE id = ?", (playlist_id,))
-        if cursor.rowcount == 0:
-            return JSONResponse({"error": "Playlist not found"}, status_code=404)
-        conn.commit()
-        return {"id": playlist_id, "deleted": True}
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM playlists WHERE id = ?", (playlist_id,))
+            if cursor.rowcount == 0:
+                return JSONResponse(
+                    {"error": "Playlist not found"}, status_code=404)
+            conn.commit()
+            return {"id": playlist_id, "deleted": True}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.get("/playlists")
 def list_playlists(request: Request):
     """List all playlists (id, name, created_at, order) for the selected DB, ordered by 'order' if present."""
     db_path = get_db_path_from_request(request)
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    # Try to order by 'order', fallback to created_at
-    try:
-        cursor.execute("SELECT id, name, created_at, \"order\" FROM playlists ORDER BY \"order\" ASC, created_at DESC")
-    except Exception:
-        cursor.execute("SELECT id, name, created_at FROM playlists ORDER BY created_at DESC")
-    playlists = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    with db_pool.acquire(db_path) as conn:
+        cursor = conn.cursor()
+        # Try to order by 'order', fallback to created_at
+        try:
+            cursor.execute(
+                "SELECT id, name, created_at, \"order\" FROM playlists "
+                "ORDER BY \"order\" ASC, created_at DESC")
+        except Exception:
+            cursor.execute(
+                "SELECT id, name, created_at FROM playlists "
+                "ORDER BY created_at DESC")
+        playlists = [dict(row) for row in cursor.fetchall()]
     return {"playlists": playlists}
 
+
 @app.get("/playlists/{playlist_id}")
 def get_playlist(request: Request, playlist_id: int):
     """Get playlist details: id, name, created_at, and ordered clips for the selected DB."""
     db_path = get_db_path_from_request(request)
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, created_at FROM playlists WHERE id = ?", (playlist_id,))
-    playlist = cursor.fetchone()
-    if not playlist:
-        return JSONResponse({"error": "Playlist not found"}, status_code=404)
-    cursor.execute("""
-        SELECT c.id, c.filename, c.thumbnail_path, c.duration, pc.position
-        FROM playlist_clips pc
-        JOIN clips c ON pc.clip_id = c.id
-        WHERE pc.playlist_id = ?
-        ORDER BY pc.position ASC
-    """, (playlist_id,))
-    clips = [dict(row) for row in cursor.fetchall()]
-    return {"id": playlist[0], "name": playlist[1], "created_at": playlist[2], "clips": clips}
+    with db_pool.acquire(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT id, name, created_at FROM playlists WHERE id = ?",
+            (playlist_id,))
+        playlist = cursor.fetchone()
+        if not playlist:
+            return JSONResponse(
+                {"error": "Playlist not found"}, status_code=404)
+        cursor.execute("""
+            SELECT c.id, c.filename, c.thumbnail_path, c.duration, pc.position
+            FROM playlist_clips pc
+            JOIN clips c ON pc.clip_id = c.id
+            WHERE pc.playlist_id = ?
+            ORDER BY pc.position ASC
+        """, (playlist_id,))
+        clips = [dict(row) for row in cursor.fetchall()]
+        return {"id": playlist[0], "name": playlist[1],
+                "created_at": playlist[2], "clips": clips}
+
 
 @app.post("/playlists/clips")
 def add_clips_to_multiple_playlists(req: MultiPlaylistClipUpdateRequest):
-    """Add one or more clips to one or more playlists (multi-playlist support)."""
-    conn = None
+    """Add one or more clips to one or more playlists (multi-playlist
+    support)."""
     summary = {}
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        for playlist_id in req.playlist_ids:
-            # Get current max position for this playlist
-            cursor.execute("SELECT MAX(position) FROM playlist_clips WHERE playlist_id = ?", (playlist_id,))
-            row = cursor.fetchone()
-            start_pos = (row[0] + 1) if row and row[0] is not None else 0
-            added = []
-            for i, clip_id in enumerate(req.clip_ids):
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            for playlist_id in req.playlist_ids:
+                # Get current max position for this playlist
                 cursor.execute(
-                    """
-                    INSERT OR IGNORE INTO playlist_clips (playlist_id, clip_id, position)
-                    VALUES (?, ?, ?)
-                    """,
-                    (playlist_id, clip_id, start_pos + i)
-                )
-                if cursor.rowcount > 0:
-                    added.append(clip_id)
-            summary[playlist_id] = added
-        conn.commit()
-        return {"added": summary}
+                    "SELECT MAX(position) FROM playlist_clips "
+                    "WHERE playlist_id = ?",
+                    (playlist_id,))
+                row = cursor.fetchone()
+                start_pos = (row[0] + 1) if row and row[0] is not None else 0
+                added = []
+                for i, clip_id in enumerate(req.clip_ids):
+                    cursor.execute(
+                        """
+                        INSERT OR IGNORE INTO playlist_clips
+                            (playlist_id, clip_id, position)
+                        VALUES (?, ?, ?)
+                        """,
+                        (playlist_id, clip_id, start_pos + i)
+                    )
+                    if cursor.rowcount > 0:
+                        added.append(clip_id)
+                summary[playlist_id] = added
+            conn.commit()
+            return {"added": summary}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.post("/playlists/{playlist_id}/clips/remove")
 def remove_clips_from_playlist(playlist_id: int, req: PlaylistClipUpdateRequest):
     """Remove one or more clips from a playlist (POST for batch remove)."""
-    conn = None
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        for clip_id in req.clip_ids:
-            cursor.execute("DELETE FROM playlist_clips WHERE playlist_id = ? AND clip_id = ?", (playlist_id, clip_id))
-        conn.commit()
-        return {"playlist_id": playlist_id, "removed": req.clip_ids}
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            for clip_id in req.clip_ids:
+                cursor.execute(
+                    "DELETE FROM playlist_clips WHERE playlist_id = ? "
+                    "AND clip_id = ?",
+                    (playlist_id, clip_id))
+            conn.commit()
+            return {"playlist_id": playlist_id, "removed": req.clip_ids}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.patch("/playlists/{playlist_id}/reorder")
 def reorder_playlist_clips(playlist_id: int, req: PlaylistReorderRequest):
     """Reorder clips in a playlist. Accepts new clip_id order."""
-    conn = None
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        for pos, clip_id in enumerate(req.clip_ids):
-            cursor.execute("""
-                UPDATE playlist_clips SET position = ?
-                WHERE playlist_id = ? AND clip_id = ?
-            """, (pos, playlist_id, clip_id))
-        conn.commit()
-        return {"playlist_id": playlist_id, "order": req.clip_ids}
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            for pos, clip_id in enumerate(req.clip_ids):
+                cursor.execute("""
+                    UPDATE playlist_clips SET position = ?
+                    WHERE playlist_id = ? AND clip_id = ?
+                """, (pos, playlist_id, clip_id))
+            conn.commit()
+            return {"playlist_id": playlist_id, "order": req.clip_ids}
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.get("/playlists/{playlist_id}/export")
 def export_playlist(playlist_id: int, format: str = "txt"):
     """Export playlist in the requested format (txt, zip, tox)."""
     if format not in ("txt", "zip", "tox"):
-        return JSONResponse({"error": f"Unsupported export format: {format}"}, status_code=400)
-    conn = None
+        return JSONResponse(
+            {"error": f"Unsupported export format: {format}"}, status_code=400)
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        # Get playlist name (for filename)
-        cursor.execute("SELECT name FROM playlists WHERE id = ?", (playlist_id,))
-        row = cursor.fetchone()
-        if not row:
-            return JSONResponse({"error": "Playlist not found"}, status_code=404)
-        playlist_name = row[0]
-        # Get all clip paths in order
-        cursor.execute("""
-            SELECT c.path FROM playlist_clips pc
-            JOIN clips c ON pc.clip_id = c.id
-            WHERE pc.playlist_id = ?
-            ORDER BY pc.position ASC
-        """, (playlist_id,))
-        paths = [r[0] for r in cursor.fetchall()]
-        if format == "txt":
-            if not paths:
-                return JSONResponse({"error": "Playlist is empty."}, status_code=400)
-            # Build text content
-            content = "\n".join(paths) + "\n"
-            filename = f"playlist_{playlist_name}.txt" # Use playlist_name for filename
-            # Use StreamingResponse for download
-            return StreamingResponse(
-                io.BytesIO(content.encode("utf-8")),
-                media_type="text/plain",
-                headers={
-                    "Content-Disposition": f"attachment; filename={filename}"
-                }
-            )
-        elif format == "zip":
-            # TODO: Implement zip export
-            return JSONResponse({"error": "ZIP export not yet implemented."}, status_code=501)
-        elif format == "tox":
-            # TODO: Implement TouchDesigner .tox export
-            return JSONResponse({"error": ".tox export not yet implemented."}, status_code=501)
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            # Get playlist name (for filename)
+            cursor.execute(
+                "SELECT name FROM playlists WHERE id = ?", (playlist_id,))
+            row = cursor.fetchone()
+            if not row:
+                return JSONResponse(
+                    {"error": "Playlist not found"}, status_code=404)
+            playlist_name = row[0]
+            # Get all clip paths in order
+            cursor.execute("""
+                SELECT c.path FROM playlist_clips pc
+                JOIN clips c ON pc.clip_id = c.id
+                WHERE pc.playlist_id = ?
+                ORDER BY pc.position ASC
+            """, (playlist_id,))
+            paths = [r[0] for r in cursor.fetchall()]
+            if format == "txt":
+                if not paths:
+                    return JSONResponse(
+                        {"error": "Playlist is empty."}, status_code=400)
+                # Build text content
+                content = "\n".join(paths) + "\n"
+                # Use playlist_name for filename
+                filename = f"playlist_{playlist_name}.txt"
+                # Use StreamingResponse for download
+                return StreamingResponse(
+                    io.BytesIO(content.encode("utf-8")),
+                    media_type="text/plain",
+                    headers={
+                        "Content-Disposition":
+                            f"attachment; filename={filename}"
+                    }
+                )
+            elif format == "zip":
+                # TODO: Implement zip export
+                return JSONResponse(
+                    {"error": "ZIP export not yet implemented."},
+                    status_code=501)
+            elif format == "tox":
+                # TODO: Implement TouchDesigner .tox export
+                return JSONResponse(
+                    {"error": ".tox export not yet implemented."},
+                    status_code=501)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
+
 
 @app.post("/open_in_system/{clip_id}")
 def open_in_system(clip_id: int):
     """
     Open the folder containing the video file in the system's file explorer, selecting the file if possible.
     """
-    conn = None
     try:
-        conn = get_db_connection(get_default_db_path())
-        cursor = conn.cursor()
-        cursor.execute("SELECT path FROM clips WHERE id = ?", (clip_id,))
-        row = cursor.fetchone()
-        if not row:
-            return JSONResponse({"detail": "Clip not found"}, status_code=status.HTTP_404_NOT_FOUND)
-        file_path = Path(row[0])
-        if not file_path.exists():
-            return JSONResponse({"detail": "File not found"}, status_code=status.HTTP_404_NOT_FOUND)
-        folder = file_path.parent
-        system = platform.system()
-        try:
-            if system == "Windows":
-                # Select the file in Explorer
-                subprocess.Popen(["explorer", "/select,", str(file_path)])
-            elif system == "Darwin":
-                # Reveal the file in Finder
-                subprocess.Popen(["open", "-R", str(file_path)])
-            else:
-                # Linux: just open the folder
-                subprocess.Popen(["xdg-open", str(folder)])
-        except Exception as e:
-            return JSONResponse({"detail": f"Failed to open folder: {e}"}, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        return JSONResponse({"detail": "Opened in system file explorer"})
+        with db_pool.acquire(get_default_db_path()) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT path FROM clips WHERE id = ?", (clip_id,))
+            row = cursor.fetchone()
+            if not row:
+                return JSONResponse(
+                    {"detail": "Clip not found"},
+                    status_code=status.HTTP_404_NOT_FOUND)
+            file_path = Path(row[0])
+            if not file_path.exists():
+                return JSONResponse(
+                    {"detail": "File not found"},
+                    status_code=status.HTTP_404_NOT_FOUND)
+            folder = file_path.parent
+            system = platform.system()
+            try:
+                if system == "Windows":
+                    # Select the file in Explorer
+                    subprocess.Popen(["explorer", "/select,", str(file_path)])
+                elif system == "Darwin":
+                    # Reveal the file in Finder
+                    subprocess.Popen(["open", "-R", str(file_path)])
+                else:
+                    # Linux: just open the folder
+                    subprocess.Popen(["xdg-open", str(folder)])
+            except Exception as e:
+                return JSONResponse(
+                    {"detail": f"Failed to open folder: {e}"},
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return JSONResponse({"detail": "Opened in system file explorer"})
     except Exception as e:
-        return JSONResponse({"detail": f"Error: {e}"}, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    finally:
-        if conn:
-            conn.close()
+        return JSONResponse(
+            {"detail": f"Error: {e}"},
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 
 @app.get("/scan_progress")
 def scan_progress():
@@ -946,8 +1396,10 @@ def scan_progress():
     except Exception as e:
         return JSONResponse({"status": "error", "error": str(e)})
 
-@app.get("/api/clips")
-def api_clips(request: Request, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=500)):
+
+@app.get("/api/clips", response_class=FastJSONResponse)
+def api_clips(request: Request, offset: int = Query(0, ge=0),
+              limit: int = Query(100, ge=1, le=500)):
     """
     Returns a window of clips for virtualized/infinite scrolling.
     Uses the selected DB from the request for multi-library support.
@@ -960,79 +1412,72 @@ def api_clips(request: Request, offset: int = Query(0, ge=0), limit: int = Query
     sort = request.query_params.get("sort", "filename")
     order = request.query_params.get("order", "asc")
     starred_first = request.query_params.get("starred_first", "0") == "1"
-    valid_sorts = {"filename", "modified_at", "size", "duration", "starred"}
-    valid_orders = {"asc", "desc"}
-    if sort not in valid_sorts:
+    if sort not in VALID_SORTS:
         sort = "filename"
-    if order not in valid_orders:
+    if order not in VALID_ORDERS:
         order = "asc"
-    if starred_first:
-        order_by = f"starred DESC, {sort} {order.upper()}"
-    else:
-        order_by = f"{sort} {order.upper()}"
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    if playlist_id:
-        # Filter by playlist membership, keep playlist order
-        cursor.execute("""
-            SELECT COUNT(*) FROM playlist_clips pc
-            JOIN clips c ON pc.clip_id = c.id
-            WHERE pc.playlist_id = ?
-        """, (playlist_id,))
-        total = cursor.fetchone()[0]
-        cursor.execute("""
-            SELECT c.id, c.filename, c.path, c.thumbnail_path, c.duration, c.size, c.starred, c.modified_at
-            FROM playlist_clips pc
-            JOIN clips c ON pc.clip_id = c.id
-            WHERE pc.playlist_id = ?
-            ORDER BY pc.position ASC, c.id ASC
-            LIMIT ? OFFSET ?
-        """, (playlist_id, limit, offset))
-    else:
-        cursor.execute("SELECT COUNT(*) FROM clips")
-        total = cursor.fetchone()[0]
-        cursor.execute(f"""
-            SELECT id, filename, path, thumbnail_path, duration, size, starred, modified_at
-            FROM clips
-            ORDER BY {order_by}
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
-    clips = []
-    for row in cursor.fetchall():
-        clip_id = row[0]
-        # Fetch playlist memberships for this clip
-        cursor.execute("""
-            SELECT p.id, p.name FROM playlist_clips pc
-            JOIN playlists p ON pc.playlist_id = p.id
-            WHERE pc.clip_id = ?
-            ORDER BY p.name ASC
-        """, (clip_id,))
-        playlists = [ {"id": r[0], "name": r[1]} for r in cursor.fetchall() ]
-        # Fetch tags for this clip
-        cursor.execute("""
-            SELECT t.name FROM tags t
-            JOIN clip_tags ct ON t.id = ct.tag_id
-            WHERE ct.clip_id = ?
-            ORDER BY t.name ASC
-        """, (clip_id,))
-        tags = [r[0] for r in cursor.fetchall()]
-        clip = {
-            "id": row[0],
-            "filename": row[1],
-            "path": row[2],
-            "thumb_url": f"/thumbs/{os.path.basename(row[3])}" if row[3] else None,
-            "duration": row[4],
-            "size": row[5],
-            "starred": row[6],
-            "modified_at": row[7],
-            "playlists": playlists,
-            "tags": tags,
-        }
-        clips.append(clip)
-    # Debug: print the first 2 clips for verification
-    print("[api_clips] Returning sample clips:", clips[:2])
-    conn.close()
-    return JSONResponse({"clips": clips, "total": total})
+    order_by = get_order_by(sort, order, starred_first)
+    params = dict(get_clip_filters(request), playlist_id=playlist_id,
+                  limit=limit, offset=offset)
+    with db_pool.acquire(db_path) as conn:
+        cursor = conn.cursor()
+        if playlist_id:
+            # Filter by playlist membership, keep playlist order
+            cursor.execute(f"""
+                SELECT COUNT(*) FROM playlist_clips pc
+                JOIN clips c ON pc.clip_id = c.id
+                WHERE pc.playlist_id = :playlist_id AND {CLIP_FILTER_SQL}
+            """, params)
+            total = cursor.fetchone()[0]
+            cursor.execute(f"""
+                SELECT c.id, c.filename, c.path, c.thumbnail_path, c.duration,
+                    c.size, c.starred, c.modified_at
+                FROM playlist_clips pc
+                JOIN clips c ON pc.clip_id = c.id
+                WHERE pc.playlist_id = :playlist_id AND {CLIP_FILTER_SQL}
+                ORDER BY pc.position ASC, c.id ASC
+                LIMIT :limit OFFSET :offset
+            """, params)
+        else:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM clips c WHERE {CLIP_FILTER_SQL}",
+                params)
+            total = cursor.fetchone()[0]
+            cursor.execute(f"""
+                SELECT id, filename, path, thumbnail_path, duration, size,
+                    starred, modified_at
+                FROM clips c
+                WHERE {CLIP_FILTER_SQL}
+                ORDER BY {order_by}
+                LIMIT :limit OFFSET :offset
+            """, params)
+        rows = cursor.fetchall()
+        # Playlist memberships and tags for the whole window in two queries
+        tags_by_clip, playlists_by_clip = fetch_page_tags_and_playlists(
+            cursor, [row[0] for row in rows])
+        clips = []
+        for row in rows:
+            clip_id = row[0]
+            playlists = playlists_by_clip[clip_id]
+            tags = tags_by_clip[clip_id]
+            clip = {
+                "id": row[0],
+                "filename": row[1],
+                "path": row[2],
+                "thumb_url": (f"/thumbs/{os.path.basename(row[3])}"
+                              if row[3] else None),
+                "duration": row[4],
+                "size": row[5],
+                "starred": row[6],
+                "modified_at": row[7],
+                "playlists": playlists,
+                "tags": tags,
+            }
+            clips.append(clip)
+        # Debug: print the first 2 clips for verification
+        print("[api_clips] Returning sample clips:", clips[:2])
+    return FastJSONResponse({"clips": clips, "total": total})
+
 
 @app.get("/api/duplicates")
 def api_duplicates(request: Request):
@@ -1042,51 +1487,56 @@ def api_duplicates(request: Request):
     """
     try:
         db_path = get_db_path_from_request(request)
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        # Find all clips needing review
-        cursor.execute("SELECT * FROM clips WHERE needs_review = 1")
-        dup_rows = cursor.fetchall()
-        # Group by duplicate_of (canonical id)
-        groups = {}
-        for row in dup_rows:
-            canonical_id = row['duplicate_of'] if isinstance(row, dict) or hasattr(row, '__getitem__') else None
-            if canonical_id is None:
-                print(f"[api_duplicates] Warning: needs_review=1 but duplicate_of is NULL for clip id {row['id'] if 'id' in row.keys() else '?'}")
-                continue  # Defensive: should always be set if needs_review=1
-            if canonical_id not in groups:
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            # Find all clips needing review
+            cursor.execute("SELECT * FROM clips WHERE needs_review = 1")
+            dup_rows = cursor.fetchall()
+            # Group by duplicate_of (canonical id)
+            groups = {}
+            for row in dup_rows:
+                if isinstance(row, dict) or hasattr(row, '__getitem__'):
+                    canonical_id = row['duplicate_of']
+                else:
+                    canonical_id = None
+                if canonical_id is None:
+                    row_id = row['id'] if 'id' in row.keys() else '?'
+                    print(f"[api_duplicates] Warning: needs_review=1 but "
+                          f"duplicate_of is NULL for clip id {row_id}")
+                    # Defensive: should always be set if needs_review=1
+                    continue
+                if canonical_id not in groups:
+                    try:
+                        canonical_size = row['size']
+                    except (KeyError, IndexError):
+                        canonical_size = None
+                    groups[canonical_id] = {
+                        'canonical': {
+                            'id': row['id'],
+                            'filename': row['filename'],
+                            'path': row['path'],
+                            'phash': row['phash'],
+                            'thumbnail_path': row['thumbnail_path'],
+                            'duration': row['duration'],
+                            'size': canonical_size,
+                        },
+                        'duplicates': []
+                    }
                 try:
-                    canonical_size = row['size']
+                    row_size = row['size']
                 except (KeyError, IndexError):
-                    canonical_size = None
-                groups[canonical_id] = {
-                    'canonical': {
-                        'id': row['id'],
-                        'filename': row['filename'],
-                        'path': row['path'],
-                        'phash': row['phash'],
-                        'thumbnail_path': row['thumbnail_path'],
-                        'duration': row['duration'],
-                        'size': canonical_size,
-                    },
-                    'duplicates': []
-                }
-            try:
-                row_size = row['size']
-            except (KeyError, IndexError):
-                row_size = None
-            groups[canonical_id]['duplicates'].append({
-                'id': row['id'],
-                'filename': row['filename'],
-                'path': row['path'],
-                'phash': row['phash'],
-                'thumbnail_path': row['thumbnail_path'],
-                'duration': row['duration'],
-                'size': row_size,
-            })
-        # Return as list of groups
-        result = list(groups.values())
-        conn.close()
+                    row_size = None
+                groups[canonical_id]['duplicates'].append({
+                    'id': row['id'],
+                    'filename': row['filename'],
+                    'path': row['path'],
+                    'phash': row['phash'],
+                    'thumbnail_path': row['thumbnail_path'],
+                    'duration': row['duration'],
+                    'size': row_size,
+                })
+            # Return as list of groups
+            result = list(groups.values())
         return {"duplicate_groups": result}
     except Exception as e:
         import traceback
@@ -1094,6 +1544,7 @@ def api_duplicates(request: Request):
         traceback.print_exc()
         return JSONResponse({"error": str(e)}, status_code=500)
 
+
 @app.get("/duplicates", response_class=HTMLResponse)
 def duplicates_review(request: Request):
     """
@@ -1101,6 +1552,7 @@ def duplicates_review(request: Request):
     """
     return templates.TemplateResponse("duplicates.html", {"request": request})
 
+
 @app.post("/api/duplicate_action")
 async def duplicate_action(request: Request):
     """
@@ -1112,87 +1564,124 @@ async def duplicate_action(request: Request):
     except Exception:
         data = None
     if not data:
-        return JSONResponse({"error": "Missing or invalid JSON."}, status_code=400)
+        return JSONResponse(
+            {"error": "Missing or invalid JSON."}, status_code=400)
     dup_id = data.get("dup_id")
     action = data.get("action")
     canonical_id = data.get("canonical_id")
     if not dup_id or not action:
-        return JSONResponse({"error": "Missing dup_id or action."}, status_code=400)
-    conn = get_db_connection(get_default_db_path())
-    cursor = conn.cursor()
-    try:
-        if action == "keep":
-            # Clear needs_review and duplicate_of
-            cursor.execute("UPDATE clips SET needs_review = 0, duplicate_of = NULL WHERE id = ?", (dup_id,))
-            conn.commit()
-            return {"status": "kept", "dup_id": dup_id}
-        elif action == "delete":
-            # Delete tags, clip_tags, and the clip itself
-            cursor.execute("DELETE FROM clip_tags WHERE clip_id = ?", (dup_id,))
-            cursor.execute("DELETE FROM playlist_clips WHERE clip_id = ?", (dup_id,))
-            cursor.execute("DELETE FROM clips WHERE id = ?", (dup_id,))
-            conn.commit()
-            return {"status": "deleted", "dup_id": dup_id}
-        elif action == "ignore":
-            # Clear needs_review but leave duplicate_of
-            cursor.execute("UPDATE clips SET needs_review = 0 WHERE id = ?", (dup_id,))
-            conn.commit()
-            return {"status": "ignored", "dup_id": dup_id}
-        elif action == "merge":
-            # --- Merge tags ---
-            # Get all tag_ids for canonical and duplicate
-            cursor.execute("SELECT tag_id FROM clip_tags WHERE clip_id = ?", (canonical_id,))
-            canonical_tags = set(row[0] for row in cursor.fetchall())
-            cursor.execute("SELECT tag_id FROM clip_tags WHERE clip_id = ?", (dup_id,))
-            dup_tags = set(row[0] for row in cursor.fetchall())
-            tags_to_add = dup_tags - canonical_tags
-            for tag_id in tags_to_add:
-                cursor.execute("INSERT OR IGNORE INTO clip_tags (clip_id, tag_id) VALUES (?, ?)", (canonical_id, tag_id))
-            # --- Merge playlist memberships ---
-            cursor.execute("SELECT playlist_id FROM playlist_clips WHERE clip_id = ?", (canonical_id,))
-            canonical_playlists = set(row[0] for row in cursor.fetchall())
-            cursor.execute("SELECT playlist_id FROM playlist_clips WHERE clip_id = ?", (dup_id,))
-            dup_playlists = set(row[0] for row in cursor.fetchall())
-            playlists_to_add = dup_playlists - canonical_playlists
-            for playlist_id in playlists_to_add:
-                # Add to end of playlist (max position + 1)
-                cursor.execute("SELECT MAX(position) FROM playlist_clips WHERE playlist_id = ?", (playlist_id,))
-                row = cursor.fetchone()
-                pos = (row[0] + 1) if row and row[0] is not None else 0
-                cursor.execute("INSERT OR IGNORE INTO playlist_clips (playlist_id, clip_id, position) VALUES (?, ?, ?)", (playlist_id, canonical_id, pos))
-            # --- Delete duplicate ---
-            cursor.execute("DELETE FROM clip_tags WHERE clip_id = ?", (dup_id,))
-            cursor.execute("DELETE FROM playlist_clips WHERE clip_id = ?", (dup_id,))
-            cursor.execute("DELETE FROM clips WHERE id = ?", (dup_id,))
-            conn.commit()
-            return {"status": "merged", "dup_id": dup_id, "canonical_id": canonical_id, "tags_merged": list(tags_to_add), "playlists_merged": list(playlists_to_add)}
-        else:
-            return JSONResponse({"error": f"Unknown action: {action}"}, status_code=400)
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        conn.close()
+        return JSONResponse(
+            {"error": "Missing dup_id or action."}, status_code=400)
+    with db_pool.acquire(get_default_db_path()) as conn:
+        cursor = conn.cursor()
+        try:
+            if action == "keep":
+                # Clear needs_review and duplicate_of
+                cursor.execute(
+                    "UPDATE clips SET needs_review = 0, duplicate_of = NULL "
+                    "WHERE id = ?",
+                    (dup_id,))
+                conn.commit()
+                return {"status": "kept", "dup_id": dup_id}
+            elif action == "delete":
+                # Delete tags, clip_tags, packed thumbnails and the clip itself
+                cursor.execute(
+                    "DELETE FROM clip_tags WHERE clip_id = ?", (dup_id,))
+                cursor.execute(
+                    "DELETE FROM playlist_clips WHERE clip_id = ?", (dup_id,))
+                cursor.execute(
+                    "DELETE FROM thumbnails WHERE clip_id = ?", (dup_id,))
+                cursor.execute("DELETE FROM clips WHERE id = ?", (dup_id,))
+                conn.commit()
+                return {"status": "deleted", "dup_id": dup_id}
+            elif action == "ignore":
+                # Clear needs_review but leave duplicate_of
+                cursor.execute(
+                    "UPDATE clips SET needs_review = 0 WHERE id = ?",
+                    (dup_id,))
+                conn.commit()
+                return {"status": "ignored", "dup_id": dup_id}
+            elif action == "merge":
+                # --- Merge tags ---
+                # Get all tag_ids for canonical and duplicate
+                cursor.execute(
+                    "SELECT tag_id FROM clip_tags WHERE clip_id = ?",
+                    (canonical_id,))
+                canonical_tags = set(row[0] for row in cursor.fetchall())
+                cursor.execute(
+                    "SELECT tag_id FROM clip_tags WHERE clip_id = ?",
+                    (dup_id,))
+                dup_tags = set(row[0] for row in cursor.fetchall())
+                tags_to_add = dup_tags - canonical_tags
+                for tag_id in tags_to_add:
+                    cursor.execute(
+                        "INSERT OR IGNORE INTO clip_tags (clip_id, tag_id) "
+                        "VALUES (?, ?)",
+                        (canonical_id, tag_id))
+                # --- Merge playlist memberships ---
+                cursor.execute(
+                    "SELECT playlist_id FROM playlist_clips WHERE clip_id = ?",
+                    (canonical_id,))
+                canonical_playlists = set(row[0] for row in cursor.fetchall())
+                cursor.execute(
+                    "SELECT playlist_id FROM playlist_clips WHERE clip_id = ?",
+                    (dup_id,))
+                dup_playlists = set(row[0] for row in cursor.fetchall())
+                playlists_to_add = dup_playlists - canonical_playlists
+                for playlist_id in playlists_to_add:
+                    # Add to end of playlist (max position + 1)
+                    cursor.execute(
+                        "SELECT MAX(position) FROM playlist_clips "
+                        "WHERE playlist_id = ?",
+                        (playlist_id,))
+                    row = cursor.fetchone()
+                    pos = (row[0] + 1) if row and row[0] is not None else 0
+                    cursor.execute(
+                        "INSERT OR IGNORE INTO playlist_clips "
+                        "(playlist_id, clip_id, position) VALUES (?, ?, ?)",
+                        (playlist_id, canonical_id, pos))
+                # --- Delete duplicate ---
+                cursor.execute(
+                    "DELETE FROM clip_tags WHERE clip_id = ?", (dup_id,))
+                cursor.execute(
+                    "DELETE FROM playlist_clips WHERE clip_id = ?", (dup_id,))
+                cursor.execute(
+                    "DELETE FROM thumbnails WHERE clip_id = ?", (dup_id,))
+                cursor.execute("DELETE FROM clips WHERE id = ?", (dup_id,))
+                conn.commit()
+                return {
+                    "status": "merged",
+                    "dup_id": dup_id,
+                    "canonical_id": canonical_id,
+                    "tags_merged": list(tags_to_add),
+                    "playlists_merged": list(playlists_to_add),
+                }
+            else:
+                return JSONResponse(
+                    {"error": f"Unknown action: {action}"}, status_code=400)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
 
 @app.get("/api/tag_suggestions")
 def api_tag_suggestions(request: Request, q: str = None):
     """Return a list of tag suggestions for autocomplete. If 'q' is provided, return only tags starting with the prefix (case-insensitive)."""
     db_path = get_db_path_from_request(request)
-    conn = None
     try:
-        conn = get_db_connection(db_path)
-        cursor = conn.cursor()
-        if q:
-            # Use parameterized LIKE for case-insensitive prefix search
-            cursor.execute("SELECT name FROM tags WHERE LOWER(name) LIKE ? ORDER BY name ASC", (q.lower() + '%',))
-        else:
-            cursor.execute("SELECT name FROM tags ORDER BY name ASC")
-        tags = [row[0] for row in cursor.fetchall()]
-        return JSONResponse({"suggestions": tags})
+        with db_pool.acquire(db_path) as conn:
+            cursor = conn.cursor()
+            if q:
+                # Use parameterized LIKE for case-insensitive prefix search
+                cursor.execute(
+                    "SELECT name FROM tags WHERE LOWER(name) LIKE ? "
+                    "ORDER BY name ASC",
+                    (q.lower() + '%',))
+            else:
+                cursor.execute("SELECT name FROM tags ORDER BY name ASC")
+            tags = [row[0] for row in cursor.fetchall()]
+            return JSONResponse({"suggestions": tags})
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
-    finally:
-        if conn:
-            conn.close()
 
 # TODO: Add API endpoints for clips, tagging, starring, etc.
-# TODO: Add video playback route 
\ No newline at end of file
+# TODO: Add video playback route
@@ -1408,7 +1408,7 @@ window.renderDuplicateReviewUI = function() {
                 const canonicalCard = `
                   <div class="canonical-clip">
                     <h3>Canonical</h3>
-                    <img src="/thumbs/${canonical.thumbnail_path ? canonical.thumbnail_path.split('/').pop() : 'missing.jpg'}" alt="Canonical thumbnail">
+                    <img src="/thumbs/${canonical.thumbnail_path ? canonical.thumbnail_path.split('/').pop() : 'missing.jpg'}" alt="Canonical thumbnail" loading="lazy" decoding="async">
                     <div><b>${canonical.filename}</b></div>
                     <div class="meta">ID: ${canonical.id} | Duration: ${canonical.duration || '?'} | Size: ${canonical.size || '?'}<br>pHash: <span style="font-family:monospace;">${canonical.phash || '?'}</span></div>
                   </div>
@@ -1416,7 +1416,7 @@ window.renderDuplicateReviewUI = function() {
                 // Duplicates list
                 const dupCards = dups.map(dup => `
                   <div class="duplicate-card" data-clip-id="${dup.id}">
-                    <img src="/thumbs/${dup.thumbnail_path ? dup.thumbnail_path.split('/').pop() : 'missing.jpg'}" alt="Duplicate thumbnail">
+                    <img src="/thumbs/${dup.thumbnail_path ? dup.thumbnail_path.split('/').pop() : 'missing.jpg'}" alt="Duplicate thumbnail" loading="lazy" decoding="async">
                     <div>
                       <b>${dup.filename}</b><br>
                       <span class="meta">ID: ${dup.id} | Duration: ${dup.duration || '?'} | Size: ${dup.size || '?'}<br>pHash: <span style="font-family:monospace;">${dup.phash || '?'}</span></span>
@@ -1585,7 +1585,7 @@ function renderClipCard(clip) {
     let animatedSrcUrl = '/static/placeholder_anim.gif';
     if (baseFilenameForUrls) {
         const filenameBase = baseFilenameForUrls.substring(0, baseFilenameForUrls.lastIndexOf('.'));
-        animatedSrcUrl = `/thumbs/${filenameBase}_anim.gif`;
+        animatedSrcUrl = `/thumbs/${filenameBase}_anim.webp`;
     }
 
     // Prepare playlist pills HTML string
@@ -1610,7 +1610,7 @@ function renderClipCard(clip) {
                 <span class="custom-checkbox"></span>
             </label>
             <a class="card-link" href="/clip/${clip.id}">
-                <img class="thumb" src="${staticSrcUrl}" data-static-src="${staticSrcUrl}" data-animated-src="${animatedSrcUrl}" alt="Thumbnail for ${clip.filename}" loading="lazy" />
+                <img class="thumb" src="${staticSrcUrl}" data-static-src="${staticSrcUrl}" data-animated-src="${animatedSrcUrl}" alt="Thumbnail for ${clip.filename}" loading="lazy" decoding="async" />
             </a>
             <div class="meta">
                 <a class="card-link" href="/clip/${clip.id}">
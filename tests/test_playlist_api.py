@@ -165,4 +165,26 @@ def test_playlist_duplicate_and_edge_cases(client):
     resp = client.get(f"/playlists/{pid}")
     assert resp.status_code == 200
     clips = resp.json()["clips"]
-    assert [c["id"] for c in clips] == [cid] 
\ No newline at end of file
+    assert [c["id"] for c in clips] == [cid]
+
+
+def test_add_clips_to_multiple_playlists(client):
+    # Summary is keyed by int playlist ids; the JSON keys come back as strings
+    pids = [
+        client.post("/playlists", json={"name": name}).json()["id"]
+        for name in ("Multi A", "Multi B")
+    ]
+    conn = get_db_connection(get_default_db_path())
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO clips (path, filename) VALUES (?, ?)",
+        ("/tmp/multi.mp4", "multi.mp4"),
+    )
+    cid = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    resp = client.post(
+        "/playlists/clips", json={"clip_ids": [cid], "playlist_ids": pids}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["added"] == {str(pid): [cid] for pid in pids}
@@ -4,19 +4,382 @@ import subprocess
 
 from loopsleuth.thumbnailer import generate_thumbnail, ThumbnailError
 
+
 def test_generate_thumbnail_file_not_found():
     with pytest.raises(FileNotFoundError):
         generate_thumbnail(Path("nofile.mp4"), duration=1.0)
+
+
 def test_generate_thumbnail_invalid_duration(tmp_path):
     f = tmp_path / "vid.mp4"
     f.write_bytes(b"")
     with pytest.raises(ValueError):
         generate_thumbnail(f, duration=None)
+
+
 def test_generate_thumbnail_ffmpeg_missing(monkeypatch, tmp_path):
     vid = tmp_path / "vid2.mp4"
     vid.write_bytes(b"")
     # Simulate missing ffmpeg
-    monkeypatch.setattr(subprocess, "Popen",
-                       lambda *a, **k: (_ for _ in ()).throw(FileNotFoundError()))
+    monkeypatch.setattr(
+        subprocess, "run",
+        lambda *a, **k: (_ for _ in ()).throw(FileNotFoundError()),
+    )
     with pytest.raises(FileNotFoundError):
-                generate_thumbnail(vid, duration=1.0)
\ No newline at end of file
+        generate_thumbnail(vid, duration=1.0)
+
+
+def test_thumbnail_filenames_prefer_clip_id():
+    from loopsleuth.thumbnailer import (
+        _get_thumbnail_filename, _get_animated_preview_filename,
+    )
+    assert _get_thumbnail_filename("/videos/a.mp4", 7) == "clip_7.jpg"
+    anim_name = _get_animated_preview_filename("/videos/a.mp4", 7)
+    assert anim_name == "clip_7_anim.webp"
+    # Path fallback is stable and 20-byte (40 hex char) BLAKE2b
+    name = _get_thumbnail_filename("/videos/a.mp4")
+    assert name == _get_thumbnail_filename("/videos/a.mp4")
+    assert name.startswith("path_")
+    assert len(name) == len("path_") + 40 + len(".jpg")
+
+
+def test_legacy_sha1_outputs_are_renamed(tmp_path):
+    import hashlib
+    from loopsleuth.thumbnailer import (
+        _migrate_legacy_path_outputs, _get_output_filenames,
+    )
+    legacy = f"path_{hashlib.sha1(b'/videos/a.mp4').hexdigest()}"
+    (tmp_path / f"{legacy}.jpg").write_bytes(b"old-jpeg")
+    (tmp_path / f"{legacy}_anim.webp").write_bytes(b"old-webp")
+    _migrate_legacy_path_outputs(tmp_path, "/videos/a.mp4")
+    thumb_name, anim_name = _get_output_filenames("/videos/a.mp4")
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert names == sorted([thumb_name, anim_name])
+    assert (tmp_path / thumb_name).read_bytes() == b"old-jpeg"
+
+
+def test_output_filenames_match_individual_builders():
+    from loopsleuth.thumbnailer import (
+        _get_output_filenames, _get_thumbnail_filename,
+        _get_animated_preview_filename,
+    )
+    for clip_id in (7, None):
+        assert _get_output_filenames("/videos/a.mp4", clip_id) == (
+            _get_thumbnail_filename("/videos/a.mp4", clip_id),
+            _get_animated_preview_filename("/videos/a.mp4", clip_id),
+        )
+
+
+def test_generate_thumbnails_batch_skips_invalid_specs(tmp_path):
+    from loopsleuth.thumbnailer import generate_thumbnails_batch
+    results = generate_thumbnails_batch(
+        [(tmp_path / "missing.mp4", 5.0, 1),
+         (tmp_path / "missing2.mp4", None, 2)],
+        output_dir=tmp_path / "thumbs",
+    )
+    assert results == [None, None]
+
+
+def test_generate_thumbnails_batch_ignores_stale_outputs(
+    monkeypatch, tmp_path
+):
+    from loopsleuth import thumbnailer
+    videos = [tmp_path / "a.mp4", tmp_path / "b.mp4"]
+    for video in videos:
+        video.write_bytes(b"")
+    out_dir = tmp_path / "thumbs"
+    out_dir.mkdir()
+    stale = out_dir / thumbnailer._get_thumbnail_filename(str(videos[1]))
+    stale.write_bytes(b"old thumbnail")
+
+    def fake_run(cmd, **kwargs):
+        # The batch only manages to write the first output
+        first_output = next(Path(arg) for arg in cmd if arg.endswith(".jpg"))
+        first_output.write_bytes(b"new")
+        return subprocess.CompletedProcess(cmd, 1)
+
+    def failing_fallback(*args, **kwargs):
+        raise ThumbnailError("fallback failed")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+    monkeypatch.setattr(thumbnailer, "generate_thumbnail", failing_fallback)
+    # Both specs have clip_id None; results stay per spec
+    results = thumbnailer.generate_thumbnails_batch(
+        [(videos[0], 5.0, None), (videos[1], 5.0, None)], output_dir=out_dir,
+    )
+    assert results[0] is not None and results[0].read_bytes() == b"new"
+    assert results[1] is None
+    # The failed clip keeps its previous thumbnail, and no temp files are left
+    assert stale.read_bytes() == b"old thumbnail"
+    names = sorted(p.name for p in out_dir.iterdir())
+    assert names == sorted([results[0].name, stale.name])
+
+
+def test_flush_thumbnail_updates_keeps_existing_blobs(tmp_path):
+    from loopsleuth.db import get_db_connection
+    from loopsleuth.thumbnailer import _flush_thumbnail_updates
+    conn = get_db_connection(tmp_path / "thumbs.db")
+    conn.execute(
+        "INSERT INTO clips (id, path, filename)"
+        " VALUES (1, '/v/a.mp4', 'a.mp4')"
+    )
+    conn.commit()
+    updates, blobs = [("thumbs/clip_1.jpg", 1)], [(1, b"jpeg-1", b"webp-1")]
+    assert _flush_thumbnail_updates(conn, updates, blobs) == []
+    assert updates == [] and blobs == []
+    # Regenerating only the preview must not wipe the stored JPEG
+    assert _flush_thumbnail_updates(conn, [], [(1, None, b"webp-2")]) == []
+    row = conn.execute(
+        "SELECT jpeg, webp FROM thumbnails WHERE clip_id = 1"
+    ).fetchone()
+    assert (row[0], row[1]) == (b"jpeg-1", b"webp-2")
+    row = conn.execute(
+        "SELECT thumbnail_path FROM clips WHERE id = 1"
+    ).fetchone()
+    assert row[0] == "thumbs/clip_1.jpg"
+    conn.close()
+
+
+def test_store_thumbnail_blobs_replaces_stale_bytes(tmp_path):
+    from loopsleuth.db import get_db_connection
+    from loopsleuth.thumbnailer import store_thumbnail_blobs
+    conn = get_db_connection(tmp_path / "thumbs.db")
+    conn.execute(
+        "INSERT INTO clips (id, path, filename)"
+        " VALUES (1, '/v/a.mp4', 'a.mp4')"
+    )
+    conn.execute(
+        "INSERT INTO thumbnails (clip_id, jpeg, webp) VALUES (1, ?, ?)",
+        (b"old-jpeg", b"old-webp"),
+    )
+    new_jpeg = tmp_path / "clip_1.jpg"
+    new_jpeg.write_bytes(b"new-jpeg")
+    # No new preview: the stale one is dropped so the file on disk is served
+    store_thumbnail_blobs(conn, 1, new_jpeg, None)
+    row = conn.execute(
+        "SELECT jpeg, webp FROM thumbnails WHERE clip_id = 1"
+    ).fetchone()
+    assert (row[0], row[1]) == (b"new-jpeg", None)
+    conn.close()
+
+
+def test_flush_thumbnail_updates_skips_deleted_clips(tmp_path):
+    from loopsleuth.db import get_db_connection
+    from loopsleuth.thumbnailer import _flush_thumbnail_updates
+    conn = get_db_connection(tmp_path / "thumbs.db")
+    conn.execute(
+        "INSERT INTO clips (id, path, filename)"
+        " VALUES (1, '/v/a.mp4', 'a.mp4')"
+    )
+    conn.commit()
+    # Clip 2 was deleted while its thumbnail was being generated
+    updates = [("thumbs/clip_1.jpg", 1), ("thumbs/clip_2.jpg", 2)]
+    blobs = [(1, b"jpeg-1", None), (2, b"jpeg-2", None)]
+    assert _flush_thumbnail_updates(conn, updates, blobs) == []
+    rows = conn.execute("SELECT clip_id FROM thumbnails")
+    assert [row[0] for row in rows] == [1]
+    row = conn.execute(
+        "SELECT thumbnail_path FROM clips WHERE id = 1"
+    ).fetchone()
+    assert row[0] == "thumbs/clip_1.jpg"
+    conn.close()
+
+
+def test_process_thumbnails_skips_pool_without_clips(monkeypatch, tmp_path):
+    from loopsleuth import thumbnailer
+    from loopsleuth.db import get_db_connection
+    db_path = tmp_path / "thumbs.db"
+    conn = get_db_connection(db_path)
+    conn.execute(
+        "INSERT INTO clips (id, path, filename, duration, thumbnail_path)"
+        " VALUES (1, '/v/a.mp4', 'a.mp4', 5.0, 'clip_1.jpg')"
+    )
+    conn.commit()
+    conn.close()
+
+    pools = []
+    monkeypatch.setattr(
+        thumbnailer, "ProcessPoolExecutor", lambda *a, **k: pools.append(k)
+    )
+    assert thumbnailer.process_thumbnails(db_path=db_path) == (0, 0)
+    assert pools == []
+
+
+def test_missing_videos_are_flagged_and_not_reselected(monkeypatch, tmp_path):
+    from loopsleuth import thumbnailer
+    from loopsleuth.db import get_db_connection
+    db_path = tmp_path / "thumbs.db"
+    conn = get_db_connection(db_path)
+    conn.execute(
+        "INSERT INTO clips (id, path, filename, duration)"
+        " VALUES (1, '/gone/a.mp4', 'a.mp4', 5.0)"
+    )
+    conn.commit()
+    conn.close()
+
+    pools = []
+    monkeypatch.setattr(
+        thumbnailer, "ProcessPoolExecutor",
+        lambda *a, **k: pools.append(k),
+    )
+    assert thumbnailer.process_thumbnails(db_path=db_path) == (0, 1)
+    # The second run no longer selects the dead path
+    assert thumbnailer.process_thumbnails(db_path=db_path) == (0, 0)
+    assert pools == []
+    conn = get_db_connection(db_path)
+    row = conn.execute(
+        "SELECT thumbnail_path, file_missing FROM clips WHERE id = 1"
+    ).fetchone()
+    assert (row[0], row[1]) == (None, 1)
+    conn.close()
+
+
+def test_process_clip_chunk_runs_statics_and_previews_concurrently(
+    monkeypatch, tmp_path
+):
+    import threading
+    from loopsleuth import thumbnailer
+    # Each stream waits for the other, so this only passes when they overlap
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_batch(specs, output_dir):
+        barrier.wait()
+        return [output_dir / f"clip_{clip_id}.jpg" for _, _, clip_id in specs]
+
+    def fake_preview(video_path, duration, clip_id, output_dir):
+        barrier.wait()
+        return output_dir / f"clip_{clip_id}.webp"
+
+    monkeypatch.chdir(tmp_path)  # thumbnail_path is stored relative to cwd
+    monkeypatch.setattr(thumbnailer, "get_video_duration", lambda p: 5.0)
+    monkeypatch.setattr(thumbnailer, "generate_thumbnails_batch", fake_batch)
+    monkeypatch.setattr(
+        thumbnailer, "generate_animated_preview", fake_preview
+    )
+    clips = [
+        (1, "/v/a.mp4", 5.0, False, True),  # Static only
+        (2, "/v/b.mp4", 5.0, True, False),  # Preview only
+    ]
+    results = thumbnailer._process_clip_chunk(clips, tmp_path, threads=2)
+    assert [r["ok"] for r in results] == [True, True]
+
+
+def test_failed_db_flush_only_moves_successes_to_errors(
+    monkeypatch, tmp_path
+):
+    from concurrent.futures import Future
+    from loopsleuth import thumbnailer
+    from loopsleuth.db import get_db_connection
+    db_path = tmp_path / "thumbs.db"
+    conn = get_db_connection(db_path)
+    for clip_id in (1, 2):
+        video = tmp_path / f"{clip_id}.mp4"
+        video.write_bytes(b"video")
+        conn.execute(
+            "INSERT INTO clips (id, path, filename, duration)"
+            " VALUES (?, ?, ?, 5.0)",
+            (clip_id, str(video), video.name),
+        )
+    conn.commit()
+    conn.close()
+
+    class InlineExecutor:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+    def fake_chunk(chunk, base_output_dir, threads=1):
+        # Clip 1 fully succeeds; clip 2 gets its static frame but no preview
+        return [
+            {"clip_id": clip_id, "thumbnail_path": f"clip_{clip_id}.jpg",
+             "jpeg": None, "webp": None, "ok": clip_id == 1, "messages": []}
+            for clip_id, *_ in chunk
+        ]
+
+    def failing_flush(conn, pending_updates, pending_blobs):
+        failed = [clip_id for _, clip_id in pending_updates]
+        pending_updates.clear()
+        pending_blobs.clear()
+        return failed
+
+    monkeypatch.setattr(thumbnailer, "ProcessPoolExecutor", InlineExecutor)
+    monkeypatch.setattr(thumbnailer, "_process_clip_chunk", fake_chunk)
+    monkeypatch.setattr(
+        thumbnailer, "_flush_thumbnail_updates", failing_flush
+    )
+    assert thumbnailer.process_thumbnails(db_path=db_path) == (0, 2)
+
+
+def test_hwaccel_only_uses_methods_ffmpeg_lists(monkeypatch):
+    from loopsleuth import thumbnailer
+    monkeypatch.delenv("LOOPSLEUTH_HWACCEL", raising=False)
+    monkeypatch.setattr(thumbnailer.sys, "platform", "linux")
+    # NVIDIA and VAAPI device nodes both exist
+    monkeypatch.setattr(thumbnailer.os.path, "exists", lambda path: True)
+    listed = "Hardware acceleration methods:\nvdpau\nvaapi\n"
+    monkeypatch.setattr(
+        subprocess, "run",
+        lambda cmd, **kwargs: subprocess.CompletedProcess(
+            cmd, 0, stdout=listed, stderr=""
+        ),
+    )
+    caches = (thumbnailer._available_hwaccels, thumbnailer._hwaccel_args)
+    for cached in caches:
+        cached.cache_clear()
+    try:
+        # cuda's device exists, but this build lacks it
+        assert thumbnailer._hwaccel_args() == (
+            "-hwaccel", "vaapi",
+            "-hwaccel_device", thumbnailer.VAAPI_RENDER_NODE,
+        )
+        listed = "Hardware acceleration methods:\n"
+        for cached in caches:
+            cached.cache_clear()
+        assert thumbnailer._hwaccel_args() == ()
+    finally:
+        for cached in caches:
+            cached.cache_clear()
+
+
+def test_failed_regeneration_keeps_previous_outputs(monkeypatch, tmp_path):
+    from loopsleuth import thumbnailer
+    video = tmp_path / "a.mp4"
+    video.write_bytes(b"")
+    out_dir = tmp_path / "thumbs"
+    out_dir.mkdir()
+    thumb = out_dir / "clip_1.jpg"
+    anim = out_dir / "clip_1_anim.webp"
+    thumb.write_bytes(b"old-jpeg")
+    anim.write_bytes(b"old-webp")
+
+    def failing_run(cmd, **kwargs):
+        # ffmpeg writes partial outputs, then fails
+        for arg in cmd:
+            if arg.endswith((".jpg", ".webp")):
+                Path(arg).write_bytes(b"partial")
+        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="boom")
+
+    monkeypatch.setattr(subprocess, "run", failing_run)
+    monkeypatch.setattr(thumbnailer, "_hwaccel_args", lambda: ())
+    with pytest.raises(ThumbnailError):
+        thumbnailer.generate_thumbnail_and_preview(
+            video, duration=5.0, clip_id=1, output_dir=out_dir
+        )
+    with pytest.raises(ThumbnailError):
+        thumbnailer.generate_animated_preview(
+            video, duration=5.0, clip_id=1, output_dir=out_dir
+        )
+    assert thumb.read_bytes() == b"old-jpeg"
+    assert anim.read_bytes() == b"old-webp"
+    names = sorted(p.name for p in out_dir.iterdir())
+    assert names == ["clip_1.jpg", "clip_1_anim.webp"]
@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+
+pytest.importorskip("textual")
+
+from loopsleuth.db import get_db_connection  # noqa: E402
+from loopsleuth.tui import (  # noqa: E402
+    LoopSleuthApp, ClipCard, TOGGLE_STAR_SQL, SET_TAGS_SQL,
+)
+
+CLIP_COUNT = 300
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = tmp_path / "tui.db"
+    conn = get_db_connection(db_path)
+    conn.executemany(
+        "INSERT INTO clips (id, path, filename) VALUES (?, ?, ?)",
+        [(i + 1, f"/videos/{i:03}.mp4", f"{i:03}.mp4")
+         for i in range(CLIP_COUNT)],
+    )
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def run_app(db_path, scenario):
+    """
+    Runs scenario(app, pilot) against a headless LoopSleuthApp once the grid
+    has loaded.
+    """
+    async def main():
+        app = LoopSleuthApp(db_path=db_path)
+        async with app.run_test(size=(120, 40)) as pilot:
+            await app.workers.wait_for_complete()
+            await pilot.pause()
+            await scenario(app, pilot)
+    asyncio.run(main())
+
+
+def db_row(db_path, clip_id):
+    conn = get_db_connection(db_path)
+    row = conn.execute(
+        "SELECT starred, tags FROM clips WHERE id = ?", (clip_id,)
+    ).fetchone()
+    conn.close()
+    return bool(row["starred"]), row["tags"]
+
+
+def assert_window_consistent(grid):
+    """
+    Mounted cards show consecutive rows from _first_index, and the spacers
+    cover the rest.
+    """
+    cards = grid._cards
+    first = grid._first_index
+    window = grid.all_clips_data[first:first + len(cards)]
+    assert [card.clip_data for card in cards] == window
+    total_rows = -(-len(grid.all_clips_data) // grid.grid_cols)
+    window_rows = -(-len(cards) // grid.grid_cols)
+    spacer_height = (grid._spacer_top.styles.height.value
+                     + grid._spacer_bottom.styles.height.value)
+    spacer_rows = spacer_height / grid.card_height
+    assert spacer_rows + window_rows == total_rows
+
+
+def test_grid_mounts_only_visible_cards_and_recycles_them(db_path):
+    async def scenario(app, pilot):
+        grid = app._grid
+        assert len(grid.all_clips_data) == CLIP_COUNT
+        assert 0 < len(grid._cards) < CLIP_COUNT
+        assert_window_consistent(grid)
+        pool = set(map(id, grid._cards))
+
+        grid.scroll_to(y=grid.card_height * 40, animate=False)
+        await pilot.pause()
+        assert grid._first_index > 0
+        assert_window_consistent(grid)
+        # Scrolling retargets the same widgets instead of mounting new ones
+        assert set(map(id, grid._cards)) == pool
+        assert len(list(grid.query(ClipCard))) == len(pool)
+
+        grid.scroll_to(y=0, animate=False)
+        await pilot.pause()
+        assert grid._first_index == 0
+        assert_window_consistent(grid)
+
+        # Tabbing walks the recycled cards in display order
+        await pilot.press("tab")
+        first = app.focused
+        await pilot.press("tab")
+        assert isinstance(app.focused, ClipCard) and app.focused is not first
+        assert app.focused.clip_data.id == first.clip_data.id + 1
+    run_app(db_path, scenario)
+
+
+def test_grid_applies_first_screen_before_full_list(db_path, monkeypatch):
+    from loopsleuth.tui import ClipGrid
+    applied = []
+    original_apply = ClipGrid._apply_clips
+
+    def recording_apply(self, clips):
+        applied.append(len(clips))
+        original_apply(self, clips)
+
+    monkeypatch.setattr(ClipGrid, "_apply_clips", recording_apply)
+
+    async def scenario(app, pilot):
+        # One fetchmany batch is enough for the first screen; the rest follows
+        assert applied == [app._grid.fetch_batch_size, CLIP_COUNT]
+    run_app(db_path, scenario)
+
+
+def test_star_and_tag_edits_persist(db_path):
+    async def scenario(app, pilot):
+        grid = app._grid
+        card = grid._cards[0]
+        card.focus()
+        await pilot.press("space")
+        assert card.starred and grid.all_clips_data[0].starred
+        app.update_tags_in_db(card.clip_data.id, "loop, drums")
+        assert card.tags == "loop, drums"
+        # Edits are debounced; refresh flushes them before reloading
+        await pilot.press("r")
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        assert db_row(db_path, 1) == (True, "loop, drums")
+        row = grid._rows_by_id[1]
+        assert (row.starred, row.tags) == (True, "loop, drums")
+    run_app(db_path, scenario)
+
+
+def test_tag_edit_applies_to_clip_not_recycled_card(db_path):
+    async def scenario(app, pilot):
+        grid = app._grid
+        card = grid._cards[0]
+        card.focus()
+        await pilot.press("t")
+        await pilot.pause()
+        # While the modal is open, the card is recycled for a row further down
+        grid.scroll_to(y=grid.card_height * 40, animate=False)
+        await pilot.pause()
+        assert card.clip_data.id != 1
+        other_id = card.clip_data.id
+        await pilot.press("x", "enter")
+        await pilot.pause()
+        assert grid._rows_by_id[1].tags == "x"
+        assert card.tags == "" and grid._rows_by_id[other_id].tags is None
+        app._flush_writes(wait=True)
+        assert db_row(db_path, 1) == (False, "x")
+        assert db_row(db_path, other_id) == (False, None)
+    run_app(db_path, scenario)
+
+
+def test_flush_writes_commit_in_queue_order(db_path):
+    async def scenario(app, pilot):
+        grid = app._grid
+        # First batch goes to a worker; the second is flushed inline right
+        # behind it
+        app._queue_write(TOGGLE_STAR_SQL, (2,))
+        app._queue_write(SET_TAGS_SQL, ("first", 2))
+        app._flush_writes()
+        app._queue_write(TOGGLE_STAR_SQL, (2,))
+        app._queue_write(SET_TAGS_SQL, ("second", 2))
+        app._flush_writes(wait=True)
+        await app.workers.wait_for_complete()
+        await pilot.pause()
+        assert db_row(db_path, 2) == (False, "second")
+        # A late worker result must not overwrite the newer inline state
+        row = grid._rows_by_id[2]
+        assert (row.starred, row.tags) == (False, "second")
+        assert app._pending_writes == [] and app._handoff == []
+    run_app(db_path, scenario)
@@ -0,0 +1,163 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import loopsleuth.web.app as web
+from loopsleuth.db import get_db_connection
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    db_path = tmp_path / "web.db"
+    monkeypatch.setenv("LOOPSLEUTH_DB_PATH", str(db_path))
+    conn = get_db_connection(db_path)
+    conn.execute("INSERT INTO scans (id, folder_path) VALUES (1, '/videos')")
+    for i in range(4):
+        conn.execute(
+            "INSERT INTO clips (id, path, filename, starred, scan_id)"
+            " VALUES (?, ?, ?, ?, 1)",
+            (i + 1, f"/videos/{i}.mp4", f"{i}.mp4", int(i < 2)),
+        )
+    conn.execute("INSERT INTO tags (id, name) VALUES (1, 'loop')")
+    conn.executemany(
+        "INSERT INTO clip_tags (clip_id, tag_id) VALUES (?, 1)", [(1,), (3,)]
+    )
+    conn.commit()
+    conn.close()
+    yield db_path
+    web.db_pool.close_all()
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    # Capture the template context instead of rendering HTML
+    context = {}
+
+    def fake_template_response(name, ctx, **kwargs):
+        context.clear()
+        context.update(ctx)
+        return web.HTMLResponse(name)
+    monkeypatch.setattr(
+        web.templates, "TemplateResponse", fake_template_response
+    )
+    return context
+
+
+@pytest.fixture
+def client(db_path, rendered):
+    return TestClient(web.app)
+
+
+def test_grid_answers_conditional_get_until_a_write(client):
+    resp = client.get("/")
+    etag = resp.headers["etag"]
+    assert resp.status_code == 200
+    assert resp.headers["cache-control"] == "private, no-cache"
+    resp = client.get("/", headers={"If-None-Match": etag})
+    assert resp.status_code == 304 and resp.content == b""
+    resp = client.get("/clip/1", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    # Any write to the DB changes the ETag
+    assert client.post("/star/3").status_code == 200
+    resp = client.get("/", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["etag"] != etag
+
+
+def test_grid_filters_by_starred_and_tag(client, rendered):
+    for query, expected in [
+        ("", [1, 2, 3, 4]),
+        ("?starred=1", [1, 2]),
+        ("?starred=0", [3, 4]),
+        ("?tag=loop", [1, 3]),
+        ("?tag=loop&starred=1", [1]),
+    ]:
+        client.get("/" + query)
+        assert [clip["id"] for clip in rendered["clips"]] == expected
+        assert rendered["total_clips"] == len(expected)
+        data = client.get("/api/clips" + query).json()
+        assert [clip["id"] for clip in data["clips"]] == expected
+        assert data["total"] == len(expected)
+
+
+def test_grid_rejects_unknown_sort(client, rendered):
+    resp = client.get("/?sort=filename;DROP TABLE clips&order=sideways")
+    assert resp.status_code == 200
+    assert (rendered["sort"], rendered["order"]) == ("filename", "asc")
+    assert [clip["id"] for clip in rendered["clips"]] == [1, 2, 3, 4]
+    assert client.get("/api/clips?sort=nope").json()["total"] == 4
+
+
+def test_thumbnails_are_cached_and_revalidated(
+    client, db_path, tmp_path, monkeypatch
+):
+    conn = get_db_connection(db_path)
+    conn.executemany(
+        "INSERT INTO thumbnails (clip_id, jpeg) VALUES (?, ?)",
+        [(1, b"packed-1"), (2, b"packed-2")],
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(web, "THUMB_DIR", tmp_path)
+    monkeypatch.setattr(web, "PACK_THUMBNAILS", True)
+    (tmp_path / "clip_2.jpg").write_bytes(b"file-jpeg")
+    # Files on disk win; the packed copy only fills in a missing file
+    for name, body in [
+        ("clip_1.jpg", b"packed-1"),
+        ("clip_2.jpg", b"file-jpeg"),
+    ]:
+        resp = client.get(f"/thumbs/{name}")
+        assert resp.status_code == 200 and resp.content == body
+        assert resp.headers["cache-control"] == web.THUMB_CACHE_CONTROL
+        resp = client.get(
+            f"/thumbs/{name}",
+            headers={"If-None-Match": resp.headers["etag"]},
+        )
+        assert resp.status_code == 304
+
+
+def test_packed_thumbnails_are_opt_in(client, db_path, tmp_path, monkeypatch):
+    conn = get_db_connection(db_path)
+    conn.execute(
+        "INSERT INTO thumbnails (clip_id, jpeg) VALUES (1, ?)", (b"packed-1",)
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(web, "THUMB_DIR", tmp_path)
+    monkeypatch.setattr(web, "PACK_THUMBNAILS", False)
+    assert client.get("/thumbs/clip_1.jpg").status_code == 404
+
+
+def test_connection_pool_reuses_clean_connections(db_path):
+    pool = web.ConnectionPool(max_idle=1)
+    with pool.acquire(db_path) as conn:
+        first = conn
+        # Left uncommitted: must be rolled back before the connection is reused
+        conn.execute("UPDATE clips SET starred = 1 WHERE id = 4")
+    with pool.acquire(db_path) as conn:
+        assert conn is first and not conn.in_transaction
+        row = conn.execute("SELECT starred FROM clips WHERE id = 4").fetchone()
+        assert row[0] == 0
+        with pool.acquire(db_path) as other:
+            assert other is not first
+    # Only max_idle connections are kept; the extra one was closed on release
+    pool.close_all()
+    with pool.acquire(db_path) as conn:
+        assert conn is not first
+    pool.close_all()
+
+
+def test_mutation_and_export_routes_use_the_pool(client, db_path, monkeypatch):
+    opened = []
+    real_connect = web.get_db_connection
+
+    def counting_connect(*args, **kwargs):
+        opened.append(args)
+        return real_connect(*args, **kwargs)
+
+    monkeypatch.setattr(web, "get_db_connection", counting_connect)
+    assert client.post("/star/3").status_code == 200
+    assert client.post("/tag/3", json={"tags": ["loop"]}).status_code == 200
+    assert client.get("/api/clips").json()["total"] == 4
+    resp = client.post("/export_selected", json={"clip_ids": [1, 2]})
+    assert resp.text == "/videos/0.mp4\n/videos/1.mp4\n"
+    # Sequential requests all reuse the one warm connection
+    assert len(opened) == 1